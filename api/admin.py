@@ -1,10 +1,175 @@
+import math
 from django.contrib import admin
-from .models import User, Product, Order, OrderItem, Payment, Notification, LoyaltyPoint
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from .models import (
+    User, Product, Order, OrderItem, Payment, Notification, LoyaltyPoint,
+    ArchivedOrder, ArchivedOrderItem, ArchivedPayment, OrderArchiveBatch
+)
+
+
+def estimated_row_count(queryset):
+    """The database's cheap estimate of the rows in the queryset's table, or None where it has none."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute('SELECT table_rows FROM information_schema.tables '
+                           'WHERE table_schema = DATABASE() AND table_name = %s', [table])
+        elif connection.vendor == 'sqlite' and queryset.model._meta.pk.get_internal_type() in (
+                'AutoField', 'BigAutoField', 'BigIntegerField', 'IntegerField'):
+            # The largest rowid: an upper bound (deleted rows still count), read from the end of the table's b-tree.
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for a table that has never been analyzed.
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class LargeTablePaginator(Paginator):
+    """
+    Changelist paginator for tables too large to COUNT(*) on every page load.
+    A filtered or searched list counts at most `max_count` matching rows;
+    the unfiltered list shows the database's row estimate. Either way only
+    the first `max_count` rows can be paged through, which keeps OFFSET
+    small; filters (e.g. on created_at) reach older rows.
+    """
+    max_count = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset)
+            if estimate is not None and estimate > self.max_count:
+                return estimate
+        return queryset.order_by()[:self.max_count].count()
+
+    @cached_property
+    def num_pages(self):
+        pages = math.ceil(min(self.count, self.max_count) / self.per_page)
+        return max(pages, 1) if self.allow_empty_first_page else pages
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    For tables with millions of rows: bounded, estimated counts, foreign
+    keys entered by id, and searches that only match exact ids
+    (`id_search_fields`) or exact values (`exact_search_fields`), all of
+    which are index lookups.
+    """
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+    list_per_page = 50
+    ordering = ('-pk',)
+    id_search_fields = ('pk',)
+    exact_search_fields = ()
+
+    def get_search_fields(self, request):
+        # Any non-empty value, so the changelist shows its search box.
+        return self.id_search_fields + self.exact_search_fields
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        condition = Q()
+        for field in self.exact_search_fields:
+            condition |= Q(**{field: term})
+        if term.isdigit():
+            for field in self.id_search_fields:
+                condition |= Q(**{field: int(term)})
+        return (queryset.filter(condition) if condition else queryset.none()), False
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    raw_id_fields = ('product',)
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
+
+class PaymentInline(admin.StackedInline):
+    model = Payment
+    extra = 0
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'status', 'payment_method', 'total_amount', 'created_at')
+    list_select_related = ('user',)
+    # Backed by the (status, created_at) and created_at indexes.
+    list_filter = ('status', 'created_at')
+    ordering = ('-created_at',)
+    raw_id_fields = ('user',)
+    id_search_fields = ('id', 'user_id')
+    inlines = (OrderItemInline, PaymentInline)
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ('id', 'order_id', 'product', 'quantity', 'price')
+    list_select_related = ('product',)
+    raw_id_fields = ('order', 'product')
+    id_search_fields = ('id', 'order_id', 'product_id')
+
+
+@admin.register(Payment)
+class PaymentAdmin(LargeTableAdmin):
+    list_display = ('id', 'order_id', 'amount', 'payment_method', 'status', 'transaction_id', 'updated_at')
+    # Backed by the (status, id) index.
+    list_filter = ('status',)
+    raw_id_fields = ('order',)
+    id_search_fields = ('id', 'order_id')
+    exact_search_fields = ('transaction_id',)
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'status', 'payment_method', 'total_amount', 'created_at', 'archived_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    id_search_fields = ('id', 'user_id')
+
+
+@admin.register(ArchivedOrderItem)
+class ArchivedOrderItemAdmin(LargeTableAdmin):
+    list_display = ('id', 'order_id', 'product', 'quantity', 'price')
+    list_select_related = ('product',)
+    raw_id_fields = ('order', 'product')
+    id_search_fields = ('id', 'order_id', 'product_id')
+
+
+@admin.register(ArchivedPayment)
+class ArchivedPaymentAdmin(LargeTableAdmin):
+    list_display = ('id', 'order_id', 'amount', 'payment_method', 'status', 'transaction_id')
+    raw_id_fields = ('order',)
+    id_search_fields = ('id', 'order_id')
+
+
+@admin.register(Notification)
+class NotificationAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'type', 'sent_at', 'read_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    id_search_fields = ('id', 'user_id')
+
+
+@admin.register(LoyaltyPoint)
+class LoyaltyPointAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'points', 'earned_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    id_search_fields = ('id', 'user_id')
+
 
 admin.site.register(User)
 admin.site.register(Product)
-admin.site.register(Order)
-admin.site.register(OrderItem)
-admin.site.register(Payment)
-admin.site.register(Notification)
-admin.site.register(LoyaltyPoint)
\ No newline at end of file
+admin.site.register(OrderArchiveBatch)
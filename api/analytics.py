@@ -0,0 +1,159 @@
+from datetime import datetime, time, timedelta
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+from .models import Product, Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+ANALYTICS_CACHE_TIMEOUT = 600
+ANALYTICS_CHUNK_SIZE = 50000
+
+ORDER_COLUMNS = ['id', 'user_id', 'created_at', 'payment_method', 'total']
+LINE_COLUMNS = ['order_id', 'product_id', 'revenue']
+
+
+def concat_frames(frames, columns):
+    frames = [frame for frame in frames if len(frame)]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def order_expressions():
+    return ['id', 'user_id', 'created_at', 'payment_method', Cast('total_amount', FloatField())]
+
+
+def line_expressions():
+    return ['order_id', 'product_id', Cast(F('quantity') * F('price'), FloatField())]
+
+
+def read_frame(queryset, expressions, columns, chunk_size=ANALYTICS_CHUNK_SIZE):
+    """
+    Reads `expressions` (the primary key first) of a queryset into a
+    DataFrame, one primary key range of `chunk_size` rows per query. Each
+    chunk becomes a frame straight away so only one chunk of row tuples is
+    alive at a time.
+    """
+    queryset = queryset.order_by('pk').values_list(*expressions)
+    frames = []
+    last_pk = None
+    while True:
+        rows = list((queryset if last_pk is None else queryset.filter(pk__gt=last_pk))[:chunk_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        frames.append(pd.DataFrame.from_records(rows, columns=columns))
+    return concat_frames(frames, columns)
+
+
+def read_lines(model, order_ids, expressions, columns, chunk_size=ANALYTICS_CHUNK_SIZE):
+    """
+    Reads the lines of the given orders, one order id range per query so
+    each query is a single range scan of the order foreign key index. Lines
+    of orders outside the set that fall inside a range are dropped later.
+    """
+    order_ids = np.sort(order_ids)
+    step = max(1, chunk_size // 4)
+    frames = []
+    for start in range(0, len(order_ids), step):
+        low, high = order_ids[start], order_ids[min(start + step, len(order_ids)) - 1]
+        rows = list(model.objects.filter(order_id__gte=low, order_id__lte=high).values_list(*expressions))
+        frames.append(pd.DataFrame.from_records(rows, columns=columns))
+    return concat_frames(frames, columns)
+
+
+def load_sales_frames(start, end, chunk_size=ANALYTICS_CHUNK_SIZE):
+    """
+    Order lines and orders created between the `start` and `end` dates
+    (inclusive, local time), from both the live and the archive tables.
+
+    Lines are read without joins; their day, payment method and category are
+    looked up from the order and product frames with vectorized indexers, and
+    timestamps are converted to local days in one pass.
+    """
+    tz = timezone.get_current_timezone()
+    since = timezone.make_aware(datetime.combine(start, time.min), tz)
+    until = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+
+    order_frames = []
+    line_frames = []
+    for order_model, line_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        orders = read_frame(order_model.objects.filter(created_at__gte=since, created_at__lt=until),
+                            order_expressions(), ORDER_COLUMNS, chunk_size)
+        order_frames.append(orders)
+        line_frames.append(read_lines(line_model, orders['id'].to_numpy(dtype='int64'), line_expressions(),
+                                      LINE_COLUMNS, chunk_size))
+    orders = concat_frames(order_frames, ORDER_COLUMNS)
+    orders['day'] = pd.to_datetime(orders.pop('created_at'), utc=True).dt.tz_convert(tz).dt.tz_localize(None).dt.normalize()
+    orders['total'] = orders['total'].astype(float)
+
+    lines = concat_frames(line_frames, LINE_COLUMNS)
+    order_rows = pd.Index(orders['id']).get_indexer(lines['order_id'])
+    lines = lines[order_rows >= 0]
+    order_rows = order_rows[order_rows >= 0]
+    categories = pd.Series(dict(Product.objects.values_list('id', 'category')), dtype='object')
+    lines = pd.DataFrame({
+        'day': orders['day'].to_numpy()[order_rows],
+        'category': pd.Categorical(categories.reindex(lines['product_id']).to_numpy()),
+        'payment_method': pd.Categorical(orders['payment_method'].to_numpy()[order_rows]),
+        'revenue': lines['revenue'].to_numpy(dtype=float),
+    })
+    return lines, orders[['user_id', 'day', 'total']]
+
+
+def cohort_retention(orders):
+    """
+    Monthly cohorts by each customer's first order in the range; retention[n]
+    is the share of the cohort that ordered again n months later.
+    """
+    if orders.empty:
+        return []
+    month = (orders['day'].dt.year * 12 + orders['day'].dt.month - 1).to_numpy()
+    users, user_index = np.unique(orders['user_id'].to_numpy(), return_inverse=True)
+    first = np.full(len(users), month.max())
+    np.minimum.at(first, user_index, month)
+    cohort = first[user_index]
+    active = pd.DataFrame({'user': user_index, 'cohort': cohort, 'period': month - cohort}).drop_duplicates()
+    counts = active.groupby(['cohort', 'period']).size().unstack(fill_value=0).sort_index()
+    sizes = counts[0].to_numpy()
+    rates = counts.to_numpy() / sizes[:, None]
+    last_period = month.max() - counts.index.to_numpy()
+    return [
+        {
+            'cohort': f"{cohort // 12:04d}-{cohort % 12 + 1:02d}",
+            'customers': int(size),
+            'retention': np.round(row[:periods + 1], 4).tolist(),
+        }
+        for cohort, size, row, periods in zip(counts.index.tolist(), sizes, rates, last_period)
+    ]
+
+
+def compute_sales_analytics(lines, orders):
+    revenue = lines.groupby(['day', 'category', 'payment_method'], observed=True)['revenue'].sum().reset_index()
+    orders_per_user = orders.groupby('user_id').size()
+    customers = len(orders_per_user)
+    return {
+        'orders': len(orders),
+        'revenue': round(float(orders['total'].sum()), 2),
+        'average_order_value': round(float(orders['total'].mean()), 2) if len(orders) else 0,
+        'customers': customers,
+        'repeat_purchase_rate': round(int((orders_per_user > 1).sum()) / customers, 4) if customers else 0,
+        'revenue_by_day': [
+            {'day': day, 'category': category, 'payment_method': method, 'revenue': amount}
+            for day, category, method, amount in zip(
+                revenue['day'].dt.strftime('%Y-%m-%d').tolist(), revenue['category'].tolist(),
+                revenue['payment_method'].tolist(), revenue['revenue'].round(2).tolist()
+            )
+        ],
+        'cohort_retention': cohort_retention(orders),
+    }
+
+
+def sales_analytics(start, end):
+    key = f"sales_analytics:{start.isoformat()}:{end.isoformat()}"
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = {'start': start.isoformat(), 'end': end.isoformat(),
+                     **compute_sales_analytics(*load_sales_frames(start, end))}
+        cache.set(key, analytics, ANALYTICS_CACHE_TIMEOUT)
+    return analytics
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from .models import (
+    Order, OrderItem, Payment, ArchivedOrder, ArchivedOrderItem, ArchivedPayment, OrderArchiveBatch
+)
+
+
+def concrete_columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def archive_candidates(older_than_days=None):
+    days = settings.ORDER_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = timezone.now() - timedelta(days=days)
+    return Order.objects.filter(status__in=settings.ORDER_ARCHIVE_STATUSES, created_at__lt=cutoff)
+
+
+def archive_batch(older_than_days=None, batch_size=500):
+    """
+    Moves one batch of old terminal orders, with their items and payments, to
+    the archive tables in a single short transaction. Rows locked by other
+    transactions are skipped and picked up by a later batch. Returns the
+    OrderArchiveBatch record, or None when nothing is left to archive.
+    """
+    with transaction.atomic():
+        candidates = archive_candidates(older_than_days).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        order_ids = list(candidates.values_list('id', flat=True)[:batch_size])
+        if not order_ids:
+            return None
+
+        orders = list(Order.objects.filter(id__in=order_ids).values(*concrete_columns(Order)))
+        items = list(OrderItem.objects.filter(order_id__in=order_ids).values(*concrete_columns(OrderItem)))
+        payments = list(Payment.objects.filter(order_id__in=order_ids).values(*concrete_columns(Payment)))
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**row) for row in orders])
+        ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**row) for row in items])
+        ArchivedPayment.objects.bulk_create([ArchivedPayment(**row) for row in payments])
+
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        Payment.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(id__in=order_ids).delete()
+
+        return OrderArchiveBatch.objects.create(
+            orders=len(orders),
+            items=len(items),
+            payments=len(payments),
+            order_total=sum((row['total_amount'] for row in orders), Decimal('0')),
+            payment_total=sum((row['amount'] for row in payments), Decimal('0')),
+        )
+
+
+def archive_orders(older_than_days=None, batch_size=500, max_batches=None):
+    batches = []
+    while max_batches is None or len(batches) < max_batches:
+        batch = archive_batch(older_than_days, batch_size)
+        if batch is None:
+            break
+        batches.append(batch)
+    return batches
+
+
+def verify_archive():
+    """
+    Compares the archive tables against the totals recorded for every batch
+    and checks that no archived order still exists in the hot tables.
+    Returns a list of human-readable problems; empty means consistent.
+    """
+    expected = OrderArchiveBatch.objects.aggregate(
+        orders=Sum('orders'), items=Sum('items'), payments=Sum('payments'),
+        order_total=Sum('order_total'), payment_total=Sum('payment_total'),
+    )
+    actual_orders = ArchivedOrder.objects.aggregate(count=Count('id'), total=Sum('total_amount'))
+    actual_payments = ArchivedPayment.objects.aggregate(count=Count('id'), total=Sum('amount'))
+    checks = [
+        ('archived orders', expected['orders'] or 0, actual_orders['count']),
+        ('archived order items', expected['items'] or 0, ArchivedOrderItem.objects.count()),
+        ('archived payments', expected['payments'] or 0, actual_payments['count']),
+        ('archived order total', expected['order_total'] or Decimal('0'), actual_orders['total'] or Decimal('0')),
+        ('archived payment total', expected['payment_total'] or Decimal('0'), actual_payments['total'] or Decimal('0')),
+    ]
+    problems = [
+        f"{label}: expected {expected_value}, found {actual_value}"
+        for label, expected_value, actual_value in checks if expected_value != actual_value
+    ]
+    overlap = Order.objects.filter(id__in=ArchivedOrder.objects.values('id')).count()
+    if overlap:
+        problems.append(f"{overlap} archived orders are still present in the hot tables")
+    return problems
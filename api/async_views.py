@@ -0,0 +1,172 @@
+"""
+Async-native GET handlers for the busiest read endpoints. Under ASGI they run
+on the event loop and leave it only for the queries themselves (Django's async
+ORM), instead of holding a thread for the whole request. Other methods are
+served by the DRF view unchanged; responses are identical either way.
+
+`read_path` routes to them only while ASYNC_READS is on. When it is off (the
+default, for WSGI deployments, where an async view costs two thread hops per
+request) the DRF view is resolved directly.
+"""
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.shortcuts import aget_object_or_404
+from django.urls import URLPattern
+from django.urls.resolvers import RoutePattern
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import NotFound
+from .conditional import (
+    aproduct_list_state, conditional_response, is_not_modified, not_modified_response, order_etag, queryset_etag
+)
+from .facets import product_facets, get_facet_version
+from .fast_serializers import FastProductSerializer
+from .models import Product, Order, ArchivedOrder
+from .serializers import ArchivedOrderSerializer
+from .views import ProductListCreateView, ProductDetailView, ProductSearchView, OrderDetailView
+
+
+async def paginate(paginator, queryset, request, count=None):
+    """
+    PageNumberPagination.paginate_queryset with the count and the page fetched
+    through the async ORM; pass `count` when it is known already.
+    """
+    paginator.request = request
+    django_paginator = paginator.django_paginator_class(queryset, paginator.get_page_size(request))
+    django_paginator.count = await queryset.acount() if count is None else count
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        paginator.page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    if django_paginator.num_pages > 1 and paginator.template is not None:
+        paginator.display_page_controls = True
+    paginator.page.object_list = [row async for row in paginator.page.object_list]
+    return list(paginator.page)
+
+
+class AsyncReadView:
+    """
+    Serves GET for `view_class` asynchronously. Subclasses set `view_class`
+    and implement `async get(view, request, *args, **kwargs)`, where `view`
+    is an initialized `view_class` instance, and use the ORM's async API only.
+    Authentication, permissions, content negotiation and exception handling
+    are the DRF view's own.
+    """
+    view_class = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.view_class is None or not iscoroutinefunction(getattr(cls, 'get', None)):
+            raise ImproperlyConfigured(f"{cls.__name__} must set view_class and define `async def get`.")
+
+    @classmethod
+    def as_view(cls):
+        sync_view = cls.view_class.as_view()
+
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            return await cls().dispatch(request, *args, **kwargs)
+
+        # LoadSheddingMiddleware classifies requests by the DRF view's load_class.
+        view.cls = cls.view_class
+        return csrf_exempt(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        view = self.view_class()
+        view.args, view.kwargs = args, kwargs
+        request = view.initialize_request(request, *args, **kwargs)
+        view.request = request
+        view.headers = view.default_response_headers
+        try:
+            # Authentication is the one step of initial() that queries (the user lookup).
+            await sync_to_async(view.perform_authentication)(request)
+            view.initial(request, *args, **kwargs)
+            response = await self.get(view, request, *args, **kwargs)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        return view.finalize_response(request, response, *args, **kwargs)
+
+
+class ReadViewPattern(URLPattern):
+    """Resolves to the async view while ASYNC_READS is on, else to the DRF view itself."""
+
+    def __init__(self, pattern, async_view_class, name):
+        super().__init__(pattern, async_view_class.view_class.as_view(), name=name)
+        self.async_view = async_view_class.as_view()
+
+    def resolve(self, path):
+        match = super().resolve(path)
+        if match is not None and settings.ASYNC_READS:
+            match.func = self.async_view
+        return match
+
+
+def read_path(route, async_view_class, name):
+    return ReadViewPattern(RoutePattern(route, name=name, is_endpoint=True), async_view_class, name)
+
+
+class AsyncProductListView(AsyncReadView):
+    view_class = ProductListCreateView
+
+    async def get(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        facets = request.query_params.get('facets') == 'true'
+        state = await aproduct_list_state(queryset)
+        etag = queryset_etag(request, state, await sync_to_async(get_facet_version)() if facets else None)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        fast_serializer = FastProductSerializer()
+        page = await paginate(view.paginator, fast_serializer.values(queryset), request, count=state['count'])
+        response = view.get_paginated_response(fast_serializer.serialize(page))
+        if facets:
+            response.data['facets'] = await sync_to_async(product_facets)(view.get_queryset(), request.query_params)
+        response['ETag'] = etag
+        return response
+
+
+class AsyncProductSearchView(AsyncReadView):
+    view_class = ProductSearchView
+
+    async def get(self, view, request):
+        query = request.query_params.get('q', '')
+        queryset = Product.objects.filter(Q(name__icontains=query) | Q(category__icontains=query))
+        state = await aproduct_list_state(queryset)
+        etag = queryset_etag(request, state)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        fast_serializer = FastProductSerializer()
+        paginator = view.pagination_class()
+        result_page = await paginate(paginator, fast_serializer.values(queryset), request, count=state['count'])
+        response = paginator.get_paginated_response(fast_serializer.serialize(result_page))
+        response['ETag'] = etag
+        return response
+
+
+class AsyncProductDetailView(AsyncReadView):
+    view_class = ProductDetailView
+
+    async def get(self, view, request, pk):
+        product = await aget_object_or_404(view.get_queryset(), pk=pk)
+        view.check_object_permissions(request, product)
+        return conditional_response(request, view.get_etag(product), lambda: view.get_serializer(product).data)
+
+
+class AsyncOrderDetailView(AsyncReadView):
+    view_class = OrderDetailView
+
+    async def get(self, view, request, pk):
+        try:
+            order = await view.get_queryset().aget(pk=pk)
+        except Order.DoesNotExist:
+            archived_order = await aget_object_or_404(
+                ArchivedOrder.objects.select_related('user').prefetch_related('items__product'), pk=pk
+            )
+            view.check_object_permissions(request, archived_order)
+            return conditional_response(request, order_etag(request, archived_order),
+                                        lambda: ArchivedOrderSerializer(archived_order).data)
+        view.check_object_permissions(request, order)
+        return conditional_response(request, view.get_etag(order), lambda: view.get_serializer(order).data)
@@ -0,0 +1,227 @@
+"""
+Route benchmark suite: runs every route in api/urls.py against synthetic data
+(api.synthetic) at several sizes and records latency, query count and peak
+Python memory per request, so a route that goes from O(1) to O(n) queries or
+time shows up as a regression against the stored baseline.
+
+Each request runs in a rolled-back transaction against an empty cache, so
+writes don't accumulate between runs and cached endpoints are measured doing
+their full work. Provider SDK calls (Daraja, Twilio, SendGrid) are stubbed.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack, nullcontext
+from types import SimpleNamespace
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import User, Product, Order, Payment, NotificationCampaign
+from .synthetic import ORDER_NOTES, PRODUCT_PREFIX, USERNAME_PREFIX
+from .typeahead import typeahead_index
+
+BENCH_PASSWORD = 'bench-pass-123'
+
+# (route name, method, user, URL args, data); the callables take the fixture.
+ROUTE_CASES = [
+    ('register', 'post', None, None,
+     lambda f: {'username': 'bench-register', 'email': 'register@example.com', 'password': BENCH_PASSWORD}),
+    ('login', 'post', None, None, lambda f: {'username': f.customer.username, 'password': BENCH_PASSWORD}),
+    ('token_refresh', 'post', None, None, lambda f: {'refresh': f.refresh_token}),
+    ('product-list-create', 'get', 'staff', None, lambda f: {'category': 'Electronics', 'price_min': 10, 'facets': 'true'}),
+    ('product-list-create', 'post', 'staff', None,
+     lambda f: {'name': 'Bench product', 'price': '10.00', 'stock_level': 5, 'category': 'Electronics'}),
+    ('product-search', 'get', None, None, lambda f: {'q': 'item 1'}),
+    ('product-autocomplete', 'get', None, None, lambda f: {'q': 'synthetic product 12'}),
+    ('product-detail', 'get', 'staff', lambda f: [f.product.id], None),
+    ('product-detail', 'patch', 'staff', lambda f: [f.product.id], lambda f: {'stock_level': 50}),
+    ('product-recommendations', 'get', None, lambda f: [f.product.id], None),
+    ('low-stock', 'get', 'staff', None, None),
+    ('order-list-create', 'get', 'customer', None, None),
+    ('order-list-create', 'post', 'customer', None, lambda f: {
+        'user_id': f.customer.id, 'payment_method': 'Cash', 'total_amount': '0.00',
+        'items': [{'product_id': f.product.id, 'quantity': 1, 'price': str(f.product.price)}],
+    }),
+    ('order-detail', 'get', 'customer', lambda f: [f.order.id], None),
+    ('order-bulk-status', 'post', 'staff', None, lambda f: {'order_ids': f.pending_order_ids, 'status': 'shipped'}),
+    ('mpesa-payment', 'post', 'customer', None, lambda f: {'order_id': f.mpesa_order.id, 'amount': '100.00'}),
+    ('mpesa-callback', 'post', None, None, lambda f: {
+        'Body': {'stkCallback': {'CheckoutRequestID': f.checkout_request_id, 'ResultCode': 0, 'ResultDesc': 'ok'}}
+    }),
+    ('notifications', 'post', 'staff', None, lambda f: {'user_id': f.customer.id, 'message': 'Bench', 'type': 'SMS'}),
+    ('notification-inbox', 'get', 'customer', None, None),
+    ('notification-mark-read', 'post', 'customer', None, None),
+    ('notification-unread-count', 'get', 'customer', None, None),
+    ('notification-campaigns', 'get', 'staff', None, None),
+    ('notification-campaigns', 'post', 'staff', None,
+     lambda f: {'message': 'Bench', 'type': 'SMS', 'segment': {'role': 'customer'}}),
+    ('notification-campaign-detail', 'get', 'staff', lambda f: [f.campaign.id], None),
+    ('loyalty-points', 'get', 'customer', None, None),
+    ('dashboard-sales', 'get', 'admin', None, None),
+    ('dashboard-best-sellers', 'get', 'admin', None, None),
+    ('dashboard-summary', 'get', 'admin', None, None),
+    ('dashboard-analytics', 'get', 'admin', None, None),
+    ('dashboard-inventory', 'get', 'admin', None, None),
+    ('dashboard-customers', 'get', 'admin', None, None),
+    ('profile-list', 'get', 'admin', None, None),
+    ('profile-sampling', 'put', 'admin', None, lambda f: {'sample_rate': 0}),
+    ('profile-token', 'post', 'admin', None, None),
+    # Profiles live in the cache, which every call clears: this measures the lookup of an expired one.
+    ('profile-detail', 'get', 'admin', lambda f: [1], None),
+]
+
+
+def case_label(case):
+    route, method = case[:2]
+    return f"{method.upper()} {route}"
+
+
+# Cases that don't answer 200 when the route works; the report flags any other status.
+EXPECTED_STATUS = {
+    'POST register': 201,
+    'POST product-list-create': 201,
+    'POST order-list-create': 201,
+    'POST notifications': 201,
+    'POST notification-campaigns': 201,
+    'POST profile-token': 201,
+    'GET profile-detail': 404,
+}
+
+
+def expected_status(case):
+    return EXPECTED_STATUS.get(case_label(case), 200)
+
+
+def uncovered_routes():
+    """Names in api/urls.py without a benchmark case."""
+    from .urls import urlpatterns
+    covered = {case[0] for case in ROUTE_CASES}
+    return sorted(pattern.name for pattern in urlpatterns if pattern.name not in covered)
+
+
+def build_fixture():
+    """Users, rows and tokens the cases need, picked from the synthetic data: the busiest customer and product."""
+    admin = User.objects.create_user(username='bench-admin', password=BENCH_PASSWORD, role='admin')
+    staff = User.objects.create_user(username='bench-staff', password=BENCH_PASSWORD, role='staff')
+    customer = User.objects.filter(username__startswith=USERNAME_PREFIX).annotate(
+        order_count=Count('orders')
+    ).order_by('-order_count', 'id').first()
+    customer.set_password(BENCH_PASSWORD)
+    customer.save(update_fields=['password'])
+    product = Product.objects.filter(name__startswith=PRODUCT_PREFIX).annotate(
+        line_count=Count('orderitem')
+    ).order_by('-line_count', 'id').first()
+    order = Order.objects.filter(user=customer).latest('id')
+    pending_order_ids = list(Order.objects.filter(status='pending').order_by('-id').values_list('id', flat=True)[:100])
+    mpesa_order = Order.objects.create(user=customer, total_amount='100.00', payment_method='M-Pesa', notes=ORDER_NOTES)
+    checkout_request_id = 'ws_CO_bench'
+    Payment.objects.create(order=Order.objects.create(
+        user=customer, total_amount='100.00', payment_method='M-Pesa', notes=ORDER_NOTES
+    ), amount='100.00', payment_method='M-Pesa', transaction_id=checkout_request_id, status='pending')
+    return SimpleNamespace(
+        admin=admin, staff=staff, customer=customer, product=product,
+        order=order, mpesa_order=mpesa_order, pending_order_ids=pending_order_ids,
+        checkout_request_id=checkout_request_id, refresh_token=str(RefreshToken.for_user(customer)),
+        campaign=NotificationCampaign.objects.create(created_by=staff, message='Bench', type='SMS', status='completed'),
+    )
+
+
+def stub_providers():
+    stack = ExitStack()
+    stk_push = mock.Mock(status_code=200, json=mock.Mock(return_value={'CheckoutRequestID': 'ws_CO_bench_push'}))
+    stack.enter_context(mock.patch('api.views.MpesaPaymentView.get_mpesa_access_token', return_value='bench-token'))
+    stack.enter_context(mock.patch('requests.post', return_value=stk_push))
+    stack.enter_context(mock.patch('api.views.twilio_client'))
+    stack.enter_context(mock.patch('api.views.sendgrid_client'))
+    stack.enter_context(mock.patch('api.views.start_campaign'))
+    return stack
+
+
+def run_case(client, case, fixture, repeat):
+    route, method, user, args, data = case
+    url = reverse(route, args=args(fixture) if args else None)
+    payload = data(fixture) if data else None
+    client.force_authenticate(user=getattr(fixture, user) if user else None)
+
+    def call(execute_wrapper=None):
+        cache.clear()
+        with transaction.atomic():
+            with connection.execute_wrapper(execute_wrapper) if execute_wrapper else nullcontext():
+                if method == 'get':
+                    response = client.get(url, payload)
+                else:
+                    response = getattr(client, method)(url, payload, format='json')
+            transaction.set_rollback(True)
+        return response
+
+    # Counted with an execute wrapper: the test client resets connection.queries on every request.
+    queries = []
+    response = call(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args))
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return {
+        'status': response.status_code,
+        'latency_ms': round(statistics.median(timings) * 1000, 2),
+        'queries': len(queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_routes(repeat=5):
+    """{case label: measurements} for every case, against the data currently in the database."""
+    fixture = build_fixture()
+    # The typeahead index is per process; rebuild it from this size's data.
+    typeahead_index.reset()
+    client = APIClient(raise_request_exception=False)
+    with stub_providers():
+        return {case_label(case): run_case(client, case, fixture, repeat) for case in ROUTE_CASES}
+
+
+def find_regressions(results, baseline, threshold, min_latency_ms=2.0, min_peak_kb=256):
+    """
+    Regressions of `results` against `baseline` (both {size: {case: measurements}}):
+    any change of status or increase in query count, and latency or peak
+    memory growing by more than `threshold` times (ignoring differences below
+    `min_latency_ms` / `min_peak_kb`, which are noise).
+    """
+    regressions = []
+    for size, cases in results.items():
+        for label, current in cases.items():
+            previous = baseline.get(size, {}).get(label)
+            if previous is None:
+                continue
+            where = f"{size} {label}"
+            if current['status'] != previous['status']:
+                regressions.append(f"{where}: status {previous['status']} -> {current['status']}")
+            if current['queries'] > previous['queries']:
+                regressions.append(f"{where}: queries {previous['queries']} -> {current['queries']}")
+            for metric, floor in (('latency_ms', min_latency_ms), ('peak_kb', min_peak_kb)):
+                if current[metric] > previous[metric] * threshold and current[metric] - previous[metric] > floor:
+                    regressions.append(f"{where}: {metric} {previous[metric]} -> {current[metric]}")
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
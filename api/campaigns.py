@@ -0,0 +1,157 @@
+import logging
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import User, Order, LoyaltyPoint, Notification, NotificationCampaign
+from .integrations import twilio_client, sendgrid_client, sendgrid_mail
+from .notifications import notifications_created
+
+logger = logging.getLogger(__name__)
+
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+
+def segment_queryset(segment):
+    """
+    Users matching a campaign segment. Supported keys (all optional, combined
+    with AND): `role`, `ordered_since` (a datetime) and `loyalty_tier` (a key
+    of settings.LOYALTY_TIERS).
+    """
+    queryset = User.objects.filter(is_active=True)
+    if segment.get('role'):
+        queryset = queryset.filter(role=segment['role'])
+    if segment.get('ordered_since'):
+        queryset = queryset.filter(Exists(
+            Order.objects.filter(user=OuterRef('pk'), created_at__gte=segment['ordered_since'])
+        ))
+    if segment.get('loyalty_tier'):
+        low, high = settings.LOYALTY_TIERS[segment['loyalty_tier']]
+        points = LoyaltyPoint.objects.filter(user=OuterRef('pk')).order_by().values('user').annotate(
+            total=Sum('points')
+        ).values('total')
+        queryset = queryset.annotate(total_points=Coalesce(Subquery(points), Value(0)))
+        queryset = queryset.filter(total_points__gte=low)
+        if high is not None:
+            queryset = queryset.filter(total_points__lt=high)
+    return queryset
+
+
+def stream_recipients(segment, chunk_size, after=0):
+    """Yields chunks of (id, email, phone_number), walking the primary key from `after`."""
+    queryset = segment_queryset(segment).order_by('id').values_list('id', 'email', 'phone_number')
+    last_id = after
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1][0]
+
+
+def send_email_batch(emails, message):
+    """
+    Sends one SendGrid request per 1000 recipients, each recipient in its
+    own personalization so addresses are not disclosed to each other.
+    Returns (delivered, failed).
+    """
+    client = sendgrid_client()
+    delivered = failed = 0
+    for start in range(0, len(emails), SENDGRID_MAX_PERSONALIZATIONS):
+        batch = emails[start:start + SENDGRID_MAX_PERSONALIZATIONS]
+        mail = sendgrid_mail(batch, message, is_multiple=True)
+        try:
+            client.send(mail)
+            delivered += len(batch)
+        except Exception as e:
+            logger.warning("Campaign email batch failed: %s", e)
+            failed += len(batch)
+    return delivered, failed
+
+
+def send_sms_batch(phone_numbers, message):
+    """Twilio has no multi-recipient send; reuse one client across the chunk."""
+    client = twilio_client()
+    delivered = failed = 0
+    for phone_number in phone_numbers:
+        try:
+            client.messages.create(body=message, from_=settings.TWILIO_PHONE_NUMBER, to=phone_number)
+            delivered += 1
+        except Exception as e:
+            logger.warning("Campaign SMS to %s failed: %s", phone_number, e)
+            failed += 1
+    return delivered, failed
+
+
+def deliver_chunk(campaign, chunk):
+    if campaign.type == 'email':
+        return send_email_batch([email for _, email, _ in chunk if email], campaign.message)
+    return send_sms_batch([phone for _, _, phone in chunk if phone], campaign.message)
+
+
+def runnable_campaigns():
+    """Queued campaigns, plus running ones whose worker stopped heartbeating."""
+    stale = timezone.now() - timedelta(seconds=settings.NOTIFICATION_CAMPAIGN_LEASE_SECONDS)
+    return NotificationCampaign.objects.filter(
+        Q(status='queued') | Q(status='running', heartbeat_at__lt=stale) | Q(status='running', heartbeat_at__isnull=True)
+    )
+
+
+def run_campaign(campaign_id):
+    """
+    Streams the campaign's segment in chunks, writing each chunk's
+    Notification rows with one bulk_create and handing the chunk to the
+    provider before reading the next, so memory is bounded by the chunk size.
+    Progress counters, the heartbeat and the last recipient are updated after
+    every chunk, so a campaign whose worker died is resumed where it stopped
+    (the chunk in flight may be sent twice). Every update is fenced on this
+    worker's last heartbeat: once another worker takes over, this one stops.
+    """
+    heartbeat = timezone.now()
+    claimed = runnable_campaigns().filter(id=campaign_id).update(
+        status='running', started_at=Coalesce('started_at', Value(heartbeat)), heartbeat_at=heartbeat
+    )
+    if not claimed:
+        return
+    campaign = NotificationCampaign.objects.get(id=campaign_id)
+
+    def advance(**fields):
+        nonlocal heartbeat
+        now = timezone.now()
+        updated = NotificationCampaign.objects.filter(id=campaign_id, status='running', heartbeat_at=heartbeat).update(
+            heartbeat_at=now, **fields
+        )
+        heartbeat = now
+        return updated
+
+    try:
+        for chunk in stream_recipients(campaign.segment, settings.NOTIFICATION_CAMPAIGN_CHUNK_SIZE, campaign.last_recipient_id):
+            notifications_created(Notification.objects.bulk_create([
+                Notification(user_id=user_id, message=campaign.message, type=campaign.type)
+                for user_id, _, _ in chunk
+            ]))
+            delivered, _ = deliver_chunk(campaign, chunk)
+            if not advance(
+                recipients=F('recipients') + len(chunk),
+                delivered=F('delivered') + delivered,
+                failed_deliveries=F('failed_deliveries') + len(chunk) - delivered,
+                last_recipient_id=chunk[-1][0],
+            ):
+                logger.warning("Notification campaign %s was taken over by another worker", campaign_id)
+                return
+        advance(status='completed', finished_at=timezone.now())
+    except Exception as e:
+        logger.exception("Notification campaign %s failed", campaign_id)
+        advance(status='failed', error=str(e), finished_at=timezone.now())
+
+
+def start_campaign(campaign_id):
+    def run():
+        try:
+            run_campaign(campaign_id)
+        finally:
+            connections.close_all()
+    threading.Thread(target=run, name=f"campaign-{campaign_id}", daemon=True).start()
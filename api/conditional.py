@@ -0,0 +1,171 @@
+"""
+ETags and conditional requests without serializing the body. A detail ETag
+is built from the row's updated_at (for orders, also the newest updated_at
+of the products their items embed). A list ETag is built from the path,
+the query string, the filtered row count (the same count pagination needs)
+and the newest updated_at. A matching If-None-Match is answered with 304
+before anything is serialized.
+
+JSON and msgpack bodies differ, so each ETag ends in the negotiated format
+("<version>-<format>"). If-Match only compares the version part, so a client
+may read one format and write another; PUT/PATCH/DELETE with a stale
+If-Match fail with 412 instead of overwriting a concurrent edit.
+"""
+import hashlib
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import Count, Max, Q
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from .models import Product, OrderItem, ArchivedOrderItem
+
+# Bump when a serializer's output changes, so clients don't keep bodies of the old shape.
+ETAG_SCHEMA = 1
+WRITE_METHODS = ('PUT', 'PATCH', 'DELETE')
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource has changed since it was fetched (If-Match does not match).'
+    default_code = 'precondition_failed'
+
+
+def make_etag(request, *parts):
+    digest = hashlib.blake2b(repr((ETAG_SCHEMA,) + parts).encode(), digest_size=12).hexdigest()
+    renderer = getattr(request, 'accepted_renderer', None)
+    return f'"{digest}-{renderer.format if renderer else "json"}"'
+
+
+def etag_version(etag):
+    return etag.removeprefix('W/').strip('"').rsplit('-', 1)[0]
+
+
+def product_etag(request, product):
+    return make_etag(request, 'product', product.pk, product.updated_at)
+
+
+def order_etag(request, order):
+    """For an order with items__product loaded (prefetched) already."""
+    products_updated_at = max((item.product.updated_at for item in order.items.all()), default=None)
+    archived_at = getattr(order, 'archived_at', None)
+    return make_etag(request, type(order).__name__, order.pk, order.updated_at, archived_at, products_updated_at)
+
+
+def query_parts(request):
+    return request.path, sorted((key, sorted(values)) for key, values in request.query_params.lists())
+
+
+def list_state(queryset):
+    return queryset.order_by().aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+
+
+def product_list_state(queryset):
+    """
+    `list_state` of a product list: the count pagination needs and the
+    newest updated_at of the products in it, in one aggregate. An edit (or
+    a checkout's stock update) then only changes the ETags of lists that
+    show the product.
+    """
+    return list_state(queryset)
+
+
+async def aproduct_list_state(queryset):
+    return await queryset.order_by().aaggregate(count=Count('pk'), last_modified=Max('updated_at'))
+
+
+def queryset_etag(request, state, *extra):
+    """ETag of a list page from the `list_state` of its filtered queryset."""
+    return make_etag(request, *query_parts(request), state['count'], state['last_modified'], *extra)
+
+
+def embedded_products_updated_at(orders, archived_orders):
+    """The newest updated_at of the products the orders' items embed."""
+    if not orders.query.where and not archived_orders.query.where:
+        # All orders (staff) embed nearly all products: the index lookup on every product is as good.
+        return Product.objects.aggregate(Max('updated_at'))['updated_at__max']
+    return Product.objects.filter(
+        Q(id__in=OrderItem.objects.filter(order__in=orders).values('product_id')) |
+        Q(id__in=ArchivedOrderItem.objects.filter(order__in=archived_orders).values('product_id'))
+    ).aggregate(Max('updated_at'))['updated_at__max']
+
+
+def order_list_etag(request, orders, archived_orders):
+    # Order bodies embed their products, so an edit of one of them changes the ETag.
+    hot = list_state(orders)
+    archived = archived_orders.order_by().aggregate(count=Count('pk'), last_modified=Max('archived_at'))
+    return make_etag(request, *query_parts(request), hot['count'], hot['last_modified'], archived['count'],
+                     archived['last_modified'], embedded_products_updated_at(orders, archived_orders))
+
+
+def is_not_modified(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    tags = parse_etags(header)
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def check_if_match(request, etag):
+    header = request.headers.get('If-Match')
+    if not header:
+        return
+    tags = parse_etags(header)
+    if '*' in tags:
+        return
+    # If-Match uses strong comparison: weak tags never match.
+    if not any(not tag.startswith('W/') and etag_version(tag) == etag_version(etag) for tag in tags):
+        raise PreconditionFailed()
+
+
+def not_modified_response(etag):
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+
+def conditional_response(request, etag, get_data):
+    """304 if the client's copy is current, else the body from `get_data()`; both carry the ETag."""
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return Response(get_data(), headers={'ETag': etag})
+
+
+class IfMatchMixin:
+    """
+    For generic detail views: PUT/PATCH/DELETE check If-Match against the
+    object's current ETag, with the row locked from the check until the
+    write commits, so of two clients editing the same version the second
+    gets 412. Subclasses define `get_etag(obj)`.
+    """
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not callable(getattr(cls, 'get_etag', None)):
+            raise ImproperlyConfigured(f"{cls.__name__} must define get_etag(obj).")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in WRITE_METHODS:
+            # Lock only the object's own row where the database can tell (not select_related ones).
+            queryset = queryset.select_for_update(of=('self',) if connection.features.has_select_for_update_of else ())
+        return queryset
+
+    def get_object(self):
+        obj = super().get_object()
+        if self.request.method in WRITE_METHODS:
+            check_if_match(self.request, self.get_etag(obj))
+        return obj
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            response = super().update(request, *args, **kwargs)
+        # The new version, so the client can send its next edit with If-Match.
+        response['ETag'] = self.updated_etag
+        return response
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.updated_etag = self.get_etag(serializer.instance)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
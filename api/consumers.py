@@ -1,28 +1,93 @@
-from channels.generic.websocket import AsyncWebsocketConsumer
-import json
-from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from .models import Order
+from .realtime import STAFF_ROLES, event_groups, order_group, staff_group, user_group
+
+# Close codes in the 4000-4999 range reserved for applications.
+CLOSE_UNAUTHENTICATED = 4401
+
+
+class OrderConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Order and payment events (api.realtime) for an authenticated socket. It
+    starts out subscribed to the user's own orders; clients then send
+
+        {"action": "subscribe", "order_id": 12}
+        {"action": "subscribe", "stream": "orders", "status": "pending"}  (staff)
+        {"action": "unsubscribe", ...same fields}
+
+    to follow one order they may see, or (staff) all orders or those
+    reaching one status.
+    """
 
-class OrderConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        self.group_name = 'orders'
-        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        self.subscriptions = set()
         await self.accept()
+        await self.join(user_group(self.user.id))
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
-
-    async def receive(self, text_data):
-        data = json.loads(text_data)
-        message = data.get('message')
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                'type': 'order_update',
-                'message': message
-            }
-        )
-
-    async def order_update(self, event):
-        await self.send(text_data=json.dumps({
-            'message': event['message']
-        }))
\ No newline at end of file
+        for group in getattr(self, 'subscriptions', ()):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def join(self, group):
+        self.subscriptions.add(group)
+        await self.channel_layer.group_add(group, self.channel_name)
+
+    async def receive_json(self, content):
+        action = content.get('action') if isinstance(content, dict) else None
+        if action not in ('subscribe', 'unsubscribe'):
+            await self.send_json({'type': 'error', 'error': "action must be 'subscribe' or 'unsubscribe'"})
+            return
+        group, error = await self.requested_group(content)
+        if error:
+            await self.send_json({'type': 'error', 'error': error})
+        elif action == 'subscribe':
+            if group not in self.subscriptions and \
+                    len(self.subscriptions) > settings.WEBSOCKETS['max_subscriptions']:
+                await self.send_json({'type': 'error', 'error': 'Too many subscriptions'})
+                return
+            await self.join(group)
+            await self.send_json({'type': 'subscribed', 'group': group})
+        else:
+            # The user's own group stays joined: it is what the socket was opened for.
+            if group in self.subscriptions and group != user_group(self.user.id):
+                self.subscriptions.discard(group)
+                await self.channel_layer.group_discard(group, self.channel_name)
+            await self.send_json({'type': 'unsubscribed', 'group': group})
+
+    async def requested_group(self, content):
+        """(group, None) for a subscription the user may make, else (None, error)."""
+        is_staff = self.user.role in STAFF_ROLES
+        if 'order_id' in content:
+            order_id = content['order_id']
+            if not isinstance(order_id, int) or isinstance(order_id, bool):
+                return None, 'order_id must be an integer'
+            if not is_staff and not await self.owns_order(order_id):
+                return None, 'Order not found'
+            return order_group(order_id), None
+        if content.get('stream') == 'orders':
+            if not is_staff:
+                return None, 'Only staff can subscribe to order streams'
+            order_status = content.get('status')
+            if order_status is not None and order_status not in dict(Order.STATUS_CHOICES):
+                return None, f"Unknown status {order_status}"
+            return staff_group(order_status), None
+        return None, "Give an order_id or \"stream\": \"orders\""
+
+    @database_sync_to_async
+    def owns_order(self, order_id):
+        return Order.objects.filter(id=order_id, user_id=self.user.id).exists()
+
+    def delivering_group(self, order_event):
+        """A socket in several of the event's groups gets it once, through the first of them it joined."""
+        return next((group for group in event_groups(order_event) if group in self.subscriptions), None)
+
+    async def order_events(self, event):
+        for order_event in event['events']:
+            if self.delivering_group(order_event) == event['group']:
+                await self.send_json({'type': 'order_event', **order_event})
@@ -0,0 +1,119 @@
+"""
+Admin dashboard aggregates behind a stale-while-revalidate cache. Each metric
+has a freshness budget (settings.DASHBOARD_CACHE['freshness'], seconds); a
+stale value is served at once while one background refresh recomputes it, so
+database load follows the refresh interval rather than the number of open
+dashboards. The refresh lock lives in the cache, so with a shared cache
+(CACHE_URL) refreshes are deduplicated across workers too.
+"""
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, models
+from django.utils import timezone
+from .models import User, Product, Order, OrderItem
+
+
+def sales_today():
+    start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    sales = Order.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1)).aggregate(
+        total_sales=models.Sum('total_amount')
+    )
+    return {"total_sales": sales['total_sales'] or 0}
+
+
+def best_sellers():
+    return list(OrderItem.objects.values('product__name').annotate(
+        total_quantity=models.Sum('quantity')
+    ).order_by('-total_quantity')[:5])
+
+
+def inventory_levels():
+    return list(Product.objects.all().values('name', 'stock_level'))
+
+
+def customer_activity():
+    return list(User.objects.filter(role='customer').annotate(
+        order_count=models.Count('orders')
+    ).values('username', 'order_count'))
+
+
+METRICS = {
+    'sales': sales_today,
+    'best_sellers': best_sellers,
+    'inventory': inventory_levels,
+    'customers': customer_activity,
+}
+
+
+def metric_key(name):
+    return f"dashboard:{name}"
+
+
+def refresh_lock_key(name):
+    return f"dashboard:{name}:refreshing"
+
+
+def refresh_metric(name):
+    value = METRICS[name]()
+    cache.set(metric_key(name), {'value': value, 'computed_at': time.time()}, settings.DASHBOARD_CACHE['max_age'])
+    return value
+
+
+def start_refresh(name):
+    """Recomputes a metric in a background thread unless a refresh of it is already running somewhere."""
+    if not cache.add(refresh_lock_key(name), 1, settings.DASHBOARD_CACHE['refresh_timeout']):
+        return False
+
+    def run():
+        try:
+            refresh_metric(name)
+        finally:
+            cache.delete(refresh_lock_key(name))
+            connections.close_all()
+    threading.Thread(target=run, name=f"dashboard-{name}", daemon=True).start()
+    return True
+
+
+def compute_missing(name):
+    """
+    Computes a metric with no cached value. Only one caller computes it; the
+    others wait for its result (up to refresh_timeout) instead of running the
+    same aggregate alongside it.
+    """
+    lock = refresh_lock_key(name)
+    deadline = time.monotonic() + settings.DASHBOARD_CACHE['refresh_timeout']
+    while not cache.add(lock, 1, settings.DASHBOARD_CACHE['refresh_timeout']):
+        time.sleep(0.05)
+        entry = cache.get(metric_key(name))
+        if entry is not None:
+            return entry['value']
+        if time.monotonic() > deadline:
+            return refresh_metric(name)
+    try:
+        return refresh_metric(name)
+    finally:
+        cache.delete(lock)
+
+
+def get_metrics(names):
+    """{name: value} for the given metrics, read from the cache in one round trip."""
+    freshness = settings.DASHBOARD_CACHE['freshness']
+    entries = cache.get_many([metric_key(name) for name in names])
+    now = time.time()
+    values = {}
+    for name in names:
+        entry = entries.get(metric_key(name))
+        if entry is None:
+            values[name] = compute_missing(name)
+            continue
+        if now - entry['computed_at'] > freshness[name]:
+            start_refresh(name)
+        values[name] = entry['value']
+    return values
+
+
+def get_metric(name):
+    return get_metrics([name])[name]
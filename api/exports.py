@@ -0,0 +1,180 @@
+import json
+import os
+import uuid
+from datetime import timedelta
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Order, OrderItem, Payment, LoyaltyPoint
+
+EXPORT_STATE_FILE = '_export_state.json'
+MONEY = pa.decimal128(10, 2)
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+
+class ExportTable:
+    """
+    One exported model. Tables with a `changed_field` are re-exported from
+    that timestamp's high-water mark, so updated rows are written again;
+    insert-only tables only export primary keys above the last one written.
+    Rows are partitioned by the local month of `month_field`.
+    """
+
+    def __init__(self, name, model, fields, month_field, changed_field=None, created_field=None):
+        self.name = name
+        self.model = model
+        self.lookups = [lookup for lookup, _ in fields]
+        self.schema = pa.schema([(lookup.replace('__', '_'), arrow_type) for lookup, arrow_type in fields])
+        self.month_column = month_field.replace('__', '_')
+        self.changed_field = changed_field
+        self.created_field = created_field or month_field
+
+    def queryset(self, state, cutoff):
+        queryset = self.model.objects.all()
+        if self.changed_field:
+            queryset = queryset.filter(**{f'{self.changed_field}__lt': cutoff})
+            if state.get('changed_since'):
+                queryset = queryset.filter(**{f'{self.changed_field}__gte': parse_datetime(state['changed_since'])})
+        else:
+            queryset = queryset.filter(**{f'{self.created_field}__lt': cutoff}, pk__gt=state.get('last_id', 0))
+        return queryset.order_by('pk')
+
+
+EXPORT_TABLES = [
+    ExportTable('orders', Order, [
+        ('id', pa.int64()), ('user_id', pa.int64()), ('total_amount', MONEY), ('payment_method', pa.string()),
+        ('status', pa.string()), ('created_at', TIMESTAMP), ('updated_at', TIMESTAMP), ('notes', pa.string()),
+    ], month_field='created_at', changed_field='updated_at'),
+    ExportTable('order_items', OrderItem, [
+        ('id', pa.int64()), ('order_id', pa.int64()), ('product_id', pa.int64()), ('quantity', pa.int64()),
+        ('price', MONEY), ('order__created_at', TIMESTAMP),
+    ], month_field='order__created_at'),
+    ExportTable('payments', Payment, [
+        ('id', pa.int64()), ('order_id', pa.int64()), ('amount', MONEY), ('transaction_id', pa.string()),
+        ('payment_method', pa.string()), ('status', pa.string()), ('updated_at', TIMESTAMP),
+        ('order__created_at', TIMESTAMP),
+    ], month_field='order__created_at', changed_field='updated_at'),
+    ExportTable('loyalty_points', LoyaltyPoint, [
+        ('id', pa.int64()), ('user_id', pa.int64()), ('points', pa.int64()), ('earned_at', TIMESTAMP),
+    ], month_field='earned_at'),
+]
+
+
+def record_batches(table, queryset, batch_size):
+    """Yields RecordBatches of `batch_size` rows, one primary key range query each."""
+    queryset = queryset.values_list(*table.lookups)
+    last_id = None
+    while True:
+        rows = list((queryset if last_id is None else queryset.filter(pk__gt=last_id))[:batch_size])
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, table.schema)],
+            schema=table.schema
+        )
+
+
+class MonthPartitionWriter:
+    """
+    Writes batches to `<table>/month=YYYY-MM/part-<run>.parquet`, one open
+    writer per month for the duration of a run. Files are written under a
+    temporary name and only renamed into place by `commit()`, so readers never
+    see a half-written file.
+    """
+
+    def __init__(self, root, table, run_id):
+        self.root = os.path.join(root, table.name)
+        self.table = table
+        self.run_id = run_id
+        self.writers = {}
+
+    def write(self, batch):
+        local = pc.cast(batch.column(self.table.month_column), pa.timestamp('us', tz=settings.TIME_ZONE))
+        months = pc.strftime(local, format='%Y-%m')
+        for month in pc.unique(months).to_pylist():
+            self.writer(month).write_batch(batch.filter(pc.equal(months, month)))
+
+    def writer(self, month):
+        if month not in self.writers:
+            directory = os.path.join(self.root, f'month={month}')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'part-{self.run_id}.parquet')
+            self.writers[month] = (pq.ParquetWriter(f'{path}.tmp', self.table.schema, compression='snappy'), path)
+        return self.writers[month][0]
+
+    def close(self):
+        for writer, _ in self.writers.values():
+            writer.close()
+
+    def commit(self):
+        self.close()
+        for _, path in self.writers.values():
+            os.replace(f'{path}.tmp', path)
+
+    def abort(self):
+        self.close()
+        for _, path in self.writers.values():
+            os.remove(f'{path}.tmp')
+
+
+def load_state(root):
+    try:
+        with open(os.path.join(root, EXPORT_STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(root, state):
+    path = os.path.join(root, EXPORT_STATE_FILE)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+
+def export_orders(root=None, batch_size=50000, settle_seconds=300, tables=None):
+    """
+    Exports every table in EXPORT_TABLES incrementally to Parquet under
+    `root` and returns {table name: rows written}.
+
+    Only rows older than `settle_seconds` are exported, so transactions
+    still in flight when the run starts are picked up by the next run rather
+    than skipped. A table's high-water mark is saved only after all its files
+    are in place; a failed run leaves the previous mark and no partial files.
+    Changed rows are appended again, so readers should keep the latest
+    `updated_at` per id.
+    """
+    root = root or settings.ORDER_EXPORT_DIR
+    os.makedirs(root, exist_ok=True)
+    state = load_state(root)
+    cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+    run_id = f"{cutoff:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    written = {}
+    for table in EXPORT_TABLES:
+        if tables and table.name not in tables:
+            continue
+        table_state = state.get(table.name, {})
+        writer = MonthPartitionWriter(root, table, run_id)
+        rows = 0
+        last_id = table_state.get('last_id', 0)
+        try:
+            for batch in record_batches(table, table.queryset(table_state, cutoff), batch_size):
+                writer.write(batch)
+                rows += batch.num_rows
+                last_id = max(last_id, batch.column('id')[-1].as_py())
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+        if table.changed_field:
+            state[table.name] = {'changed_since': cutoff.isoformat()}
+        else:
+            state[table.name] = {'last_id': last_id}
+        save_state(root, state)
+        written[table.name] = rows
+    return written
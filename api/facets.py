@@ -0,0 +1,68 @@
+import hashlib
+import time
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+FACET_FILTER_PARAMS = ('category', 'price_min', 'price_max', 'stock_available')
+PRICE_BUCKETS = [0, 50, 100, 500, 1000, 5000]
+FACET_CACHE_TIMEOUT = 300
+FACET_VERSION_KEY = 'product_facets:version'
+
+
+# Versions are seeded from the clock, so a version key lost to eviction never
+# restarts at a number whose cached entries may still be alive.
+def get_facet_version():
+    return cache.get_or_set(FACET_VERSION_KEY, time.time_ns, None)
+
+
+def bump_facet_version():
+    try:
+        cache.incr(FACET_VERSION_KEY)
+    except ValueError:
+        cache.set(FACET_VERSION_KEY, time.time_ns(), None)
+
+
+def facet_cache_key(params):
+    filters = '&'.join(f"{name}={params.get(name, '')}" for name in FACET_FILTER_PARAMS)
+    digest = hashlib.md5(filters.encode()).hexdigest()
+    return f"product_facets:{get_facet_version()}:{digest}"
+
+
+def price_ranges():
+    bounds = PRICE_BUCKETS + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def compute_product_facets(queryset):
+    """
+    Counts per category, per price bucket and in stock for a product queryset,
+    using one grouped query for categories and one aggregate for the rest.
+    """
+    queryset = queryset.order_by()
+    categories = queryset.values('category').annotate(count=Count('id')).order_by('-count', 'category')
+
+    aggregates = {'in_stock': Count('id', filter=Q(stock_level__gt=0))}
+    for index, (low, high) in enumerate(price_ranges()):
+        bucket = Q(price__gte=low)
+        if high is not None:
+            bucket &= Q(price__lt=high)
+        aggregates[f"price_{index}"] = Count('id', filter=bucket)
+    counts = queryset.aggregate(**aggregates)
+
+    return {
+        'categories': [{'category': row['category'], 'count': row['count']} for row in categories],
+        'price_ranges': [
+            {'min': low, 'max': high, 'count': counts[f"price_{index}"]}
+            for index, (low, high) in enumerate(price_ranges())
+        ],
+        'in_stock': counts['in_stock'],
+    }
+
+
+def product_facets(queryset, params):
+    key = facet_cache_key(params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_product_facets(queryset)
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
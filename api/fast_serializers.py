@@ -0,0 +1,151 @@
+import decimal
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.settings import api_settings, ISO_8601
+from .models import OrderItem, ArchivedOrderItem
+from .serializers import ProductSerializer, OrderItemSerializer, OrderSerializer
+
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField, serializers.ChoiceField,
+                      serializers.JSONField)
+
+
+def decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        return format(value.quantize(quantum, rounding=rounding, context=context), 'f')
+    return convert
+
+
+def datetime_converter(field, tz):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or tz is None or hasattr(field, 'timezone'):
+        return field.to_representation
+
+    def convert(value):
+        if timezone.is_naive(value):
+            return field.to_representation(value)
+        text = value.astimezone(tz).isoformat()
+        if text.endswith('+00:00'):
+            text = text[:-6] + 'Z'
+        return text
+    return convert
+
+
+class FastValuesSerializer:
+    """
+    Read-only counterpart of a ModelSerializer that works on `.values()` rows
+    instead of model instances. Converters are compiled once per instance from
+    the ModelSerializer's own fields, so the output matches its
+    `to_representation` exactly.
+
+    `nested` maps a nested single-object field to the fast serializer of the
+    related model (fetched through a join), `many` maps a nested list field to
+    `(fast serializer, models, foreign key column)` (fetched with one extra
+    query per page and model) and `string_related` maps a StringRelatedField
+    to the column holding its `__str__` value.
+    """
+    serializer_class = None
+    nested = {}
+    many = {}
+    string_related = {}
+
+    def __init__(self, prefix=''):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        self.prefix = prefix
+        self.entries = []
+        self.columns = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in self.many:
+                self.entries.append((name, 'many', None))
+            elif name in self.nested:
+                child = self.nested[name](prefix=f"{prefix}{field.source}__")
+                self.columns.extend(child.columns)
+                self.entries.append((name, 'nested', child))
+            elif name in self.string_related:
+                column = prefix + self.string_related[name]
+                self.columns.append(column)
+                self.entries.append((name, column, None))
+            else:
+                column = prefix + field.source
+                self.columns.append(column)
+                self.entries.append((name, column, self.build_converter(field, tz)))
+
+    def build_converter(self, field, tz):
+        if isinstance(field, serializers.DecimalField):
+            return decimal_converter(field)
+        if isinstance(field, serializers.DateTimeField):
+            return datetime_converter(field, tz)
+        if isinstance(field, PASSTHROUGH_FIELDS):
+            return None
+        raise ImproperlyConfigured(
+            f"{type(self).__name__} cannot serialize {type(field).__name__} '{field.field_name}' from values()."
+        )
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        children = {name: self.fetch_many(name, rows) for name in self.many}
+        return [self.to_representation(row, children) for row in rows]
+
+    def fetch_many(self, name, rows):
+        fast_class, models, foreign_key = self.many[name]
+        child = fast_class()
+        grouped = {row[f"{self.prefix}id"]: [] for row in rows}
+        if not grouped:
+            return grouped
+        for model in models:
+            queryset = model.objects.filter(**{f"{foreign_key}__in": list(grouped)}).order_by(foreign_key, 'id')
+            child_rows = list(queryset.values(foreign_key, *child.columns))
+            for child_row, data in zip(child_rows, child.serialize(child_rows)):
+                grouped[child_row[foreign_key]].append(data)
+        return grouped
+
+    def to_representation(self, row, children=None):
+        data = {}
+        for name, column, convert in self.entries:
+            if column == 'many':
+                data[name] = children[name][row[f"{self.prefix}id"]]
+            elif column == 'nested':
+                data[name] = None if row[f"{convert.prefix}id"] is None else convert.to_representation(row)
+            else:
+                value = row[column]
+                data[name] = value if value is None or convert is None else convert(value)
+        return data
+
+
+class FastProductSerializer(FastValuesSerializer):
+    serializer_class = ProductSerializer
+
+
+class FastOrderItemSerializer(FastValuesSerializer):
+    serializer_class = OrderItemSerializer
+    nested = {'product': FastProductSerializer}
+
+
+class FastOrderSerializer(FastValuesSerializer):
+    serializer_class = OrderSerializer
+    many = {'items': (FastOrderItemSerializer, [OrderItem], 'order_id')}
+    string_related = {'user': 'user__username'}
+
+
+class FastOrderHistorySerializer(FastOrderSerializer):
+    """
+    FastOrderSerializer for a union of hot and archived orders. Archived
+    orders keep their original ids, so items can be looked up in both tables.
+    """
+    many = {'items': (FastOrderItemSerializer, [OrderItem, ArchivedOrderItem], 'order_id')}
@@ -0,0 +1,148 @@
+"""
+Flash-sale stock. While a product's sale is active, checkouts take units from
+one of its StockShard rows with a guarded UPDATE inside the order
+transaction, so up to `shard_count` checkouts of the product proceed at once
+instead of queueing on the Product row, and a shard can never go below zero.
+Product.stock_level, which still counts the allocated units, is brought
+up to date by `reconcile_flash_sales` (run every few seconds during a sale).
+"""
+import random
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Product, FlashSale, StockShard
+from .facets import bump_facet_version
+
+
+def split_units(units, shard_count):
+    return [units // shard_count + (1 if index < units % shard_count else 0) for index in range(shard_count)]
+
+
+def start_flash_sale(product_id, shard_count=16, units=None, minutes=None):
+    """
+    Allocates `units` (default: all stock) of the product to a new sale
+    split over `shard_count` shards. The product row is locked while the
+    allocation is taken, so it can never exceed the stock on hand.
+    """
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product_id)
+        units = product.stock_level if units is None else min(units, product.stock_level)
+        sale = FlashSale.objects.create(
+            product=product, shard_count=shard_count, allocated=units,
+            ends_at=timezone.now() + timedelta(minutes=minutes) if minutes else None
+        )
+        StockShard.objects.bulk_create([
+            StockShard(sale=sale, index=index, remaining=remaining)
+            for index, remaining in enumerate(split_units(units, shard_count))
+        ])
+    return sale
+
+
+def active_flash_sales(product_ids):
+    """
+    {product_id: FlashSale} for the given products that are on sale. A sale
+    past `ends_at` is ended here instead of at the next reconciliation, so
+    its sold units are out of stock_level before checkouts fall back to it.
+    """
+    now = timezone.now()
+    sales = {}
+    for sale in FlashSale.objects.filter(product_id__in=product_ids, active=True):
+        if sale.ends_at is not None and sale.ends_at <= now:
+            reconcile_sale(sale, end=True)
+        else:
+            sales[sale.product_id] = sale
+    return sales
+
+
+def take_from_shard(shard_id, quantity):
+    return StockShard.objects.filter(pk=shard_id, remaining__gte=quantity).update(remaining=F('remaining') - quantity)
+
+
+def claim_flash_stock(sale, quantity):
+    """
+    Takes `quantity` units from one shard of the sale; must run inside the
+    order's transaction, which then holds that shard until it commits.
+    Where the database supports it, a shard no other checkout holds is tried
+    first; otherwise probing starts at a random shard so concurrent
+    checkouts spread out. When no single shard has enough left but the sale
+    as a whole does, the shards are rebalanced and the claim retried.
+    Returns False when the sale cannot cover the quantity.
+    """
+    candidates = StockShard.objects.filter(sale=sale, remaining__gte=quantity)
+    start = random.randrange(sale.shard_count)
+    shard_ids = [shard_id for shard_id, _ in sorted(
+        candidates.values_list('id', 'index'), key=lambda shard: (shard[1] - start) % sale.shard_count
+    )]
+    if shard_ids and connection.features.has_select_for_update_skip_locked:
+        shard_ids = list(candidates.select_for_update(skip_locked=True).values_list('id', flat=True)[:1]) + shard_ids
+    if any(take_from_shard(shard_id, quantity) for shard_id in shard_ids):
+        return True
+    return rebalance_shards(sale, min_remaining=quantity) and any(
+        take_from_shard(shard_id, quantity) for shard_id in candidates.values_list('id', flat=True)
+    )
+
+
+def rebalance_shards(sale, min_remaining=1):
+    """
+    Spreads the sale's remaining units evenly over its shards (locking them
+    all), so emptied shards get stock again; if that still leaves no shard
+    with `min_remaining` units but the sale has them, they are gathered into
+    the first shard. Returns whether some shard now holds `min_remaining`.
+    """
+    with transaction.atomic():
+        shards = list(StockShard.objects.select_for_update().filter(sale=sale).order_by('index'))
+        remaining = sum(shard.remaining for shard in shards)
+        allocation = split_units(remaining, len(shards))
+        if allocation and allocation[0] < min_remaining <= remaining:
+            allocation = [min_remaining] + split_units(remaining - min_remaining, len(shards) - 1)
+        for shard, units in zip(shards, allocation):
+            if shard.remaining != units:
+                shard.remaining = units
+                shard.save(update_fields=['remaining'])
+    return bool(allocation) and max(allocation) >= min_remaining
+
+
+def reconcile_sale(sale, end=False):
+    """
+    Subtracts the units sold since the last reconciliation from the product's
+    stock_level. With `end`, also closes the sale (its unsold units stay in
+    stock_level); the shards are locked first so checkouts still claiming
+    from them are counted. Returns the units reconciled.
+    """
+    with transaction.atomic():
+        sale = FlashSale.objects.select_for_update().get(pk=sale.pk)
+        shards = StockShard.objects.filter(sale=sale)
+        if end:
+            shards = shards.select_for_update()
+        sold = sale.allocated - sum(shards.values_list('remaining', flat=True))
+        delta = sold - sale.reconciled
+        if delta:
+            Product.objects.filter(pk=sale.product_id).update(
+                stock_level=F('stock_level') - delta, updated_at=timezone.now()
+            )
+            # update() skips post_save, which is what bumps the facets on a normal stock change.
+            transaction.on_commit(bump_facet_version)
+            sale.reconciled = sold
+        if end:
+            sale.active = False
+            shards.delete()
+        sale.save(update_fields=['reconciled', 'active'])
+    return delta
+
+
+def reconcile_flash_sales(end_sale_ids=()):
+    """
+    Reconciles every active sale and rebalances its shards; sales that are
+    sold out, past `ends_at` or listed in `end_sale_ids` are ended. Returns
+    {sale id: units reconciled}.
+    """
+    now = timezone.now()
+    reconciled = {}
+    for sale in FlashSale.objects.filter(active=True):
+        end = sale.id in end_sale_ids or (sale.ends_at is not None and sale.ends_at <= now) or \
+            not StockShard.objects.filter(sale=sale, remaining__gt=0).exists()
+        reconciled[sale.id] = reconcile_sale(sale, end=end)
+        if not end:
+            rebalance_shards(sale)
+    return reconciled
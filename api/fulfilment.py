@@ -0,0 +1,59 @@
+"""
+Bulk order status transitions for fulfilment. The orders are checked against
+ORDER_TRANSITIONS with one locking SELECT and moved with one UPDATE guarded
+on their current status; customer notifications are bulk-created and the
+order events published (api.realtime) once the transaction commits.
+"""
+from django.db import transaction
+from django.utils import timezone
+from .models import Order, Notification
+from .notifications import notifications_created
+from .realtime import order_event, publish_order_events
+
+# Target status -> statuses an order may move to it from. Cash orders are
+# never confirmed by a payment, so they ship straight from pending.
+ORDER_TRANSITIONS = {
+    'confirmed': ('pending',),
+    'shipped': ('pending', 'confirmed'),
+}
+
+STATUS_MESSAGES = {
+    'confirmed': "Your order {id} has been confirmed.",
+    'shipped': "Your order {id} has been shipped.",
+}
+
+
+def transition_orders(order_ids, target):
+    """
+    Moves the orders to `target`. Returns (ids moved, {id: reason} for the
+    ids skipped because they don't exist or can't move to `target`).
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    allowed = ORDER_TRANSITIONS[target]
+    skipped = {}
+    with transaction.atomic():
+        current = {
+            order_id: (order_status, user_id)
+            for order_id, order_status, user_id in Order.objects.select_for_update().filter(
+                id__in=order_ids
+            ).values_list('id', 'status', 'user_id')
+        }
+        moved = []
+        for order_id in order_ids:
+            if order_id not in current:
+                skipped[order_id] = 'not_found'
+            elif current[order_id][0] not in allowed:
+                skipped[order_id] = f"cannot move from {current[order_id][0]} to {target}"
+            else:
+                moved.append(order_id)
+        if moved:
+            Order.objects.filter(id__in=moved, status__in=allowed).update(status=target, updated_at=timezone.now())
+            notifications_created(Notification.objects.bulk_create([
+                Notification(user_id=current[order_id][1], message=STATUS_MESSAGES[target].format(id=order_id),
+                             type='SMS')
+                for order_id in moved
+            ]))
+            events = [order_event('order.status', order_id, current[order_id][1], target, f"Order {order_id} {target}")
+                      for order_id in moved]
+            transaction.on_commit(lambda: publish_order_events(events))
+    return moved, skipped
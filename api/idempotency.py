@@ -0,0 +1,134 @@
+"""
+Idempotency-Key support for endpoints with side effects (order creation,
+M-Pesa STK pushes). A client that retries with the same key gets the stored
+response of the first execution instead of a second order or charge.
+"""
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+POLL_INTERVAL = 0.1
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def claim(user, key, fingerprint):
+    """
+    Inserts a `processing` row for the key, or returns the existing one.
+    Returns (record, claimed). Expired rows are dropped and re-inserted, and
+    a `processing` row whose lease ran out (its worker died) is taken over.
+    """
+    config = settings.IDEMPOTENCY
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user, key=key, request_hash=fingerprint, locked_at=now,
+                expires_at=now + timedelta(hours=config['ttl_hours'])
+            )
+        return record, True
+    except IntegrityError:
+        pass
+    record = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if record is None:
+        return claim(user, key, fingerprint)
+    if record.expires_at <= now:
+        IdempotencyKey.objects.filter(pk=record.pk, expires_at=record.expires_at).delete()
+        return claim(user, key, fingerprint)
+    stale = record.locked_at <= now - timedelta(seconds=config['lease_seconds'])
+    if record.status == 'processing' and stale and record.request_hash == fingerprint:
+        taken = IdempotencyKey.objects.filter(
+            pk=record.pk, status='processing', locked_at=record.locked_at
+        ).update(locked_at=now)
+        if taken:
+            record.locked_at = now
+            return record, True
+    return record, False
+
+
+def wait_for_completion(record):
+    """Polls a key another request is processing until it completes, is released or the wait runs out."""
+    deadline = time.monotonic() + settings.IDEMPOTENCY['wait_seconds']
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None or record.status == 'completed':
+            return record
+    return record
+
+
+def idempotent(handler):
+    """
+    Wraps an APIView handler (post/put/patch). Requests without an
+    Idempotency-Key header run as usual. The first request with a key runs the
+    handler and stores its response for IDEMPOTENCY['ttl_hours']; server
+    errors and exceptions release the key so the client can retry. Later
+    requests with the key replay the stored response, wait for it while the
+    first is still running, or get 422 if they reuse the key for a different
+    request.
+    """
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return handler(view, request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response({"error": f"{HEADER} is too long"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        while True:
+            record, claimed = claim(request.user, key, fingerprint)
+            if claimed:
+                break
+            if record.request_hash != fingerprint:
+                return Response(
+                    {"error": f"{HEADER} was already used for a different request"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record.status == 'completed':
+                return replay(record)
+            record = wait_for_completion(record)
+            if record is None:
+                continue
+            if record.status == 'completed':
+                return replay(record)
+            response = Response(
+                {"error": "A request with this Idempotency-Key is still being processed"},
+                status=status.HTTP_409_CONFLICT
+            )
+            response['Retry-After'] = '1'
+            return response
+
+        try:
+            response = handler(view, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            record.status = 'completed'
+            record.response_status = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=['status', 'response_status', 'response_body'])
+        return response
+    return wrapper
@@ -0,0 +1,251 @@
+"""
+Product image variants. `manage.py process_product_images` fetches each
+product's original (http(s) from a public address, file:// inside
+PRODUCT_IMAGES['source_dir'], or an ingested original in MEDIA_ROOT) and
+writes resized WebP and JPEG copies for every size in
+settings.PRODUCT_IMAGES under names derived from their content
+(images/ab/abcdef….webp). A name never
+changes meaning, so the files are served with a year-long immutable
+Cache-Control, and unchanged outputs are never written twice.
+
+Variants are only rebuilt when the source changes: a new image_url is always
+processed, and `recheck` re-fetches the others and compares content hashes.
+"""
+import hashlib
+import io
+import ipaddress
+import os
+import socket
+from urllib.parse import unquote, urljoin, urlparse
+import certifi
+import urllib3
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.utils import timezone
+from django.views import static
+from .models import Product
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+# Pillow is imported where images are built, so web workers that only serve
+# the stored URLs never load it (see api.startup).
+
+
+class ImageSourceError(Exception):
+    pass
+
+
+def local_source_path(url):
+    """The regular file a file:// URL names, which must lie inside PRODUCT_IMAGES['source_dir']."""
+    root = settings.PRODUCT_IMAGES['source_dir']
+    if not root:
+        raise ImageSourceError(f"file:// image URLs are disabled (PRODUCT_IMAGE_SOURCE_DIR is not set): {url}")
+    root = os.path.realpath(root)
+    path = os.path.realpath(unquote(urlparse(url).path))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise ImageSourceError(f"{url} is not a file inside {root}")
+    return path
+
+
+def check_public_host(url):
+    """
+    Product image URLs are editable through the API, so the worker never
+    fetches from internal addresses. Returns the address to connect to:
+    the fetch must use it rather than resolve the name again, or a second
+    DNS answer could point it somewhere else.
+    """
+    parsed = urlparse(url)
+    if not parsed.hostname:
+        raise ImageSourceError(f"No host in {url}")
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(parsed.hostname, parsed.port, type=socket.SOCK_STREAM)]
+    except (socket.gaierror, UnicodeError) as exc:
+        raise ImageSourceError(f"Could not resolve {url}: {exc}")
+    for address in addresses:
+        if not ipaddress.ip_address(address.split('%')[0]).is_global:
+            raise ImageSourceError(f"{url} resolves to a non-public address ({address})")
+    return addresses[0]
+
+
+def pinned_pool(parsed, address):
+    """A connection pool to `address` that still uses the URL's hostname for SNI and the certificate check."""
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    timeout = settings.PRODUCT_IMAGES['fetch_timeout']
+    if parsed.scheme == 'https':
+        return urllib3.HTTPSConnectionPool(
+            address, port, timeout=timeout, server_hostname=parsed.hostname, assert_hostname=parsed.hostname,
+            cert_reqs='CERT_REQUIRED', ca_certs=certifi.where(),
+        )
+    return urllib3.HTTPConnectionPool(address, port, timeout=timeout)
+
+
+def fetch_remote(url, limit):
+    """Downloads up to `limit` + 1 bytes, checking and pinning the address of every hop of a redirect."""
+    for _ in range(settings.PRODUCT_IMAGES['max_redirects'] + 1):
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https'):
+            raise ImageSourceError(f"Redirect to unsupported URL {url}")
+        address = check_public_host(url)
+        target = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+        with pinned_pool(parsed, address) as pool:
+            response = pool.urlopen('GET', target, headers={'Host': parsed.netloc.rpartition('@')[2]},
+                                    redirect=False, retries=0, preload_content=False)
+            try:
+                location = response.get_redirect_location()
+                if location:
+                    url = urljoin(url, location)
+                    continue
+                if response.status >= 400:
+                    raise ImageSourceError(f"Could not fetch {url}: HTTP {response.status}")
+                data = bytearray()
+                for chunk in response.stream(64 * 1024):
+                    data += chunk
+                    if len(data) > limit:
+                        break
+                return data
+            finally:
+                response.release_conn()
+    raise ImageSourceError(f"Too many redirects fetching {url}")
+
+
+def media_name(url):
+    """The storage name behind a MEDIA_URL address (relative or joined to MEDIA_BASE_URL), else None."""
+    for prefix in (urljoin(settings.MEDIA_BASE_URL, settings.MEDIA_URL), settings.MEDIA_URL):
+        if url.startswith(prefix):
+            return unquote(url[len(prefix):])
+    return None
+
+
+def fetch_original(url):
+    """Bytes of the original at `url`; media URLs are read from storage without a request."""
+    limit = settings.PRODUCT_IMAGES['max_source_bytes']
+    parsed = urlparse(url)
+    name = media_name(url)
+    if parsed.scheme == 'file' or name is not None:
+        try:
+            if parsed.scheme == 'file':
+                source = open(local_source_path(url), 'rb')
+            else:
+                source = default_storage.open(name)
+            with source:
+                data = source.read(limit + 1)
+        except (OSError, SuspiciousFileOperation) as exc:
+            raise ImageSourceError(f"Could not read {url}: {exc}")
+    elif parsed.scheme in ('http', 'https'):
+        try:
+            data = fetch_remote(url, limit)
+        except urllib3.exceptions.HTTPError as exc:
+            raise ImageSourceError(f"Could not fetch {url}: {exc}")
+    else:
+        raise ImageSourceError(f"Unsupported image URL {url}")
+    if len(data) > limit:
+        raise ImageSourceError(f"{url} is larger than {limit} bytes")
+    return bytes(data)
+
+
+def store(data, extension, folder='images'):
+    """Saves `data` under a name derived from its SHA-256 (once) and returns its URL."""
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"{folder}/{digest[:2]}/{digest}.{extension}"
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+    return default_storage.url(name)
+
+
+def encode(image, image_format, quality):
+    from PIL import Image
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, PIL_FORMATS[image_format], quality=quality, optimize=image_format == 'jpeg', progressive=True)
+    return buffer.getvalue()
+
+
+def build_variants(data):
+    """{variant: {format: url, 'width': ..., 'height': ...}} for an original image."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    config = settings.PRODUCT_IMAGES
+    sizes = sorted(config['variants'].items(), key=lambda variant: -variant[1])
+    try:
+        image = Image.open(io.BytesIO(data))
+        # Lets JPEG decode at a fraction of full size when the largest variant is much smaller.
+        image.draft('RGB', (sizes[0][1], sizes[0][1]))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise ImageSourceError(f"Unreadable image: {exc}")
+    variants = {}
+    # Each size is scaled down from the previous, larger one rather than from the original.
+    for name, edge in sizes:
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        variants[name] = {image_format: store(encode(image, image_format, quality), image_format)
+                          for image_format, quality in config['formats'].items()}
+        variants[name].update(width=image.width, height=image.height)
+    return variants
+
+
+def process_product_image(product, recheck=False, force=False):
+    """
+    Brings the product's variants up to date with its image_url and returns
+    whether anything changed. A source that can't be fetched or decoded
+    raises ImageSourceError and is not retried until image_url changes or
+    `recheck` is set.
+    """
+    url = product.image_url
+    products = Product.objects.filter(pk=product.pk)
+    if not url:
+        return bool(products.exclude(image_source_url__isnull=True).update(
+            image_variants={}, image_source_url=None, image_source_hash='', updated_at=timezone.now()
+        ))
+    if url == product.image_source_url and not recheck and not force:
+        return False
+    try:
+        data = fetch_original(url)
+        digest = hashlib.sha256(data).hexdigest()
+        if digest == product.image_source_hash and product.image_variants and not force:
+            products.update(image_source_url=url)
+            return False
+        variants = build_variants(data)
+    except ImageSourceError:
+        products.filter(image_url=url).update(image_variants={}, image_source_url=url, image_source_hash='',
+                                              updated_at=timezone.now())
+        raise
+    # Guarded on image_url, so an edit made while this ran is picked up by the next run instead of overwritten.
+    return bool(products.filter(image_url=url).update(
+        image_variants=variants, image_source_url=url, image_source_hash=digest, updated_at=timezone.now()
+    ))
+
+
+def products_needing_images(recheck=False):
+    """Products whose image_url changed since their variants were built (all with an image, if `recheck`)."""
+    if recheck:
+        return Product.objects.exclude(image_url__isnull=True).exclude(image_url='')
+    changed = Q(image_source_url__isnull=True) | ~Q(image_source_url=F('image_url'))
+    cleared = (Q(image_url__isnull=True) | Q(image_url='')) & Q(image_source_url__isnull=False)
+    return Product.objects.filter((~Q(image_url__isnull=True) & ~Q(image_url='') & changed) | cleared)
+
+
+def ingest_original(product, path):
+    """
+    Stores a local original under MEDIA_ROOT (content-addressed) and points
+    the product's image_url at it, as an absolute URL since the field is a URLField.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    extension = os.path.splitext(path)[1].lstrip('.').lower() or 'bin'
+    product.image_url = urljoin(settings.MEDIA_BASE_URL, store(data, extension, folder='originals'))
+    Product.objects.filter(pk=product.pk).update(image_url=product.image_url, updated_at=timezone.now())
+    return product.image_url
+
+
+def serve_media(request, path):
+    """Serves MEDIA_ROOT; content-addressed image variants get a year-long immutable Cache-Control."""
+    response = static.serve(request, path, document_root=settings.MEDIA_ROOT)
+    if path.startswith(('images/', 'originals/')):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,29 @@
+"""
+Provider SDK entry points. The SDKs are imported on first use so web
+workers that never send SMS or email, or never call Daraja, don't pay for
+loading them at startup (see api.startup).
+"""
+from django.conf import settings
+
+
+def twilio_client():
+    from twilio.rest import Client
+    return Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+
+def sendgrid_client():
+    from sendgrid import SendGridAPIClient
+    return SendGridAPIClient(settings.SENDGRID_API_KEY)
+
+
+def sendgrid_mail(to_emails, message, is_multiple=False):
+    from sendgrid.helpers.mail import Mail, To
+    if isinstance(to_emails, (list, tuple)):
+        to_emails = [To(email) for email in to_emails]
+    return Mail(
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to_emails=to_emails,
+        subject='BizHub Notification',
+        plain_text_content=message,
+        is_multiple=is_multiple
+    )
@@ -0,0 +1,172 @@
+import math
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit for one endpoint class, adjusted with AIMD on observed
+    latency: each request slower than the target shrinks the limit by 10%,
+    each on-target request that found the limit binding grows it by 1/limit
+    (about +1 per limit's worth of requests).
+    """
+
+    def __init__(self, name, priority, initial, min_limit, max_limit, target_latency):
+        self.name = name
+        self.priority = priority
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.latency = target_latency
+        self.inflight = 0
+        self.rejected = 0
+
+    def on_complete(self, latency, was_saturated):
+        self.latency = 0.8 * self.latency + 0.2 * latency
+        if latency > self.target_latency:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+        elif was_saturated:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+class Permit:
+    __slots__ = ('limit', 'started', 'was_saturated')
+
+    def __init__(self, limit, was_saturated):
+        self.limit = limit
+        self.started = time.monotonic()
+        self.was_saturated = was_saturated
+
+
+class LoadShedder:
+    """
+    Per-worker admission control shared by all threads of the process.
+
+    A request is admitted when its class is below its adaptive limit and the
+    worker's total in-flight count is below the share of `capacity` that the
+    class's priority may use (`headroom[priority]`), so low-priority classes
+    are shed well before checkout and callbacks run out of room.
+    """
+
+    def __init__(self, capacity, headroom, classes):
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.headroom = headroom
+        self.classes = {name: AdaptiveLimit(name, **options) for name, options in classes.items()}
+        self.inflight = 0
+
+    def try_acquire(self, name):
+        with self.lock:
+            limit = self.classes[name]
+            class_limit = max(limit.min_limit, math.floor(limit.limit))
+            if limit.inflight >= class_limit or self.inflight >= self.capacity * self.headroom[limit.priority]:
+                limit.rejected += 1
+                return None
+            limit.inflight += 1
+            self.inflight += 1
+            return Permit(limit, limit.inflight >= class_limit)
+
+    def release(self, permit):
+        latency = time.monotonic() - permit.started
+        with self.lock:
+            permit.limit.inflight -= 1
+            self.inflight -= 1
+            permit.limit.on_complete(latency, permit.was_saturated)
+
+    def retry_after(self, name):
+        return max(1, math.ceil(self.classes[name].latency))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {'limit': round(limit.limit, 2), 'inflight': limit.inflight,
+                       'latency': round(limit.latency, 4), 'rejected': limit.rejected}
+                for name, limit in self.classes.items()
+            }
+
+
+_shedder = None
+_shedder_lock = threading.Lock()
+
+
+def get_load_shedder():
+    global _shedder
+    if _shedder is None:
+        with _shedder_lock:
+            if _shedder is None:
+                config = settings.LOAD_SHEDDING
+                _shedder = LoadShedder(config['capacity'], config['headroom'], config['classes'])
+    return _shedder
+
+
+class LoadSheddingMiddleware:
+    """
+    Rejects requests with 503 and Retry-After when their endpoint class is
+    saturated. Views pick their class with a `load_class` attribute, either a
+    name or {method: name} (other methods then use 'default'); views without
+    one use 'default'. Runs natively in both sync and async chains,
+    so it does not pin a thread to requests served by async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response, shedder=None):
+        self.get_response = get_response
+        self.shedder = shedder
+        self.view_classes = {}
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        shedder, permit, rejection = self.admit(request)
+        if rejection is not None:
+            return rejection
+        try:
+            return self.get_response(request)
+        finally:
+            if permit is not None:
+                shedder.release(permit)
+
+    async def __acall__(self, request):
+        shedder, permit, rejection = self.admit(request)
+        if rejection is not None:
+            return rejection
+        try:
+            return await self.get_response(request)
+        finally:
+            if permit is not None:
+                shedder.release(permit)
+
+    def admit(self, request):
+        """Returns (shedder, permit, None), or a 503 response as the third item when the request is shed."""
+        if not settings.LOAD_SHEDDING['enabled']:
+            return None, None, None
+        name = self.classify(request)
+        if name is None:
+            return None, None, None
+
+        shedder = self.shedder or get_load_shedder()
+        permit = shedder.try_acquire(name)
+        if permit is None:
+            response = JsonResponse({"error": "Server is busy, please retry later"}, status=503)
+            response['Retry-After'] = str(shedder.retry_after(name))
+            return shedder, None, response
+        return shedder, permit, None
+
+    def classify(self, request):
+        try:
+            func = resolve(request.path_info).func
+        except Resolver404:
+            return None
+        if func not in self.view_classes:
+            view_class = getattr(func, 'view_class', None) or getattr(func, 'cls', None)
+            self.view_classes[func] = getattr(view_class, 'load_class', 'default')
+        load_class = self.view_classes[func]
+        return load_class.get(request.method, 'default') if isinstance(load_class, dict) else load_class
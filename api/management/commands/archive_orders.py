@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.archive import archive_candidates, archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Moves old orders in a terminal state, with their items and payments, to the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+                            help='Archive orders created more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders moved per transaction.')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many orders would be archived.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archive_candidates(options['days']).count()
+            self.stdout.write(f"{count} orders would be archived.")
+            return
+
+        batches = archive_orders(options['days'], options['batch_size'], options['max_batches'])
+        orders = sum(batch.orders for batch in batches)
+        items = sum(batch.items for batch in batches)
+        payments = sum(batch.payments for batch in batches)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {orders} orders, {items} items and {payments} payments in {len(batches)} batches."
+        ))
@@ -0,0 +1,164 @@
+import re
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from api.models import User, Product, Order, OrderItem, Payment, Notification, LoyaltyPoint
+
+FULL_SCAN_PATTERNS = {
+    'mysql': re.compile(r'"access_type":\s*"ALL"'),
+    'postgresql': re.compile(r'Seq Scan'),
+    'sqlite': re.compile(r'\bSCAN \w+(?! USING)\s*$', re.MULTILINE),
+}
+FILESORT_PATTERNS = {
+    'mysql': re.compile(r'"using_filesort":\s*true'),
+    'postgresql': re.compile(r'\bSort\b(?! Key)'),
+    'sqlite': re.compile(r'USE TEMP B-TREE'),
+}
+
+
+class Command(BaseCommand):
+    help = "Runs every API view's representative querysets through EXPLAIN and proposes indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1000,
+                            help='Rows per table to seed inside a rolled-back transaction (0 to use existing data).')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full EXPLAIN output.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+            findings = self.audit(options['verbose_plans'])
+            transaction.set_rollback(True)
+
+        proposals = {}
+        for finding in findings:
+            if finding['proposal']:
+                model, fields = finding['proposal']
+                proposals.setdefault((model.__name__, tuple(fields)), []).append(finding['view'])
+        self.stdout.write('')
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS('No missing indexes found.'))
+            return
+        self.stdout.write(self.style.WARNING('Proposed indexes:'))
+        for (model_name, fields), views in proposals.items():
+            self.stdout.write(f"  {model_name}: models.Index(fields={list(fields)!r})  # {', '.join(views)}")
+
+    def seed(self, size):
+        now = timezone.now()
+        categories = ['Electronics', 'Kitchen', 'Books', 'Toys', 'Garden']
+        User.objects.bulk_create([
+            User(username=f'audit_customer_{i}', email=f'audit{i}@bizhub.com', role='customer')
+            for i in range(max(size // 10, 1))
+        ])
+        customers = list(User.objects.filter(username__startswith='audit_customer_'))
+        Product.objects.bulk_create([
+            Product(name=f'Audit product {i}', price=Decimal(i % 5000) + Decimal('0.99'),
+                    stock_level=i % 50, category=categories[i % len(categories)])
+            for i in range(size)
+        ])
+        products = list(Product.objects.filter(name__startswith='Audit product '))
+        Order.objects.bulk_create([
+            Order(user=customers[i % len(customers)], total_amount=Decimal('100.00'),
+                  payment_method='M-Pesa', status='confirmed')
+            for i in range(size)
+        ])
+        orders = list(Order.objects.order_by('-id')[:size])
+        for offset, order in enumerate(orders):
+            order.created_at = now - timedelta(hours=offset)
+        Order.objects.bulk_update(orders, ['created_at'], batch_size=500)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[(i * 7) % len(products)], quantity=1, price=Decimal('100.00'))
+            for i, order in enumerate(orders)
+        ], batch_size=500)
+        Payment.objects.bulk_create([
+            Payment(order=order, amount=order.total_amount, payment_method='M-Pesa',
+                    transaction_id=f'ws_CO_audit_{order.id}', status='completed')
+            for order in orders
+        ], batch_size=500)
+        Notification.objects.bulk_create([
+            Notification(user=customers[i % len(customers)], message='Audit', type='SMS')
+            for i in range(size)
+        ], batch_size=500)
+        LoyaltyPoint.objects.bulk_create([
+            LoyaltyPoint(user=customers[i % len(customers)], points=10) for i in range(size)
+        ], batch_size=500)
+
+    def representative_querysets(self):
+        """
+        (view, model, queryset, index fields) for the queries each view issues.
+        Index fields are ordered equality columns first, then range, then sort
+        columns; None marks queries an index cannot help (full listings,
+        leading-wildcard LIKE, whole-table aggregates).
+        """
+        customer = User.objects.filter(role='customer').first()
+        start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        return [
+            ('ProductListCreateView (category + price)', Product,
+             Product.objects.filter(category='Electronics', price__gte=10, price__lte=500), ['category', 'price']),
+            ('ProductListCreateView (price range)', Product,
+             Product.objects.filter(price__gte=10, price__lte=500), ['price']),
+            ('ProductListCreateView (stock_available)', Product,
+             Product.objects.filter(stock_level__gt=0), ['stock_level']),
+            ('ProductSearchView', Product,
+             Product.objects.filter(Q(name__icontains='lap') | Q(category__icontains='lap')), None),
+            ('ProductDetailView', Product, Product.objects.filter(pk=1), ['id']),
+            ('LowStockView', Product, Product.objects.filter(reorder_gap__lte=0).order_by('reorder_gap'), ['reorder_gap']),
+            ('OrderListCreateView (customer)', Order, Order.objects.filter(user=customer), ['user']),
+            ('OrderListCreateView (low-stock admin lookup)', User,
+             User.objects.filter(role='admin').order_by('id')[:1], ['role']),
+            ('OrderDetailView', Order, Order.objects.filter(pk=1).prefetch_related('items'), ['id']),
+            ('MpesaPaymentView', Order, Order.objects.filter(pk=1, user=customer), ['id']),
+            ('MpesaCallbackView', Payment, Payment.objects.filter(transaction_id='ws_CO_audit_1'), ['transaction_id']),
+            ('NotificationInboxView', Notification,
+             Notification.objects.filter(user=customer).order_by('-sent_at', '-id')[:21], ['user', 'sent_at', 'id']),
+            ('NotificationUnreadCountView (cache miss)', Notification,
+             Notification.objects.filter(user=customer, read_at__isnull=True), ['user']),
+            ('LoyaltyPointView', LoyaltyPoint, LoyaltyPoint.objects.filter(user=customer), ['user']),
+            ('DashboardSalesView', Order,
+             Order.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1)), ['created_at']),
+            ('DashboardBestSellersView', OrderItem,
+             OrderItem.objects.values('product__name').annotate(total_quantity=Sum('quantity')).order_by('-total_quantity')[:5],
+             None),
+            ('DashboardInventoryView', Product, Product.objects.values('name', 'stock_level'), None),
+            ('DashboardCustomersView', User,
+             User.objects.filter(role='customer').annotate(order_count=Count('orders')).values('username', 'order_count'),
+             ['role']),
+        ]
+
+    def audit(self, verbose_plans):
+        vendor = connection.vendor
+        explain_options = {'format': 'json'} if vendor == 'mysql' else {}
+        findings = []
+        for view, model, queryset, index_fields in self.representative_querysets():
+            plan = queryset.explain(**explain_options)
+            full_scan = bool(FULL_SCAN_PATTERNS.get(vendor) and FULL_SCAN_PATTERNS[vendor].search(plan))
+            filesort = bool(FILESORT_PATTERNS.get(vendor) and FILESORT_PATTERNS[vendor].search(plan))
+            proposal = None
+            if index_fields and not self.has_index(model, index_fields):
+                proposal = (model, index_fields)
+
+            flags = [label for label, hit in (('FULL SCAN', full_scan), ('FILESORT', filesort)) if hit]
+            status = ', '.join(flags) if flags else 'ok'
+            line = f"{view}: {status}"
+            if flags and index_fields is None:
+                line += ' (no index can help; consider caching or a dedicated read path)'
+            self.stdout.write(self.style.WARNING(line) if flags else line)
+            if verbose_plans:
+                self.stdout.write('\n'.join(f"    {row}" for row in plan.splitlines()))
+            findings.append({'view': view, 'full_scan': full_scan, 'filesort': filesort, 'proposal': proposal})
+        return findings
+
+    def has_index(self, model, fields):
+        columns = [model._meta.get_field(name).column for name in fields]
+        field = model._meta.get_field(fields[0])
+        if len(fields) == 1 and (field.primary_key or field.unique or field.db_index):
+            return True
+        for index in model._meta.indexes:
+            indexed = [model._meta.get_field(name.lstrip('-')).column for name in index.fields]
+            if indexed[:len(columns)] == columns:
+                return True
+        return False
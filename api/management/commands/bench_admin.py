@@ -0,0 +1,93 @@
+import statistics
+import time
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from api.models import User, Order, OrderItem, Payment
+from api.synthetic import SIZES, clear_synthetic_data, generate_synthetic_data
+
+
+class Command(BaseCommand):
+    help = ('Times the admin changelist and change pages of orders, order items and payments on synthetic '
+            'data (seeded and rolled back), with the tuned admin classes and with a default ModelAdmin.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=list(SIZES), default='medium')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed loads per page; the median is reported.')
+        parser.add_argument('--max-default-form-rows', type=int, default=100000,
+                            help='Skip the default change forms when there are more orders than this.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            clear_synthetic_data()
+            generate_synthetic_data(SIZES[options['size']])
+            self.seed_payments()
+            superuser = User.objects.create_superuser('admin-bench', 'admin-bench@example.com', 'bench')
+            client = Client()
+            client.force_login(superuser)
+            pages = self.pages()
+            self.stdout.write(f"{'page':<48}{'tuned ms / queries':>22}{'default ms / queries':>24}")
+            # A default change form renders a <select> of every order (and user, product): hours at the large size.
+            default_forms = Order.objects.count() <= options['max_default_form_rows']
+            for label, model, url in pages:
+                tuned = self.measure(client, url, options['repeat'])
+                if url.endswith('/change/') and not default_forms:
+                    default = 'skipped'
+                else:
+                    default = self.format(self.with_default_admin(
+                        model, lambda: self.measure(client, url, options['repeat'])
+                    ))
+                self.stdout.write(f"{label:<48}{self.format(tuned):>22}{default:>24}")
+            transaction.set_rollback(True)
+
+    def seed_payments(self):
+        batch = []
+        for order_id, total in Order.objects.order_by().values_list('id', 'total_amount').iterator(chunk_size=5000):
+            batch.append(Payment(order_id=order_id, amount=total, payment_method='M-Pesa',
+                                 transaction_id=f'ws_CO_bench_{order_id}',
+                                 status=('completed', 'pending', 'failed')[order_id % 3]))
+            if len(batch) == 5000:
+                Payment.objects.bulk_create(batch)
+                batch = []
+        Payment.objects.bulk_create(batch)
+
+    def pages(self):
+        order = Order.objects.latest('id')
+        item = OrderItem.objects.latest('id')
+        payment = Payment.objects.latest('id')
+        pages = []
+        for name, obj in (('order', order), ('orderitem', item), ('payment', payment)):
+            base = f'/admin/api/{name}/'
+            pages += [
+                (f'{name} changelist', type(obj), base),
+                (f'{name} changelist page 100', type(obj), f'{base}?p=100'),
+                (f'{name} search by id', type(obj), f'{base}?q={obj.id}'),
+                (f'{name} change form', type(obj), f'{base}{obj.id}/change/'),
+            ]
+        pages.insert(2, ('order changelist ?status=pending', Order, '/admin/api/order/?status__exact=pending'))
+        pages.append(('payment changelist ?status=pending', Payment, '/admin/api/payment/?status__exact=pending'))
+        return pages
+
+    def measure(self, client, url, repeat):
+        timings = []
+        for _ in range(repeat):
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - start)
+        return response.status_code, statistics.median(timings) * 1000, len(queries)
+
+    def with_default_admin(self, model, run):
+        # The admin URLs are bound to the registered instance, so its class is swapped rather than the instance.
+        model_admin = admin.site._registry[model]
+        tuned, model_admin.__class__ = model_admin.__class__, admin.ModelAdmin
+        try:
+            return run()
+        finally:
+            model_admin.__class__ = tuned
+
+    def format(self, result):
+        status, ms, queries = result
+        return f"{ms:,.0f} / {queries}" if status == 200 else f"HTTP {status}"
@@ -0,0 +1,90 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from api.analytics import compute_sales_analytics, load_sales_frames
+from api.models import User, Product, Order, OrderItem
+
+CATEGORIES = ['Electronics', 'Clothing', 'Groceries', 'Home', 'Beauty', 'Toys', 'Books', 'Sports']
+PAYMENT_METHODS = ['Cash', 'M-Pesa', 'Card']
+
+
+class Command(BaseCommand):
+    help = ('Times the sales analytics computation on synthetic order lines and, optionally, '
+            'the full load from the database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=2000000, help='Synthetic order lines to aggregate.')
+        parser.add_argument('--customers', type=int, default=100000, help='Distinct customers in the synthetic data.')
+        parser.add_argument('--days', type=int, default=365, help='Days the synthetic orders are spread over.')
+        parser.add_argument('--db-lines', type=int, default=0,
+                            help='Also seed this many order lines (rolled back) and time loading them from the database.')
+
+    def handle(self, *args, **options):
+        lines, orders = self.synthetic_frames(options['lines'], options['customers'], options['days'])
+        elapsed = self.timed(lambda: compute_sales_analytics(lines, orders))
+        self.stdout.write(
+            f"compute: {len(lines):,} lines, {len(orders):,} orders in {elapsed:.2f}s "
+            f"({len(lines) / elapsed:,.0f} lines/s)"
+        )
+        if options['db_lines']:
+            with transaction.atomic():
+                start, end = self.seed(options['db_lines'], options['days'])
+                elapsed = self.timed(lambda: compute_sales_analytics(*load_sales_frames(start, end)))
+                self.stdout.write(
+                    f"load + compute: {options['db_lines']:,} database lines in {elapsed:.2f}s "
+                    f"({options['db_lines'] / elapsed:,.0f} lines/s)"
+                )
+                transaction.set_rollback(True)
+
+    def timed(self, func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    def synthetic_frames(self, line_count, customers, days):
+        rng = np.random.default_rng(42)
+        order_count = max(1, line_count // 3)
+        first_day = np.datetime64(timezone.localdate() - timedelta(days=days - 1))
+        orders = pd.DataFrame({
+            'user_id': rng.integers(1, customers + 1, order_count),
+            'day': first_day + rng.integers(0, days, order_count).astype('timedelta64[D]'),
+            'total': rng.uniform(5, 500, order_count).round(2),
+        })
+        order_index = rng.integers(0, order_count, line_count)
+        lines = pd.DataFrame({
+            'day': orders['day'].to_numpy()[order_index],
+            'category': pd.Categorical.from_codes(rng.integers(0, len(CATEGORIES), line_count), CATEGORIES),
+            'payment_method': pd.Categorical.from_codes(rng.integers(0, len(PAYMENT_METHODS), line_count), PAYMENT_METHODS),
+            'revenue': rng.uniform(1, 200, line_count).round(2),
+        })
+        return lines, orders
+
+    def seed(self, line_count, days):
+        User.objects.bulk_create([
+            User(username=f'bench_analytics_{i}', email=f'bench{i}@bizhub.com') for i in range(max(1, line_count // 10))
+        ], batch_size=1000)
+        users = list(User.objects.filter(username__startswith='bench_analytics_'))
+        Product.objects.bulk_create([
+            Product(name=f'Bench analytics {category}', price=Decimal('10.00'), category=category)
+            for category in CATEGORIES
+        ])
+        products = list(Product.objects.filter(name__startswith='Bench analytics '))
+        Order.objects.bulk_create([
+            Order(user=users[i % len(users)], total_amount=Decimal('30.00'),
+                  payment_method=PAYMENT_METHODS[i % len(PAYMENT_METHODS)], notes='bench_analytics')
+            for i in range(max(1, line_count // 3))
+        ], batch_size=1000)
+        orders = list(Order.objects.filter(notes='bench_analytics').values_list('id', flat=True))
+        now = timezone.now()
+        for day in range(days):
+            Order.objects.filter(id__in=orders[day::days]).update(created_at=now - timedelta(days=day))
+        OrderItem.objects.bulk_create([
+            OrderItem(order_id=orders[i % len(orders)], product=products[i % len(products)], quantity=1, price=Decimal('10.00'))
+            for i in range(line_count)
+        ], batch_size=1000)
+        return timezone.localdate() - timedelta(days=days - 1), timezone.localdate()
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from api.models import User, Product
+
+BENCH_PREFIX = 'Async bench product '
+
+
+class Command(BaseCommand):
+    help = ('Compares sustained concurrency, throughput and p99 latency of the sync (DRF) and async '
+            'read views, driving the ASGI application in-process with concurrent clients.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000, help='Products to seed (deleted afterwards).')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200, 800],
+                            help='Concurrent clients, each sending requests back to back.')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per run.')
+        parser.add_argument('--db-latency-ms', type=float, default=0.0,
+                            help='Added to every query, to model a database across the network.')
+
+    def handle(self, *args, **options):
+        staff, product_ids = self.seed(options['products'])
+        auth = [(b'authorization', f'Bearer {AccessToken.for_user(staff)}'.encode())]
+        paths = [('/api/products/search/?q=bench', [])] + [
+            (f'/api/products/{product_id}/', auth) for product_id in product_ids[:50]
+        ] + [('/api/products/?category=AsyncBench&page=2', auth)]
+
+        latency = options['db_latency_ms'] / 1000
+
+        def add_latency(sender, connection, **kwargs):
+            connection.execute_wrappers.append(lambda execute, *args: (time.sleep(latency), execute(*args))[1])
+
+        if latency:
+            connection_created.connect(add_latency)
+        try:
+            application = get_asgi_application()
+            for concurrency in options['concurrency']:
+                for mode in ('sync', 'async'):
+                    with override_settings(ASYNC_READS=mode == 'async',
+                                           LOAD_SHEDDING={**settings.LOAD_SHEDDING, 'enabled': False}):
+                        result = asyncio.run(self.run_load(application, paths, concurrency, options['duration']))
+                    self.report(mode, concurrency, result)
+        finally:
+            connection_created.disconnect(add_latency)
+            Product.objects.filter(name__startswith=BENCH_PREFIX).delete()
+            staff.delete()
+
+    def seed(self, count):
+        staff = User.objects.create_user(username='async_bench_staff', password='bench', role='staff')
+        Product.objects.bulk_create([
+            Product(name=f'{BENCH_PREFIX}{i}', description='Benchmark product', price=Decimal(i % 500) + Decimal('0.99'),
+                    stock_level=i % 40, category='AsyncBench', image_url=f'https://example.com/{i}.jpg')
+            for i in range(count)
+        ], batch_size=500)
+        return staff, list(Product.objects.filter(name__startswith=BENCH_PREFIX).values_list('id', flat=True))
+
+    async def run_load(self, application, paths, concurrency, duration):
+        latencies, failures, peak_threads = [], 0, threading.active_count()
+        deadline = time.perf_counter() + duration
+
+        async def client(offset):
+            nonlocal failures
+            i = offset
+            while time.perf_counter() < deadline:
+                path, headers = paths[i % len(paths)]
+                start = time.perf_counter()
+                status = await self.get(application, path, headers)
+                latencies.append(time.perf_counter() - start)
+                failures += status != 200
+                i += 1
+
+        async def sample_threads():
+            nonlocal peak_threads
+            while time.perf_counter() < deadline:
+                peak_threads = max(peak_threads, threading.active_count())
+                await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        await asyncio.gather(sample_threads(), *(client(i) for i in range(concurrency)))
+        return np.array(latencies), failures, peak_threads, time.perf_counter() - started
+
+    async def get(self, application, path, headers):
+        path, _, query = path.partition('?')
+        host = next((host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), 'localhost')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+            'headers': [(b'host', host.encode())] + headers, 'client': ('127.0.0.1', 50000), 'server': (host, 80),
+        }
+        body_read = False
+        statuses = []
+
+        async def receive():
+            nonlocal body_read
+            if not body_read:
+                body_read = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The client stays connected; Django cancels this wait once the response is sent.
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await application(scope, receive, send)
+        return statuses[0]
+
+    def report(self, mode, concurrency, result):
+        latencies, failures, peak_threads, elapsed = result
+        self.stdout.write(
+            f"{mode:>5} x{concurrency}: {len(latencies) / elapsed:,.0f} req/s, "
+            f"p50 {np.percentile(latencies, 50) * 1000:.1f} ms, p99 {np.percentile(latencies, 99) * 1000:.1f} ms, "
+            f"{failures} non-200, peak threads {peak_threads}"
+        )
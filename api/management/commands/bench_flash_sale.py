@@ -0,0 +1,131 @@
+import threading
+import time
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.flash_sales import start_flash_sale, reconcile_sale, rebalance_shards
+from api.models import User, Product, Order, OrderItem, Notification, LoyaltyPoint
+
+BENCH_PRODUCT = 'Flash bench product'
+BENCH_USERNAME = 'flash_bench_'
+
+
+class Command(BaseCommand):
+    help = ('Compares checkout throughput for one hot product on the normal single-row stock path and in '
+            'flash-sale mode, and checks that neither oversells.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32, help='Concurrent buyers.')
+        parser.add_argument('--orders', type=int, default=1500, help='Checkout attempts per run.')
+        parser.add_argument('--stock', type=int, default=1000,
+                            help='Units in stock; attempts beyond it must be rejected.')
+        parser.add_argument('--shards', type=int, default=16, help='Stock shards in flash-sale mode.')
+        parser.add_argument('--reconcile-every', type=float, default=1.0,
+                            help='Seconds between reconciliations during the flash-sale run.')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite allows one writer at a time, so both modes serialize on the database file here; '
+                'run against MySQL or PostgreSQL to see the effect of sharding.'
+            ))
+        product = Product.objects.create(
+            name=BENCH_PRODUCT, description='Benchmark product', price=Decimal('10.00'), stock_level=0,
+            category='FlashBench', image_url='https://example.com/flash.jpg', reorder_point=0
+        )
+        buyers = [User.objects.create_user(username=f'{BENCH_USERNAME}{i}', password='bench', role='customer')
+                  for i in range(options['threads'])]
+        try:
+            with override_settings(LOAD_SHEDDING={**settings.LOAD_SHEDDING, 'enabled': False}):
+                for mode in ('normal', 'flash'):
+                    self.reset(product, buyers, options['stock'])
+                    result = self.run(mode, product, buyers, options)
+                    self.report(mode, product, buyers, options['stock'], result)
+        finally:
+            self.reset(product, buyers, 0)
+            Notification.objects.filter(message__contains=BENCH_PRODUCT).delete()
+            product.delete()
+            User.objects.filter(username__startswith=BENCH_USERNAME).delete()
+
+    def reset(self, product, buyers, stock):
+        Order.objects.filter(user__in=buyers).delete()
+        LoyaltyPoint.objects.filter(user__in=buyers).delete()
+        product.flash_sales.all().delete()
+        Product.objects.filter(pk=product.pk).update(stock_level=stock)
+
+    def run(self, mode, product, buyers, options):
+        sale = start_flash_sale(product.id, options['shards']) if mode == 'flash' else None
+        attempts = iter(range(options['orders']))
+        lock = threading.Lock()
+        latencies, statuses = [], []
+        done = threading.Event()
+
+        def buyer(user):
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(user=user)
+            payload = {'user_id': user.id, 'payment_method': 'Cash', 'total_amount': '0.00',
+                       'items': [{'product_id': product.id, 'quantity': 1, 'price': '10.00'}]}
+            try:
+                while True:
+                    with lock:
+                        if next(attempts, None) is None:
+                            return
+                    start = time.perf_counter()
+                    response = client.post(reverse('order-list-create'), payload, format='json')
+                    with lock:
+                        latencies.append(time.perf_counter() - start)
+                        statuses.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        def reconciler():
+            try:
+                while not done.wait(options['reconcile_every']):
+                    try:
+                        reconcile_sale(sale)
+                        rebalance_shards(sale)
+                    except DatabaseError as exc:
+                        # A lock timeout just defers this pass to the next one.
+                        self.stderr.write(f"reconcile skipped: {exc}")
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buyer, args=(user,)) for user in buyers]
+        background = threading.Thread(target=reconciler) if sale else None
+        started = time.perf_counter()
+        for thread in threads + ([background] if background else []):
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        if background:
+            background.join()
+            reconcile_sale(sale, end=True)
+        return np.array(latencies), statuses, elapsed
+
+    def report(self, mode, product, buyers, stock, result):
+        latencies, statuses, elapsed = result
+        created = statuses.count(201)
+        rejected = statuses.count(400)
+        errors = len(statuses) - created - rejected
+        sold = sum(OrderItem.objects.filter(order__user__in=buyers).values_list('quantity', flat=True))
+        stock_level = Product.objects.get(pk=product.pk).stock_level
+        consistent = sold == created and sold <= stock and stock_level == stock - sold
+        self.stdout.write(
+            f"{mode:>6}: {created / elapsed:,.0f} orders/s, p50 {np.percentile(latencies, 50) * 1000:.1f} ms, "
+            f"p99 {np.percentile(latencies, 99) * 1000:.1f} ms; {created} sold, {rejected} rejected as out of "
+            f"stock, {errors} errors; stock_level {stock_level}"
+        )
+        if consistent:
+            self.stdout.write(self.style.SUCCESS(f"{mode:>6}: no oversell, stock_level matches units sold"))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f"{mode:>6}: inconsistent: {sold} units in orders, {created} orders created, "
+                f"stock {stock} -> {stock_level}"
+            ))
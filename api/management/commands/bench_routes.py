@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from api.benchmarks import (
+    ROUTE_CASES, case_label, expected_status, find_regressions, load_baseline, run_routes, save_baseline, uncovered_routes
+)
+from api.synthetic import SIZES, clear_synthetic_data, generate_synthetic_data
+
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-routes'}}
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks every API route at several synthetic data sizes (seeded and rolled back) and '
+            'fails on regressions against the stored baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium'])
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per route; the median is reported.')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'baseline.json'))
+        parser.add_argument('--threshold', type=float, default=1.5,
+                            help='Fail when latency or peak memory grows by more than this factor.')
+        parser.add_argument('--update-baseline', action='store_true', help='Store these results as the new baseline.')
+
+    def handle(self, *args, **options):
+        missing = uncovered_routes()
+        if missing:
+            raise CommandError(f"No benchmark case for: {', '.join(missing)} (add them to api.benchmarks.ROUTE_CASES)")
+
+        # The test client sends Host: testserver, which the deployed ALLOWED_HOSTS rejects.
+        bench_settings = override_settings(CACHES=BENCH_CACHES, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+        results = {}
+        for size in options['sizes']:
+            with bench_settings, transaction.atomic():
+                clear_synthetic_data()
+                generate_synthetic_data(SIZES[size])
+                results[size] = run_routes(options['repeat'])
+                transaction.set_rollback(True)
+        self.report(results, options['sizes'])
+
+        if options['update_baseline']:
+            save_baseline(options['baseline'], results)
+            self.stdout.write(f"Baseline written to {options['baseline']}")
+            return
+        regressions = find_regressions(results, load_baseline(options['baseline']), options['threshold'])
+        if regressions:
+            raise CommandError('Regressions against baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write('No regressions against baseline.')
+
+    def report(self, results, sizes):
+        self.stdout.write(f"{'route':<42}" + ''.join(f"{size + ' ms / queries / KB':>32}" for size in sizes))
+        for case in ROUTE_CASES:
+            label = case_label(case)
+            row = [results[size][label] for size in sizes]
+            cells = ''.join(f"{m['latency_ms']:>12.1f} {m['queries']:>6} {m['peak_kb']:>10.0f}  " for m in row)
+            flags = sorted({f"status {m['status']}" for m in row if m['status'] != expected_status(case)})
+            if row[-1]['queries'] > row[0]['queries']:
+                flags.append('queries grow with data')
+            self.stdout.write(f"{label:<42}{cells}{'  '.join(flags)}")
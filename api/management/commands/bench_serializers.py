@@ -0,0 +1,76 @@
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from api.models import User, Product, Order, OrderItem
+from api.serializers import ProductSerializer, OrderSerializer
+from api.fast_serializers import FastProductSerializer, FastOrderSerializer
+from api.renderers import OrjsonRenderer
+
+
+class Command(BaseCommand):
+    help = 'Compares rows per second of the ModelSerializer and fast values() serialization paths.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Products and orders to seed and serialize.')
+        parser.add_argument('--page-size', type=int, default=100, help='Rows per page, as served by the list endpoints.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per path; the best run is reported.')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            self.seed(rows)
+            products = Product.objects.filter(name__startswith='Bench product ').order_by('id')
+            orders = Order.objects.filter(notes='bench').order_by('id')
+            product_pages = self.pages(products, options['page_size'])
+            order_pages = self.pages(orders, options['page_size'])
+            self.report('products', options['repeat'], rows,
+                        lambda: [JSONRenderer().render(ProductSerializer(page.all(), many=True).data) for page in product_pages],
+                        lambda: [OrjsonRenderer().render(self.fast(FastProductSerializer(), page)) for page in product_pages])
+            self.report('orders', options['repeat'], rows,
+                        lambda: [JSONRenderer().render(OrderSerializer(page.select_related('user').prefetch_related('items__product'), many=True).data)
+                                 for page in order_pages],
+                        lambda: [OrjsonRenderer().render(self.fast(FastOrderSerializer(), page)) for page in order_pages])
+            transaction.set_rollback(True)
+
+    def pages(self, queryset, page_size):
+        ids = list(queryset.values_list('id', flat=True))
+        return [queryset.filter(id__gte=ids[start], id__lte=ids[min(start + page_size, len(ids)) - 1])
+                for start in range(0, len(ids), page_size)]
+
+    def fast(self, fast_serializer, queryset):
+        return fast_serializer.serialize(fast_serializer.values(queryset))
+
+    def seed(self, rows):
+        user = User.objects.create_user(username='bench_customer', email='bench@bizhub.com', password='bench')
+        Product.objects.bulk_create([
+            Product(name=f'Bench product {i}', description='Benchmark product', price=Decimal(i % 1000) + Decimal('0.99'),
+                    stock_level=i % 40, category='Bench', image_url=f'https://example.com/{i}.jpg')
+            for i in range(rows)
+        ], batch_size=500)
+        products = list(Product.objects.filter(name__startswith='Bench product '))
+        Order.objects.bulk_create([
+            Order(user=user, total_amount=Decimal('20.00'), payment_method='Cash', notes='bench') for _ in range(rows)
+        ], batch_size=500)
+        orders = list(Order.objects.filter(notes='bench'))
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[(i + offset) % len(products)], quantity=1, price=Decimal('10.00'))
+            for i, order in enumerate(orders) for offset in (0, 1)
+        ], batch_size=500)
+
+    def report(self, label, repeat, rows, standard, fast):
+        standard_rate = rows / self.best_time(standard, repeat)
+        fast_rate = rows / self.best_time(fast, repeat)
+        self.stdout.write(
+            f"{label}: ModelSerializer {standard_rate:,.0f} rows/s, "
+            f"fast path {fast_rate:,.0f} rows/s ({fast_rate / standard_rate:.1f}x)"
+        )
+
+    def best_time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
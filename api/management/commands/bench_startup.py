@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.startup import STARTUP_BUDGET, budget_violations, measure_startup, slowest_imports
+
+
+class Command(BaseCommand):
+    help = ('Measures worker cold start (Django setup plus the first request) and peak RSS in a fresh '
+            'interpreter, lists the slowest imports, and fails if the startup budget is exceeded.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Cold starts to measure; the best is reported.')
+        parser.add_argument('--top', type=int, default=15, help='Slowest top-level imports to list.')
+
+    def handle(self, *args, **options):
+        reports = [measure_startup()[0] for _ in range(options['repeat'])]
+        report = min(reports, key=lambda item: item['first_request_seconds'])
+        _, importtime = measure_startup(importtime=True)
+
+        self.stdout.write(
+            f"setup {report['setup_seconds']:.3f}s, first request {report['first_request_seconds']:.3f}s "
+            f"(status {report['status']}), peak RSS {report['peak_rss_mb']} MB "
+            f"(budget {STARTUP_BUDGET['first_request_seconds']}s, {STARTUP_BUDGET['peak_rss_mb']} MB)"
+        )
+        self.stdout.write('Slowest imports (cumulative):')
+        for name, microseconds in slowest_imports(importtime, options['top']):
+            self.stdout.write(f"  {microseconds / 1000:8.1f} ms  {name}")
+
+        problems = budget_violations(report)
+        if problems:
+            raise CommandError('; '.join(problems))
@@ -0,0 +1,77 @@
+import sys
+import time
+import tracemalloc
+import numpy as np
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+from api.typeahead import PrefixIndex, typeahead_index
+from api.views import ProductAutocompleteView
+
+BRANDS = ['Acme', 'Zuri', 'Tembo', 'Safari', 'Baraka', 'Nuru', 'Jua', 'Simba', 'Kifaru', 'Upendo']
+ADJECTIVES = ['red', 'blue', 'classic', 'premium', 'compact', 'organic', 'wireless', 'large', 'mini', 'smart',
+              'cotton', 'steel', 'family', 'travel', 'kids']
+NOUNS = ['phone', 'laptop', 'kettle', 'blender', 'shirt', 'dress', 'rice', 'flour', 'sofa', 'lamp', 'lotion',
+         'shampoo', 'football', 'backpack', 'charger', 'speaker', 'notebook', 'pen', 'tyre', 'helmet']
+CATEGORIES = ['Electronics', 'Clothing', 'Groceries', 'Home', 'Beauty', 'Toys', 'Books', 'Sports']
+
+
+class Command(BaseCommand):
+    help = ('Measures the typeahead prefix index: build time and memory for N products, and lookup latency '
+            'for the index alone and through the autocomplete view.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=200000)
+        parser.add_argument('--lookups', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        count = options['products']
+        names = [
+            f"{BRANDS[b]} {ADJECTIVES[a]} {NOUNS[n]} {model}"
+            for b, a, n, model in zip(rng.integers(0, len(BRANDS), count), rng.integers(0, len(ADJECTIVES), count),
+                                      rng.integers(0, len(NOUNS), count), rng.integers(100, 99999, count))
+        ]
+        rows = [(i + 1, name, CATEGORIES[i % len(CATEGORIES)]) for i, name in enumerate(names)]
+
+        started = time.perf_counter()
+        index = PrefixIndex(rows)
+        build_seconds = time.perf_counter() - started
+        # Built again for the memory figures, as tracing slows every allocation down.
+        tracemalloc.start()
+        traced = PrefixIndex(rows)
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del traced
+        # The name strings are shared with `rows` here, so not traced; from the database they are the index's own.
+        size += sum(sys.getsizeof(name) for name in names)
+        self.stdout.write(
+            f"{count:,} products, {len(index.entries):,} entries: built in {build_seconds:.2f}s, "
+            f"{size / 2 ** 20:.1f} MB held with the names (entries {index.entries.itemsize * len(index.entries) / 2 ** 20:.1f} MB), "
+            f"{peak / 2 ** 20:.1f} MB peak while building"
+        )
+
+        # Prefixes of 1-6 characters taken from random words of random names, as typed.
+        words = [name.split()[i % 4].lower() for i, name in zip(rng.integers(0, 4, options['lookups']),
+                                                                   rng.choice(names, options['lookups']))]
+        prefixes = [word[:length] for word, length in zip(words, rng.integers(1, 7, len(words)))]
+        self.report('index', [self.time(lambda: index.search(prefix, 10)) for prefix in prefixes])
+
+        typeahead_index.index, typeahead_index.checked_at = index, time.monotonic() + 3600
+        view = ProductAutocompleteView.as_view()
+        factory = APIRequestFactory()
+        requests = [factory.get('/api/products/autocomplete/', {'q': prefix}) for prefix in prefixes[:5000]]
+        try:
+            self.report('view', [self.time(lambda: view(request).render()) for request in requests])
+        finally:
+            typeahead_index.reset()
+
+    def time(self, call):
+        started = time.perf_counter()
+        call()
+        return time.perf_counter() - started
+
+    def report(self, label, latencies):
+        latencies = np.array(latencies) * 1e6
+        self.stdout.write(f"{label:>5}: p50 {np.percentile(latencies, 50):.0f} µs, "
+                          f"p99 {np.percentile(latencies, 99):.0f} µs over {len(latencies):,} lookups")
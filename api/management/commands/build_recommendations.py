@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = ('Updates the product co-occurrence matrix with orders placed since the last run and refreshes '
+            '"frequently bought together" recommendations.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.RECOMMENDATIONS_DIR,
+                            help='Directory holding the co-occurrence matrix between runs.')
+        parser.add_argument('--rebuild', action='store_true', help='Rebuild the matrix from all orders.')
+        parser.add_argument('--settle-seconds', type=int, default=300,
+                            help='Leave orders newer than this for the next run.')
+
+    def handle(self, *args, **options):
+        orders, products = build_recommendations(options['output'], options['rebuild'], options['settle_seconds'])
+        self.stdout.write(self.style.SUCCESS(f"Added {orders} orders, refreshed {products} products."))
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.reorder import update_reorder_points
+
+
+class Command(BaseCommand):
+    help = 'Recomputes daily demand and reorder points for every product from recent order lines.'
+
+    def add_arguments(self, parser):
+        config = settings.INVENTORY_REORDER
+        parser.add_argument('--lookback-days', type=int, default=config['lookback_days'],
+                            help='Days of order history used to measure demand.')
+        parser.add_argument('--lead-time-days', type=int, default=config['lead_time_days'],
+                            help='Days of demand the reorder point must cover.')
+        parser.add_argument('--service-level-z', type=float, default=config['service_level_z'],
+                            help='Standard deviations of demand held as safety stock.')
+
+    def handle(self, *args, **options):
+        products, updated = update_reorder_points(
+            options['lookback_days'], options['lead_time_days'], options['service_level_z']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {products} products, updated {updated}."))
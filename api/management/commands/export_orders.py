@@ -0,0 +1,30 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.exports import EXPORT_TABLES, export_orders
+
+
+class Command(BaseCommand):
+    help = ('Incrementally exports orders, order items, payments and loyalty points to Parquet files '
+            'partitioned by month.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.ORDER_EXPORT_DIR, help='Export directory.')
+        parser.add_argument('--batch-size', type=int, default=50000, help='Rows read and written per batch.')
+        parser.add_argument('--settle-seconds', type=int, default=300,
+                            help='Leave rows newer than this for the next run.')
+        parser.add_argument('--table', action='append', choices=[table.name for table in EXPORT_TABLES],
+                            help='Only export this table (repeatable).')
+        parser.add_argument('--every', type=int, default=None,
+                            help='Keep running, exporting every this many minutes.')
+
+    def handle(self, *args, **options):
+        while True:
+            written = export_orders(options['output'], options['batch_size'], options['settle_seconds'],
+                                    options['table'])
+            self.stdout.write(self.style.SUCCESS(
+                'Exported ' + ', '.join(f"{rows} {name}" for name, rows in written.items()) + '.'
+            ))
+            if options['every'] is None:
+                return
+            time.sleep(options['every'] * 60)
@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api.synthetic import SIZES, Volumes, clear_synthetic_data, generate_synthetic_data
+
+
+class Command(BaseCommand):
+    help = ('Seeds deterministic synthetic products, customers, orders, order items, loyalty points and '
+            'notifications with realistic skew (see api.synthetic).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=list(SIZES), default='medium',
+                            help='Preset volumes; large is 200k products, 50k customers, 1M orders, ~3M items.')
+        parser.add_argument('--volumes', help="Explicit 'products:customers:orders:items[:days]', overriding --size.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated data first.')
+        parser.add_argument('--clear-only', action='store_true', help='Only delete previously generated data.')
+
+    def handle(self, *args, **options):
+        if options['clear'] or options['clear_only']:
+            self.stdout.write(f"Deleted {clear_synthetic_data()} synthetic rows")
+            if options['clear_only']:
+                return
+        volumes = Volumes.parse(options['volumes']) if options['volumes'] else SIZES[options['size']]
+        start = time.perf_counter()
+        try:
+            counts = generate_synthetic_data(volumes, seed=options['seed'])
+        except ValueError as e:
+            raise CommandError(f"{e} (use --clear)")
+        self.stdout.write(
+            ', '.join(f"{count:,} {name.replace('_', ' ')}" for name, count in counts.items())
+            + f" in {time.perf_counter() - start:.1f}s"
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.images import ImageSourceError, ingest_original, process_product_image
+from api.models import Product
+
+
+class Command(BaseCommand):
+    help = "Stores a local original image in the media store as the product's image and builds its variants."
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_id', type=int)
+        parser.add_argument('path', help='Image file to ingest.')
+
+    def handle(self, *args, **options):
+        try:
+            product = Product.objects.get(pk=options['product_id'])
+        except Product.DoesNotExist:
+            raise CommandError(f"Product {options['product_id']} does not exist.")
+        try:
+            url = ingest_original(product, options['path'])
+        except OSError as exc:
+            raise CommandError(f"Could not read {options['path']}: {exc}")
+        try:
+            process_product_image(product)
+        except ImageSourceError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Product {product.id} image is now {url}"))
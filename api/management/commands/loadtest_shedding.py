@@ -0,0 +1,78 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from api.load_shedding import LoadShedder, LoadSheddingMiddleware
+
+
+class Command(BaseCommand):
+    help = ('Simulates a worker with a fixed thread pool serving cheap checkout requests while search is '
+            'flooded, and reports checkout latency with and without load shedding.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Worker threads (and shedder capacity).')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds of traffic per run.')
+        parser.add_argument('--search-rate', type=float, default=200, help='Search requests per second.')
+        parser.add_argument('--search-time', type=float, default=0.2, help='Service time of a search request.')
+        parser.add_argument('--checkout-rate', type=float, default=50, help='Checkout requests per second.')
+        parser.add_argument('--checkout-time', type=float, default=0.02, help='Service time of a checkout request.')
+
+    def handle(self, *args, **options):
+        for shedding in (False, True):
+            results = self.run(shedding, options)
+            checkout = results['checkout']
+            search = results['search']
+            self.stdout.write(
+                f"shedding {'on ' if shedding else 'off'}: checkout p50 {self.percentile(checkout['latencies'], 50):.3f}s "
+                f"p99 {self.percentile(checkout['latencies'], 99):.3f}s ({checkout['rejected']} rejected); "
+                f"search served {len(search['latencies'])}, rejected {search['rejected']}"
+            )
+
+    def run(self, shedding, options):
+        factory = RequestFactory()
+        service_times = {'/api/products/search/': options['search_time'], '/api/orders/': options['checkout_time']}
+
+        def view(request):
+            time.sleep(service_times[request.path])
+            return HttpResponse()
+
+        config = settings.LOAD_SHEDDING
+        shedder = LoadShedder(options['threads'], config['headroom'], config['classes'])
+        handler = LoadSheddingMiddleware(view, shedder=shedder) if shedding else view
+        results = {name: {'latencies': [], 'rejected': 0} for name in ('search', 'checkout')}
+        lock = threading.Lock()
+
+        def serve(name, path, submitted):
+            # Only POST /api/orders/ (placing an order) is in the checkout class.
+            response = handler(factory.post(path) if name == 'checkout' else factory.get(path))
+            latency = time.monotonic() - submitted
+            with lock:
+                if response.status_code == 503:
+                    results[name]['rejected'] += 1
+                else:
+                    results[name]['latencies'].append(latency)
+
+        streams = [
+            ('search', '/api/products/search/', options['search_rate']),
+            ('checkout', '/api/orders/', options['checkout_rate']),
+        ]
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            start = time.monotonic()
+            next_at = {name: start for name, _, _ in streams}
+            while time.monotonic() - start < options['duration']:
+                now = time.monotonic()
+                for name, path, rate in streams:
+                    while next_at[name] <= now:
+                        pool.submit(serve, name, path, next_at[name])
+                        next_at[name] += 1 / rate
+                time.sleep(0.001)
+        return results
+
+    def percentile(self, values, percent):
+        if not values:
+            return float('nan')
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from api.images import ImageSourceError, process_product_image, products_needing_images
+
+
+class Command(BaseCommand):
+    help = ('Builds thumb/card/full WebP and JPEG variants for products whose image changed since their '
+            'variants were built.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recheck', action='store_true',
+                            help='Re-fetch every original and rebuild the ones whose content changed.')
+        parser.add_argument('--force', action='store_true',
+                            help='Rebuild every variant (e.g. after changing PRODUCT_IMAGES).')
+        parser.add_argument('--limit', type=int, default=None, help='Process at most this many products per pass.')
+        parser.add_argument('--every', type=int, default=None,
+                            help='Keep running, processing new images every this many seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            self.process(options)
+            if options['every'] is None:
+                return
+            time.sleep(options['every'])
+
+    def process(self, options):
+        products = products_needing_images(options['recheck'] or options['force']).order_by('id')
+        if options['limit']:
+            products = products[:options['limit']]
+        processed = unchanged = failed = 0
+        for product in products.iterator(chunk_size=200):
+            try:
+                changed = process_product_image(product, recheck=options['recheck'], force=options['force'])
+            except ImageSourceError as exc:
+                failed += 1
+                self.stderr.write(f"Product {product.id}: {exc}")
+                continue
+            if changed:
+                processed += 1
+            else:
+                unchanged += 1
+        self.stdout.write(f"Processed {processed} product images ({unchanged} unchanged, {failed} failed)")
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from api.flash_sales import reconcile_flash_sales
+
+
+class Command(BaseCommand):
+    help = ('Brings stock_level up to date with flash-sale sales, rebalances shards and ends sales that '
+            'are sold out or past their end time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--end', type=int, action='append', default=[], metavar='SALE_ID',
+                            help='End this sale now (repeatable).')
+        parser.add_argument('--every', type=float, default=None,
+                            help='Keep running, reconciling every this many seconds.')
+
+    def handle(self, *args, **options):
+        end_sale_ids = set(options['end'])
+        while True:
+            reconciled = reconcile_flash_sales(end_sale_ids)
+            end_sale_ids = set()
+            self.stdout.write(
+                f"Reconciled {sum(reconciled.values())} units sold across {len(reconciled)} flash sales"
+            )
+            if options['every'] is None:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.reconciliation import reconcile_pending_payments
+
+
+class Command(BaseCommand):
+    help = 'Queries Daraja for stale pending M-Pesa payments and applies the results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-minutes', type=int, default=settings.MPESA_RECONCILE_AFTER_MINUTES,
+                            help='Only reconcile payments for orders older than this.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Payments read and updated per batch.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Maximum STK queries in flight.')
+        parser.add_argument('--rate', type=float, default=100, help='Maximum STK queries per second.')
+        parser.add_argument('--base-url', default=None, help='Daraja base URL (defaults to SAFARICOM_API).')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-batch HTTP timeout in seconds.')
+
+    def handle(self, *args, **options):
+        stats = reconcile_pending_payments(
+            older_than_minutes=options['older_than_minutes'],
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            rate=options['rate'],
+            base_url=options['base_url'],
+            timeout=options['timeout'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Queried {stats['queried']} payments: {stats['completed']} completed, {stats['failed']} failed, "
+            f"{stats['still_pending']} still pending, {stats['errors']} errors."
+        ))
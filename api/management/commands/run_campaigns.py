@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from api.campaigns import run_campaign, runnable_campaigns
+from api.models import NotificationCampaign
+
+
+class Command(BaseCommand):
+    help = 'Runs queued notification campaigns in the foreground, and resumes running ones whose worker stopped heartbeating.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_ids', nargs='*', type=int, help='Campaigns to run (default: all queued or stale).')
+
+    def handle(self, *args, **options):
+        campaign_ids = options['campaign_ids'] or list(
+            runnable_campaigns().order_by('id').values_list('id', flat=True)
+        )
+        for campaign_id in campaign_ids:
+            run_campaign(campaign_id)
+            campaign = NotificationCampaign.objects.get(id=campaign_id)
+            self.stdout.write(
+                f"Campaign {campaign.id}: {campaign.status}, {campaign.recipients} recipients, "
+                f"{campaign.delivered} delivered, {campaign.failed_deliveries} failed"
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.flash_sales import start_flash_sale
+from api.models import Product, FlashSale
+
+
+class Command(BaseCommand):
+    help = "Puts a product into flash-sale mode, splitting its stock over counter shards."
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_id', type=int)
+        parser.add_argument('--shards', type=int, default=16, help='Stock shards (concurrent checkouts).')
+        parser.add_argument('--units', type=int, default=None, help='Units to allocate (default: all stock).')
+        parser.add_argument('--minutes', type=int, default=None, help='End the sale after this many minutes.')
+
+    def handle(self, *args, **options):
+        if options['shards'] < 1:
+            raise CommandError('--shards must be at least 1.')
+        if FlashSale.objects.filter(product_id=options['product_id'], active=True).exists():
+            raise CommandError(f"Product {options['product_id']} already has an active flash sale.")
+        try:
+            sale = start_flash_sale(options['product_id'], options['shards'], options['units'], options['minutes'])
+        except Product.DoesNotExist:
+            raise CommandError(f"Product {options['product_id']} does not exist.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Started flash sale {sale.id}: {sale.allocated} units over {sale.shard_count} shards."
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.archive import verify_archive
+
+
+class Command(BaseCommand):
+    help = 'Checks archive row counts and totals against the recorded archive batches.'
+
+    def handle(self, *args, **options):
+        problems = verify_archive()
+        if problems:
+            raise CommandError('Order archive verification failed:\n' + '\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('Order archive is consistent.'))
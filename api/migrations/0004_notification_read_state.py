@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0003_order_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="read_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "sent_at", "id"], name="api_notific_user_id_cebd06_idx"
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="notification",
+            name="api_notific_user_id_187ecf_idx",
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:53
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0006_export_change_tracking"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="daily_demand",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="reorder_point",
+            field=models.PositiveIntegerField(default=5),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="reorder_gap",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.CombinedExpression(
+                    django.db.models.functions.comparison.Cast(
+                        "stock_level", models.IntegerField()
+                    ),
+                    "-",
+                    django.db.models.functions.comparison.Cast(
+                        "reorder_point", models.IntegerField()
+                    ),
+                ),
+                output_field=models.IntegerField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["reorder_gap"], name="api_product_reorder_872167_idx"
+            ),
+        ),
+    ]
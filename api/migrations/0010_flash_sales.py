@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0009_idempotency_keys"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FlashSale",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard_count", models.PositiveIntegerField()),
+                ("allocated", models.PositiveIntegerField()),
+                ("reconciled", models.PositiveIntegerField(default=0)),
+                ("active", models.BooleanField(default=True)),
+                ("starts_at", models.DateTimeField(auto_now_add=True)),
+                ("ends_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="flash_sales",
+                        to="api.product",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StockShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.PositiveIntegerField()),
+                ("remaining", models.PositiveIntegerField()),
+                (
+                    "sale",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shards",
+                        to="api.flashsale",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="flashsale",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("active", True)),
+                fields=("product",),
+                name="one_active_flash_sale_per_product",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stockshard",
+            constraint=models.UniqueConstraint(
+                fields=("sale", "index"), name="unique_stock_shard_index"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0010_flash_sales"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_source_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image_source_url",
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
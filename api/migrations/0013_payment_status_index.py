@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0012_product_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["status", "id"], name="api_payment_status_f4c196_idx"
+            ),
+        ),
+    ]
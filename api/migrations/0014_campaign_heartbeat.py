@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0013_payment_status_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notificationcampaign",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="notificationcampaign",
+            name="last_recipient_id",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
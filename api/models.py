@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Cast
+from django.core.serializers.json import DjangoJSONEncoder
 
 class User(AbstractUser):
     ROLE_CHOICES = (
@@ -14,6 +16,7 @@ class User(AbstractUser):
         indexes = [
             models.Index(fields=['username']),
             models.Index(fields=['email']),
+            models.Index(fields=['role']),
         ]
 
     def __str__(self):
@@ -26,17 +29,60 @@ class Product(models.Model):
     stock_level = models.PositiveIntegerField(default=0)
     category = models.CharField(max_length=100)
     image_url = models.URLField(blank=True, null=True)
+    # Resized copies of image_url, kept by `manage.py process_product_images`:
+    # {variant: {format: url, 'width': ..., 'height': ...}}, built from the
+    # original at image_source_url whose content hashed to image_source_hash.
+    image_variants = models.JSONField(default=dict, blank=True)
+    image_source_url = models.URLField(blank=True, null=True)
+    image_source_hash = models.CharField(max_length=64, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by save(); code updating products with QuerySet.update() sets it too (ETags rely on it).
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by `manage.py compute_reorder_points` from recent sales.
+    reorder_point = models.PositiveIntegerField(default=5)
+    daily_demand = models.FloatField(default=0)
+    # Units above the reorder point; kept by the database so low stock is an index range scan.
+    reorder_gap = models.GeneratedField(
+        expression=Cast('stock_level', models.IntegerField()) - Cast('reorder_point', models.IntegerField()),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
 
     class Meta:
         indexes = [
-            models.Index(fields=['category']),
+            models.Index(fields=['category', 'price']),
             models.Index(fields=['name']),
+            models.Index(fields=['price']),
+            models.Index(fields=['stock_level']),
+            models.Index(fields=['reorder_gap']),
+            models.Index(fields=['updated_at']),
         ]
 
+    # Fields whose changes invalidate cached product data (api.signals).
+    TRACKED_FIELDS = ('name', 'category', 'price', 'stock_level')
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.saved_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.TRACKED_FIELDS
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        # What the row held before this save, for the post_save receivers; unknown fields count as changed.
+        self.previous_values = getattr(self, 'saved_values', {})
+        super().save(*args, **kwargs)
+        self.saved_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+    def changed(self, *fields):
+        """Whether the last save changed (or may have changed) any of the given TRACKED_FIELDS."""
+        previous = getattr(self, 'previous_values', {})
+        return any(field not in previous or previous[field] != getattr(self, field) for field in fields)
+
 class Order(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -53,11 +99,15 @@ class Order(models.Model):
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     notes = models.TextField(blank=True, null=True)
 
     class Meta:
         indexes = [
             models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['created_at']),
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
@@ -70,7 +120,7 @@ class OrderItem(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.name} in Order {self.order.id}"
+        return f"{self.quantity} x {self.product.name} in Order {self.order_id}"
 
 class Payment(models.Model):
     STATUS_CHOICES = (
@@ -88,9 +138,17 @@ class Payment(models.Model):
     transaction_id = models.CharField(max_length=100, unique=True, blank=True, null=True)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+            # Status filters ordered by id: the admin changelist and payment reconciliation.
+            models.Index(fields=['status', 'id']),
+        ]
 
     def __str__(self):
-        return f"Payment for Order {self.order.id}"
+        return f"Payment for Order {self.order_id}"
 
 class Notification(models.Model):
     TYPE_CHOICES = (
@@ -101,14 +159,166 @@ class Notification(models.Model):
     message = models.TextField()
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     sent_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'sent_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.type} notification for {self.user.username}"
 
+class NotificationCampaign(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='notification_campaigns')
+    message = models.TextField()
+    type = models.CharField(max_length=10, choices=Notification.TYPE_CHOICES)
+    segment = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    recipients = models.PositiveIntegerField(default=0)
+    delivered = models.PositiveIntegerField(default=0)
+    failed_deliveries = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Refreshed by the worker after every chunk; a 'running' campaign whose
+    # heartbeat is older than the lease is taken over from last_recipient_id.
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    last_recipient_id = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.type} campaign {self.id} ({self.status})"
+
 class LoyaltyPoint(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loyalty_points')
     points = models.PositiveIntegerField()
     earned_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.points} points for {self.user.username}"
\ No newline at end of file
+        return f"{self.points} points for {self.user.username}"
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_method = models.CharField(max_length=20, choices=Order.PAYMENT_METHODS)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    notes = models.TextField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.id} by {self.user.username}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='archived_order_items')
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name} in archived Order {self.order_id}"
+
+class ArchivedPayment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.OneToOneField(ArchivedOrder, on_delete=models.CASCADE, related_name='payment')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    transaction_id = models.CharField(max_length=100, blank=True, null=True)
+    payment_method = models.CharField(max_length=20, choices=Payment.PAYMENT_METHODS)
+    status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Archived payment for Order {self.order_id}"
+
+class FlashSale(models.Model):
+    """
+    Flash-sale mode for one product: `allocated` units are split over
+    StockShard rows so concurrent checkouts lock different rows instead of
+    the product's. `reconciled` is how many of the units sold so far have
+    been subtracted from Product.stock_level (see api.flash_sales).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='flash_sales')
+    shard_count = models.PositiveIntegerField()
+    allocated = models.PositiveIntegerField()
+    reconciled = models.PositiveIntegerField(default=0)
+    active = models.BooleanField(default=True)
+    starts_at = models.DateTimeField(auto_now_add=True)
+    ends_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product'], condition=models.Q(active=True), name='one_active_flash_sale_per_product'),
+        ]
+
+    def __str__(self):
+        return f"Flash sale {self.id} of {self.product_id}"
+
+class StockShard(models.Model):
+    sale = models.ForeignKey(FlashSale, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveIntegerField()
+    remaining = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sale', 'index'], name='unique_stock_shard_index'),
+        ]
+
+class IdempotencyKey(models.Model):
+    STATUS_CHOICES = (
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='processing')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    locked_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key} for {self.user_id}"
+
+class ProductRecommendation(models.Model):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='recommendation')
+    # [[product_id, score], ...], best first; written by `manage.py build_recommendations`.
+    related = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Recommendations for {self.product_id}"
+
+class OrderArchiveBatch(models.Model):
+    archived_at = models.DateTimeField(auto_now_add=True)
+    orders = models.PositiveIntegerField()
+    items = models.PositiveIntegerField()
+    payments = models.PositiveIntegerField()
+    order_total = models.DecimalField(max_digits=16, decimal_places=2)
+    payment_total = models.DecimalField(max_digits=16, decimal_places=2)
+
+    def __str__(self):
+        return f"Archived {self.orders} orders at {self.archived_at}"
@@ -0,0 +1,47 @@
+from collections import Counter
+from django.core.cache import cache
+from django.db import transaction
+from .models import Notification
+
+UNREAD_COUNT_TIMEOUT = 60 * 60 * 24
+
+
+def unread_count_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def get_unread_count(user_id):
+    """
+    Unread badge count from cache. The COUNT(*) only runs when the key is
+    missing (first poll or after expiry); afterwards the value is kept up to
+    date incrementally by `adjust_unread_counts`.
+    """
+    key = unread_count_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, read_at__isnull=True).count()
+        cache.add(key, count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def adjust_unread_counts(deltas):
+    """
+    Applies {user_id: delta} to cached unread counts once the surrounding
+    transaction commits. Users without a cached count are skipped; their next
+    read recomputes it.
+    """
+    def apply():
+        for user_id, delta in deltas.items():
+            if not delta:
+                continue
+            try:
+                if cache.incr(unread_count_key(user_id), delta) < 0:
+                    cache.delete(unread_count_key(user_id))
+            except ValueError:
+                pass
+    transaction.on_commit(apply)
+
+
+def notifications_created(notifications):
+    """Call after `bulk_create`, which does not send post_save."""
+    adjust_unread_counts(Counter(notification.user_id for notification in notifications))
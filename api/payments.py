@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.utils import timezone
+from .models import Order, Payment, Notification
+from .notifications import notifications_created
+from .realtime import order_event, publish_order_events
+
+
+def apply_stk_results(results):
+    """
+    Applies M-Pesa STK results, given as {CheckoutRequestID: ResultCode}, to
+    pending payments. A ResultCode of 0 completes the payment, confirms the
+    order and notifies the customer; anything else fails the payment.
+
+    Only payments still pending are touched, so applying the same result
+    twice (callback and reconciliation racing, or a repeated callback) is a
+    no-op. Returns the number of payments completed and failed.
+    """
+    successful = [checkout_id for checkout_id, code in results.items() if str(code) == '0']
+    unsuccessful = [checkout_id for checkout_id, code in results.items() if str(code) != '0']
+
+    now = timezone.now()
+    with transaction.atomic():
+        pending = Payment.objects.select_for_update().filter(status='pending')
+        completed = list(pending.filter(transaction_id__in=successful).values('id', 'amount', 'order_id', 'order__user_id'))
+        failed = list(pending.filter(transaction_id__in=unsuccessful).values('id', 'order_id', 'order__user_id',
+                                                                             'order__status'))
+        if failed:
+            Payment.objects.filter(id__in=[payment['id'] for payment in failed]).update(status='failed', updated_at=now)
+        if completed:
+            Payment.objects.filter(id__in=[payment['id'] for payment in completed]).update(status='completed', updated_at=now)
+            Order.objects.filter(id__in=[payment['order_id'] for payment in completed]).update(status='confirmed', updated_at=now)
+            notifications_created(Notification.objects.bulk_create([
+                Notification(
+                    user_id=payment['order__user_id'],
+                    message=f"Your payment of {payment['amount']} for Order {payment['order_id']} was successful.",
+                    type='SMS'
+                )
+                for payment in completed
+            ]))
+        events = [
+            order_event('payment.completed', payment['order_id'], payment['order__user_id'], 'confirmed',
+                        f"Order {payment['order_id']} confirmed")
+            for payment in completed
+        ] + [
+            order_event('payment.failed', payment['order_id'], payment['order__user_id'], payment['order__status'],
+                        f"Payment for Order {payment['order_id']} failed")
+            for payment in failed
+        ]
+        if events:
+            transaction.on_commit(lambda: publish_order_events(events))
+
+    return {'completed': len(completed), 'failed': len(failed)}
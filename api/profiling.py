@@ -0,0 +1,312 @@
+"""
+On-demand request profiling. A request is profiled when it is sampled
+(`set_sample_rate`, set by staff for a limited time) or carries a
+single-use signed `X-Profile` token (`issue_token`). Its cProfile stats,
+its stacks sampled every millisecond and its SQL statements with their
+durations are stored in a ring buffer of `PROFILING['buffer_size']` cache
+slots shared by all workers, so old profiles are overwritten instead of
+accumulating. (cProfile only keeps caller/callee pairs, which can't be
+turned back into stacks through Django's recursive middleware chain, hence
+the sampler.)
+
+Profiles download as pstats (snakeviz, tuna, gprof2dot) or as collapsed
+stacks (flamegraph.pl, speedscope, inferno). With PROFILING_ENABLED off the
+middleware removes itself from the chain; with it on and nothing requested,
+a request costs a header lookup and a clock read.
+"""
+import cProfile
+import logging
+import marshal
+import pstats
+import random
+import secrets
+import sys
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+HEADER = 'X-Profile'
+META_HEADER = 'HTTP_X_PROFILE'
+ID_HEADER = 'X-Profile-Id'
+SEQUENCE_KEY = 'profiling:sequence'
+SAMPLE_RATE_KEY = 'profiling:sample-rate'
+TOKEN_SALT = 'api.profiling'
+
+logger = logging.getLogger(__name__)
+
+# cProfile runs one profiler per thread, so a thread is profiled for one recording at a time.
+profiled_threads = set()
+profiled_threads_lock = threading.Lock()
+
+
+def slot_key(slot):
+    return f"profiling:slot:{slot}"
+
+
+def set_sample_rate(rate, minutes):
+    """Profiles a `rate` fraction of all requests, in every worker, for the next `minutes`."""
+    if rate:
+        cache.set(SAMPLE_RATE_KEY, rate, minutes * 60)
+    else:
+        cache.delete(SAMPLE_RATE_KEY)
+
+
+def get_sample_rate():
+    return cache.get(SAMPLE_RATE_KEY, 0)
+
+
+def issue_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(secrets.token_urlsafe(12))
+
+
+def redeem_token(token):
+    """Whether `token` is validly signed, unexpired and used for the first time."""
+    max_age = settings.PROFILING['token_max_age']
+    try:
+        nonce = signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=max_age)
+    except signing.BadSignature:
+        return False
+    return cache.add(f"profiling:token:{nonce}", 1, max_age)
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stacks of the given threads every `interval` seconds into
+    folded stacks ({"outer;...;inner": microseconds}). Each sample is
+    weighted by the time since the previous one, as the GIL can delay it.
+    """
+
+    def __init__(self, interval):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self.interval = interval
+        self.targets = {}
+        self.stacks = {}
+        self.stopped = threading.Event()
+
+    def add_target(self, thread_id, base_frame):
+        """Samples `thread_id`, leaving out the frames above `base_frame`."""
+        self.targets[thread_id] = base_frame
+
+    def run(self):
+        last = time.perf_counter()
+        while not self.stopped.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = (now - last) * 1e6, now
+            frames = sys._current_frames()
+            for thread_id, base_frame in list(self.targets.items()):
+                frame, stack = frames.get(thread_id), []
+                while frame is not None and frame is not base_frame:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    key = ';'.join(reversed(stack))
+                    self.stacks[key] = self.stacks.get(key, 0) + weight
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Recording:
+    """cProfile stats, sampled stacks and SQL of one request, from every thread it is attached to."""
+
+    def __init__(self, trigger):
+        self.trigger = trigger
+        self.started = time.perf_counter()
+        self.threads = {}
+        self.queries = []
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.sampler = StackSampler(settings.PROFILING['sample_interval_ms'] / 1000)
+
+    def attach(self):
+        """
+        Starts profiling the calling thread and recording its SQL. Returns
+        False, leaving the thread alone, when another recording already
+        profiles it or the profiler can't be enabled there.
+        """
+        thread_id = threading.get_ident()
+        with profiled_threads_lock:
+            if thread_id in profiled_threads:
+                return False
+            profiled_threads.add(thread_id)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ refuses a second profiler, e.g. one a debugger or coverage tool installed.
+            profiled_threads.discard(thread_id)
+            return False
+        wrapped = connections.all()
+        for connection in wrapped:
+            connection.execute_wrappers.append(self.record_query)
+        self.threads[thread_id] = (profiler, wrapped)
+        self.sampler.add_target(thread_id, sys._getframe(1))
+        if not self.sampler.is_alive():
+            self.sampler.start()
+        return True
+
+    def detach(self):
+        """Stops profiling the calling thread; the sampler stops with the last thread."""
+        thread_id = threading.get_ident()
+        profiler, wrapped = self.threads[thread_id]
+        profiler.disable()
+        for connection in wrapped:
+            connection.execute_wrappers.remove(self.record_query)
+        self.sampler.targets.pop(thread_id, None)
+        if not self.sampler.targets:
+            self.sampler.stop()
+        profiled_threads.discard(thread_id)
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            self.query_count += 1
+            self.query_ms += duration
+            # Statements only: parameters may hold customer data.
+            if len(self.queries) < settings.PROFILING['max_queries']:
+                self.queries.append({'sql': sql, 'ms': round(duration, 3), 'many': many,
+                                     'alias': context['connection'].alias})
+
+    def stats(self):
+        profilers = [profiler for profiler, _ in self.threads.values()]
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        return stats.stats
+
+    def save(self, request, response):
+        """Stores the profile in the next ring buffer slot and returns its id."""
+        try:
+            profile_id = cache.incr(SEQUENCE_KEY)
+        except ValueError:
+            cache.add(SEQUENCE_KEY, 0, None)
+            profile_id = cache.incr(SEQUENCE_KEY)
+        user = getattr(request, 'user', None)
+        cache.set(slot_key(profile_id % settings.PROFILING['buffer_size']), {
+            'id': profile_id,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'trigger': self.trigger,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'recorded_at': timezone.now().isoformat(),
+            'duration_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'query_count': self.query_count,
+            'query_ms': round(self.query_ms, 2),
+            'queries': self.queries,
+            'stacks': {stack: round(us) for stack, us in self.sampler.stacks.items()},
+            'stats': marshal.dumps(self.stats()),
+        }, settings.PROFILING['retention_hours'] * 3600)
+        return profile_id
+
+
+def list_profiles():
+    """Summaries of the stored profiles, newest first."""
+    keys = [slot_key(slot) for slot in range(settings.PROFILING['buffer_size'])]
+    profiles = [{key: value for key, value in profile.items() if key not in ('queries', 'stacks', 'stats')}
+                for profile in cache.get_many(keys).values()]
+    return sorted(profiles, key=lambda profile: -profile['id'])
+
+
+def get_profile(profile_id):
+    """The stored profile with this id, or None once its slot has been reused or has expired."""
+    profile = cache.get(slot_key(profile_id % settings.PROFILING['buffer_size']))
+    return profile if profile is not None and profile['id'] == profile_id else None
+
+
+def collapsed_stacks(profile):
+    """The profile's sampled stacks in the folded format ("outer;...;inner <microseconds>" per line)."""
+    return ''.join(f"{stack} {us}\n" for stack, us in sorted(profile['stacks'].items()) if us)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles sampled requests and requests with a valid `X-Profile` token,
+    and returns the stored profile's id in `X-Profile-Id`. For async views
+    the event loop thread is profiled along with the thread their ORM calls
+    run in, so concurrent requests on the same loop can show up in the
+    profile. A request arriving while its threads are being profiled for
+    another one is served unprofiled.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING['enabled']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = 0
+        self.checked_at = 0
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        trigger = None if self.idle(request) else self.trigger(request)
+        recording = Recording(trigger) if trigger else None
+        if recording is None or not recording.attach():
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            recording.detach()
+        self.save(recording, request, response)
+        return response
+
+    async def __acall__(self, request):
+        trigger = None if self.idle(request) else await sync_to_async(self.trigger)(request)
+        recording = Recording(trigger) if trigger else None
+        # The event loop thread and the thread_sensitive ORM thread are shared by all async requests.
+        if recording is None or not recording.attach():
+            return await self.get_response(request)
+        if not await sync_to_async(recording.attach)():
+            recording.detach()
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.detach)()
+            recording.detach()
+        await sync_to_async(self.save)(recording, request, response)
+        return response
+
+    def save(self, recording, request, response):
+        try:
+            response[ID_HEADER] = str(recording.save(request, response))
+        except Exception:
+            # A profile that can't be stored must not fail the request it was taken of.
+            logger.exception('Could not store the profile of %s %s', request.method, request.path)
+
+    def idle(self, request):
+        """True when the request is certainly not profiled, decided without touching the cache."""
+        return META_HEADER not in request.META and not self.sample_rate and \
+            time.monotonic() - self.checked_at <= settings.PROFILING['poll_interval']
+
+    def trigger(self, request):
+        """'header' or 'sampled' when this request is to be profiled, else None."""
+        token = request.META.get(META_HEADER)
+        if token is not None and redeem_token(token):
+            return 'header'
+        now = time.monotonic()
+        if now - self.checked_at > settings.PROFILING['poll_interval']:
+            self.checked_at = now
+            self.sample_rate = get_sample_rate()
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'sampled'
+        return None
@@ -0,0 +1,58 @@
+"""
+Order and payment events for WebSocket clients (api.consumers). Each event
+goes only to the groups that want it instead of to every socket:
+
+- `user.<id>`: the customer's own orders (every socket of that user joins it)
+- `order.<id>`: one order, e.g. a checkout waiting on its M-Pesa result
+- `staff.orders` and `staff.orders.<status>`: all orders, or those reaching
+  one status, for staff sockets that subscribe to them
+
+Events are grouped per group, so a bulk update sends one channel-layer
+message per group and batch rather than one per event and socket.
+"""
+from asgiref.sync import async_to_sync
+
+STAFF_ROLES = ('admin', 'staff')
+
+
+def user_group(user_id):
+    return f"user.{user_id}"
+
+
+def order_group(order_id):
+    return f"order.{order_id}"
+
+
+def staff_group(order_status=None):
+    return f"staff.orders.{order_status}" if order_status else 'staff.orders'
+
+
+def order_event(event, order_id, user_id, order_status, message):
+    return {'event': event, 'order_id': order_id, 'user_id': user_id, 'status': order_status, 'message': message}
+
+
+def event_groups(event):
+    return (user_group(event['user_id']), order_group(event['order_id']), staff_group(),
+            staff_group(event['status']))
+
+
+def publish_order_events(events, batch_size=100):
+    """Sends each event to its order's user, order and staff groups, up to `batch_size` events per message."""
+    from channels.layers import get_channel_layer
+    by_group = {}
+    for event in events:
+        for group in event_groups(event):
+            by_group.setdefault(group, []).append(event)
+
+    async def send():
+        channel_layer = get_channel_layer()
+        for group, group_events in by_group.items():
+            for start in range(0, len(group_events), batch_size):
+                await channel_layer.group_send(group, {
+                    'type': 'order_events',
+                    'group': group,
+                    'events': group_events[start:start + batch_size],
+                })
+
+    if by_group:
+        async_to_sync(send)()
@@ -0,0 +1,129 @@
+import json
+import os
+from datetime import timedelta
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from .analytics import read_frame, read_lines
+from .models import Product, Order, OrderItem, ArchivedOrder, ArchivedOrderItem, ProductRecommendation
+
+MATRIX_FILE = 'co_occurrence.npz'
+STATE_FILE = 'co_occurrence.json'
+
+
+def read_baskets(orders, line_model, chunk_size=50000):
+    """(order ids, product ids) arrays for the lines of the given orders."""
+    order_ids = read_frame(orders, ['id'], ['id'], chunk_size)['id'].to_numpy(dtype='int64')
+    lines = read_lines(line_model, order_ids, ['order_id', 'product_id'], ['order_id', 'product_id'], chunk_size)
+    keep = np.isin(lines['order_id'].to_numpy(dtype='int64'), order_ids)
+    return lines['order_id'].to_numpy(dtype='int64')[keep], lines['product_id'].to_numpy(dtype='int64')[keep]
+
+
+def co_occurrence(order_ids, product_ids, size):
+    """
+    Product x product matrix counting the orders that contain both products;
+    the diagonal counts the orders containing each product.
+    """
+    _, rows = np.unique(order_ids, return_inverse=True)
+    baskets = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, product_ids)), shape=(rows.max() + 1 if len(rows) else 0, size)
+    )
+    baskets.sum_duplicates()
+    baskets.data[:] = 1
+    return (baskets.T @ baskets).tocsr()
+
+
+def top_neighbours(matrix, product_ids, top_n, min_support):
+    """
+    Up to `top_n` products bought together with each product at least
+    `min_support` times, scored by cosine similarity of their baskets
+    (co-occurrences / sqrt(orders of a * orders of b)) so best sellers do not
+    top every list.
+    """
+    popularity = matrix.diagonal().astype(float)
+    neighbours = {}
+    for product_id in product_ids:
+        start, end = matrix.indptr[product_id], matrix.indptr[product_id + 1]
+        related, counts = matrix.indices[start:end], matrix.data[start:end]
+        keep = (related != product_id) & (counts >= min_support)
+        related, counts = related[keep], counts[keep]
+        scores = counts / np.sqrt(popularity[product_id] * popularity[related])
+        if len(scores) > top_n:
+            best = np.argpartition(-scores, top_n)[:top_n]
+            related, scores = related[best], scores[best]
+        order = np.lexsort((related, -scores))
+        neighbours[int(product_id)] = [[int(related[i]), round(float(scores[i]), 4)] for i in order]
+    return neighbours
+
+
+def load_matrix(root):
+    try:
+        with open(os.path.join(root, STATE_FILE)) as f:
+            state = json.load(f)
+        return sparse.load_npz(os.path.join(root, MATRIX_FILE)).tocsr(), state
+    except FileNotFoundError:
+        return None, {}
+
+
+def save_matrix(root, matrix, state):
+    os.makedirs(root, exist_ok=True)
+    for name, write in ((MATRIX_FILE, lambda f: sparse.save_npz(f, matrix)),
+                        (STATE_FILE, lambda f: f.write(json.dumps(state).encode()))):
+        path = os.path.join(root, name)
+        with open(f'{path}.tmp', 'wb') as f:
+            write(f)
+        os.replace(f'{path}.tmp', path)
+
+
+def store_recommendations(neighbours, batch_size=1000):
+    rows = [ProductRecommendation(product_id=product_id, related=related) for product_id, related in neighbours.items()]
+    existing = set(Product.objects.filter(id__in=list(neighbours)).values_list('id', flat=True)) if rows else set()
+    rows = [row for row in rows if row.product_id in existing]
+    for start in range(0, len(rows), batch_size):
+        ProductRecommendation.objects.bulk_create(
+            rows[start:start + batch_size], update_conflicts=True, unique_fields=['product'],
+            update_fields=['related', 'updated_at']
+        )
+    return len(rows)
+
+
+def build_recommendations(root=None, rebuild=False, settle_seconds=300):
+    """
+    Adds orders placed since the previous run to the stored co-occurrence
+    matrix and refreshes the recommendations of every product whose scores
+    can have changed: products in the new orders and their neighbours. With
+    `rebuild`, or on the first run, the matrix is built from all live and
+    archived orders. Orders younger than `settle_seconds` wait for the next
+    run. Returns (orders added, products refreshed).
+    """
+    config = settings.RECOMMENDATIONS
+    root = root or settings.RECOMMENDATIONS_DIR
+    matrix, state = (None, {}) if rebuild else load_matrix(root)
+    cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+    last_product_id = Product.objects.aggregate(last=Max('id'))['last'] or 0
+
+    if matrix is None:
+        baskets = [
+            read_baskets(Order.objects.filter(created_at__lt=cutoff), OrderItem),
+            read_baskets(ArchivedOrder.objects.all(), ArchivedOrderItem),
+        ]
+        order_ids = np.concatenate([order_ids for order_ids, _ in baskets])
+        product_ids = np.concatenate([product_ids for _, product_ids in baskets])
+        matrix = co_occurrence(order_ids, product_ids, max(last_product_id, product_ids.max(initial=0)) + 1)
+        affected = np.flatnonzero(np.diff(matrix.indptr))
+    else:
+        order_ids, product_ids = read_baskets(
+            Order.objects.filter(id__gt=state['last_order_id'], created_at__lt=cutoff), OrderItem
+        )
+        size = max(last_product_id + 1, product_ids.max(initial=0) + 1, matrix.shape[0])
+        matrix.resize((size, size))
+        matrix = (matrix + co_occurrence(order_ids, product_ids, size)).tocsr()
+        touched = np.unique(product_ids)
+        affected = np.union1d(touched, matrix[touched].indices)
+
+    last_order_id = int(order_ids.max()) if len(order_ids) else state.get('last_order_id', 0)
+    save_matrix(root, matrix, {'last_order_id': last_order_id, 'built_at': cutoff.isoformat()})
+    refreshed = store_recommendations(top_neighbours(matrix, affected, config['top_n'], config['min_support']))
+    return len(np.unique(order_ids)), refreshed
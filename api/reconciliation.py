@@ -0,0 +1,132 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta
+import aiohttp
+from django.conf import settings
+from django.utils import timezone
+from .models import Payment
+from .payments import apply_stk_results
+
+# Daraja answers STK queries for transactions still in flight with this error code.
+STILL_PROCESSING_ERROR = '500.001.1001'
+
+
+class RateLimiter:
+    """Spaces out `acquire()` calls to at most `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = 0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            now = loop.time()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def stale_pending_payments(older_than_minutes=None, batch_size=500):
+    """
+    Yields lists of (payment id, CheckoutRequestID) for pending M-Pesa
+    payments whose order is older than the cutoff, walking the primary key so
+    each batch is one indexed range query.
+    """
+    minutes = settings.MPESA_RECONCILE_AFTER_MINUTES if older_than_minutes is None else older_than_minutes
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    queryset = Payment.objects.filter(
+        status='pending', payment_method='M-Pesa', transaction_id__isnull=False, order__created_at__lt=cutoff
+    ).order_by('id')
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).values_list('id', 'transaction_id')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][0]
+
+
+class StkStatusClient:
+    def __init__(self, session, base_url, access_token, concurrency, rate):
+        self.session = session
+        self.base_url = base_url
+        self.access_token = access_token
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rate_limiter = RateLimiter(rate)
+
+    async def query(self, checkout_request_id):
+        """Returns the ResultCode, None while still processing, or raises on transport errors."""
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        password = base64.b64encode(
+            f"{settings.MPESA_SHORTCODE}{settings.MPESA_PASSKEY}{timestamp}".encode()
+        ).decode()
+        payload = {
+            "BusinessShortCode": settings.MPESA_SHORTCODE,
+            "Password": password,
+            "Timestamp": timestamp,
+            "CheckoutRequestID": checkout_request_id,
+        }
+        async with self.semaphore:
+            await self.rate_limiter.acquire()
+            async with self.session.post(
+                f"{self.base_url}/mpesa/stkpushquery/v1/query",
+                json=payload,
+                headers={"Authorization": f"Bearer {self.access_token}"},
+            ) as response:
+                data = await response.json(content_type=None)
+        if 'ResultCode' in data:
+            return str(data['ResultCode'])
+        if str(data.get('errorCode', '')).startswith(STILL_PROCESSING_ERROR):
+            return None
+        raise RuntimeError(f"Unexpected STK query response for {checkout_request_id}: {data}")
+
+
+async def fetch_access_token(session, base_url):
+    async with session.get(
+        f"{base_url}/oauth/v1/generate?grant_type=client_credentials",
+        auth=aiohttp.BasicAuth(settings.MPESA_CONSUMER_KEY, settings.MPESA_CONSUMER_SECRET),
+    ) as response:
+        response.raise_for_status()
+        return (await response.json(content_type=None))['access_token']
+
+
+async def query_batch(checkout_request_ids, base_url, concurrency, rate, timeout):
+    """Queries a batch concurrently; returns ({checkout id: result code}, error count)."""
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        access_token = await fetch_access_token(session, base_url)
+        client = StkStatusClient(session, base_url, access_token, concurrency, rate)
+        outcomes = await asyncio.gather(
+            *(client.query(checkout_id) for checkout_id in checkout_request_ids), return_exceptions=True
+        )
+    results = {}
+    errors = 0
+    for checkout_id, outcome in zip(checkout_request_ids, outcomes):
+        if isinstance(outcome, Exception):
+            errors += 1
+        elif outcome is not None:
+            results[checkout_id] = outcome
+    return results, errors
+
+
+def reconcile_pending_payments(older_than_minutes=None, batch_size=500, concurrency=50, rate=100,
+                               base_url=None, timeout=30):
+    """
+    Queries Daraja for every stale pending payment and applies the outcomes
+    with the same transition as MpesaCallbackView, one batched update per
+    batch. Payments Daraja still reports as processing stay pending.
+    """
+    base_url = base_url or settings.SAFARICOM_API
+    stats = {'queried': 0, 'completed': 0, 'failed': 0, 'still_pending': 0, 'errors': 0}
+    for batch in stale_pending_payments(older_than_minutes, batch_size):
+        checkout_request_ids = [checkout_id for _, checkout_id in batch]
+        results, errors = asyncio.run(query_batch(checkout_request_ids, base_url, concurrency, rate, timeout))
+        applied = apply_stk_results(results)
+        stats['queried'] += len(batch)
+        stats['completed'] += applied['completed']
+        stats['failed'] += applied['failed']
+        stats['errors'] += errors
+        stats['still_pending'] += len(batch) - len(results) - errors
+    return stats
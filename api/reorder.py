@@ -0,0 +1,83 @@
+import math
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .analytics import read_frame, read_lines
+from .models import Product, Order, OrderItem
+
+
+def load_daily_demand(since, chunk_size=50000):
+    """(product_id, day, quantity) totals for orders created since `since`."""
+    orders = read_frame(Order.objects.filter(created_at__gte=since), ['id', 'created_at'], ['id', 'created_at'], chunk_size)
+    lines = read_lines(OrderItem, orders['id'].to_numpy(dtype='int64'), ['order_id', 'product_id', 'quantity'],
+                       ['order_id', 'product_id', 'quantity'], chunk_size)
+    day = ((pd.to_datetime(orders['created_at'], utc=True) - pd.Timestamp(since)) // pd.Timedelta(days=1)).to_numpy()
+    order_rows = pd.Index(orders['id']).get_indexer(lines['order_id'])
+    sold = order_rows >= 0
+    daily = pd.DataFrame({
+        'product_id': lines['product_id'].to_numpy(dtype='int64')[sold],
+        'day': day[order_rows[sold]],
+        'quantity': lines['quantity'].to_numpy(dtype='int64')[sold],
+    })
+    return daily.groupby(['product_id', 'day'], sort=False)['quantity'].sum().reset_index()
+
+
+def compute_reorder_points(daily, product_ids, lookback_days, lead_time_days, service_level_z, min_reorder_point):
+    """
+    Mean and standard deviation of each product's daily demand over the
+    lookback window (days without sales count as zero), and the reorder
+    point covering lead-time demand plus safety stock:
+    ceil(mean * lead_time + z * std * sqrt(lead_time)).
+    Returns (daily_demand, reorder_point) arrays aligned with `product_ids`.
+    """
+    rows = pd.Index(product_ids).get_indexer(daily['product_id'])
+    known = rows >= 0
+    quantity = daily['quantity'].to_numpy(dtype=float)[known]
+    total = np.bincount(rows[known], weights=quantity, minlength=len(product_ids))
+    squares = np.bincount(rows[known], weights=quantity ** 2, minlength=len(product_ids))
+    mean = total / lookback_days
+    std = np.sqrt(np.maximum(squares / lookback_days - mean ** 2, 0))
+    reorder_point = np.ceil(mean * lead_time_days + service_level_z * std * math.sqrt(lead_time_days))
+    return mean, np.maximum(reorder_point, min_reorder_point).astype('int64')
+
+
+def update_reorder_points(lookback_days=None, lead_time_days=None, service_level_z=None, batch_size=1000):
+    """
+    Recomputes demand velocity and reorder points for every product in one
+    pass over recent order lines, and writes back only the products whose
+    values changed, with one UPDATE per distinct (demand, reorder point)
+    pair so the many products sharing a value (e.g. no recent sales) are
+    updated together. Returns (products, updated).
+    """
+    config = settings.INVENTORY_REORDER
+    lookback_days = lookback_days or config['lookback_days']
+    lead_time_days = lead_time_days or config['lead_time_days']
+    service_level_z = config['service_level_z'] if service_level_z is None else service_level_z
+
+    since = timezone.now() - timedelta(days=lookback_days)
+    daily = load_daily_demand(since)
+    current = pd.DataFrame.from_records(
+        list(Product.objects.order_by('id').values_list('id', 'daily_demand', 'reorder_point')),
+        columns=['id', 'daily_demand', 'reorder_point']
+    )
+    demand, reorder_point = compute_reorder_points(
+        daily, current['id'].to_numpy(dtype='int64'), lookback_days, lead_time_days, service_level_z,
+        config['min_reorder_point']
+    )
+    demand = np.round(demand, 4)
+    changed = (reorder_point != current['reorder_point'].to_numpy()) | \
+        ~np.isclose(demand, current['daily_demand'].to_numpy(dtype=float))
+    updates = pd.DataFrame({
+        'id': current['id'].to_numpy()[changed], 'daily_demand': demand[changed], 'reorder_point': reorder_point[changed],
+    })
+    with transaction.atomic():
+        for (product_demand, product_reorder_point), ids in updates.groupby(['daily_demand', 'reorder_point'])['id']:
+            ids = ids.tolist()
+            for start in range(0, len(ids), batch_size):
+                Product.objects.filter(id__in=ids[start:start + batch_size]).update(
+                    daily_demand=float(product_demand), reorder_point=int(product_reorder_point)
+                )
+    return len(current), int(changed.sum())
@@ -1,5 +1,10 @@
 from rest_framework import serializers
-from .models import User, Product, Order, OrderItem, Payment, Notification, LoyaltyPoint
+from .models import (
+    User, Product, Order, OrderItem, Payment, Notification, LoyaltyPoint, ArchivedOrder, ArchivedOrderItem,
+    NotificationCampaign
+)
+from django.conf import settings
+from .fulfilment import ORDER_TRANSITIONS
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -23,7 +28,19 @@ class UserSerializer(serializers.ModelSerializer):
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'stock_level', 'category', 'image_url', 'created_at']
+        fields = ['id', 'name', 'description', 'price', 'stock_level', 'category', 'image_url', 'image_variants',
+                  'created_at']
+        read_only_fields = ['image_variants']
+
+    def update(self, instance, validated_data):
+        # Variants of the old image would be wrong until process_product_images rebuilds them.
+        if 'image_url' in validated_data and validated_data['image_url'] != instance.image_url:
+            validated_data['image_variants'] = {}
+        return super().update(instance, validated_data)
+
+class LowStockProductSerializer(ProductSerializer):
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['reorder_point', 'daily_demand']
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
@@ -53,6 +70,26 @@ class OrderSerializer(serializers.ModelSerializer):
             OrderItem.objects.create(order=order, **item_data)
         return order
 
+class BulkOrderStatusSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=1000)
+    status = serializers.ChoiceField(choices=list(ORDER_TRANSITIONS))
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    product = ProductSerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ['id', 'product', 'quantity', 'price']
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    user = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = ['id', 'user', 'total_amount', 'payment_method', 'status', 'created_at', 'notes', 'items']
+        read_only_fields = fields
+
 class PaymentSerializer(serializers.ModelSerializer):
     order = serializers.StringRelatedField(read_only=True)
     order_id = serializers.PrimaryKeyRelatedField(
@@ -73,6 +110,36 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = ['id', 'user', 'user_id', 'message', 'type', 'sent_at']
 
+class InboxNotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'message', 'type', 'sent_at', 'read_at']
+
+class CampaignSegmentSerializer(serializers.Serializer):
+    role = serializers.ChoiceField(choices=User.ROLE_CHOICES, required=False)
+    ordered_since = serializers.DateTimeField(required=False)
+    loyalty_tier = serializers.ChoiceField(choices=list(settings.LOYALTY_TIERS), required=False)
+
+    def to_internal_value(self, data):
+        validated = super().to_internal_value(data)
+        if 'ordered_since' in validated:
+            validated['ordered_since'] = validated['ordered_since'].isoformat()
+        return validated
+
+class NotificationCampaignSerializer(serializers.ModelSerializer):
+    segment = CampaignSegmentSerializer()
+    created_by = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = NotificationCampaign
+        fields = [
+            'id', 'created_by', 'message', 'type', 'segment', 'status', 'recipients', 'delivered',
+            'failed_deliveries', 'error', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = [
+            'status', 'recipients', 'delivered', 'failed_deliveries', 'error', 'created_at', 'started_at', 'finished_at'
+        ]
+
 class LoyaltyPointSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     user_id = serializers.PrimaryKeyRelatedField(
@@ -81,4 +148,8 @@ class LoyaltyPointSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = LoyaltyPoint
-        fields = ['id', 'user', 'user_id', 'points', 'earned_at']
\ No newline at end of file
+        fields = ['id', 'user', 'user_id', 'points', 'earned_at']
+
+class ProfileSamplingSerializer(serializers.Serializer):
+    sample_rate = serializers.FloatField(min_value=0, max_value=1)
+    minutes = serializers.IntegerField(min_value=1, max_value=settings.PROFILING['max_sample_minutes'], default=15)
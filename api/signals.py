@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Product, Notification
+from .facets import bump_facet_version
+from .typeahead import bump_typeahead_version
+from .notifications import adjust_unread_counts
+
+
+def changes_facets(product):
+    """Whether the last save moved the product between categories, price buckets or in/out of stock."""
+    previous = getattr(product, 'previous_values', {})
+    return product.changed('category', 'price') or 'stock_level' not in previous or \
+        (previous['stock_level'] > 0) != (product.stock_level > 0)
+
+
+@receiver(post_save, sender=Product)
+def invalidate_product_facets_on_save(sender, instance, created, **kwargs):
+    # After commit: bumped earlier, a concurrent request could cache pre-commit counts under the new version.
+    if created or changes_facets(instance):
+        transaction.on_commit(bump_facet_version)
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_product_facets_on_delete(sender, **kwargs):
+    transaction.on_commit(bump_facet_version)
+
+
+@receiver(post_save, sender=Product)
+def invalidate_typeahead_on_save(sender, instance, created, **kwargs):
+    if created or instance.changed('name', 'category'):
+        transaction.on_commit(bump_typeahead_version)
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_typeahead_on_delete(sender, **kwargs):
+    transaction.on_commit(bump_typeahead_version)
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    if created and instance.read_at is None:
+        adjust_unread_counts({instance.user_id: 1})
@@ -0,0 +1,95 @@
+"""
+Cold-start probe for a web worker, run in a fresh interpreter:
+
+    python -m api.startup
+
+Sets up Django, loads the WSGI application and serves one request that
+resolves through the full URLconf, then prints a JSON report of the time
+taken, the peak RSS and which provider SDKs ended up imported.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from importlib.util import find_spec
+from wsgiref.util import setup_testing_defaults
+
+# SDKs only some requests need; a worker must not import them to serve its first request.
+# (requests is not listed: DRF imports it itself when coreapi is installed.)
+LAZY_MODULES = ['twilio', 'sendgrid', 'aiohttp', 'pandas', 'numpy', 'scipy', 'pyarrow', 'channels_redis', 'PIL']
+if find_spec('MySQLdb') is not None:
+    LAZY_MODULES.append('pymysql')
+PROBE_PATH = '/api/dashboard/sales/'
+# Generous ceilings: importing pandas alone at startup adds ~80 MB of RSS.
+STARTUP_BUDGET = {'first_request_seconds': 2.0, 'peak_rss_mb': 110}
+
+
+def probe():
+    started = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+    setup_done = time.perf_counter()
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': PROBE_PATH, 'HTTP_HOST': _allowed_host()}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(environ, lambda status, headers: statuses.append(status))
+    list(response)
+    first_request_done = time.perf_counter()
+    return {
+        'status': statuses[0],
+        'setup_seconds': round(setup_done - started, 4),
+        'first_request_seconds': round(first_request_done - started, 4),
+        'peak_rss_mb': round(_peak_rss_kb() / 1024, 1),
+        'lazy_modules_loaded': sorted(name for name in LAZY_MODULES if name in sys.modules),
+    }
+
+
+def _peak_rss_kb():
+    # ru_maxrss survives exec on Linux, so it would report the parent's peak; VmHWM is per process image.
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _allowed_host():
+    from django.conf import settings
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+def measure_startup(importtime=False):
+    """Runs the probe in a child interpreter; returns (report, `-X importtime` lines or None)."""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-m', 'api.startup']
+    result = subprocess.run(command, capture_output=True, text=True, env=os.environ.copy(), check=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report, (result.stderr.splitlines() if importtime else None)
+
+
+def budget_violations(report, budget=STARTUP_BUDGET):
+    problems = [
+        f"{name} {report[name]} exceeds budget {limit}" for name, limit in budget.items() if report[name] > limit
+    ]
+    if report['lazy_modules_loaded']:
+        problems.append(f"provider SDKs imported at startup: {', '.join(report['lazy_modules_loaded'])}")
+    return problems
+
+
+def slowest_imports(importtime_lines, count=15):
+    """Top-level imports by cumulative import time (microseconds) from `-X importtime` output."""
+    totals = {}
+    for line in importtime_lines:
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            totals[name.strip()] = int(cumulative)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bizhub.settings')
+    print(json.dumps(probe()))
@@ -0,0 +1,235 @@
+"""
+Deterministic synthetic catalog and order history for benchmarks. The same
+seed and volumes always produce the same rows (ids aside), with the skew real
+shops show: a few categories and products take most sales, a few customers
+place most orders, order volume grows over the period with a weekly and daily
+rhythm, and older orders are further along the fulfilment pipeline.
+
+Rows are written with plain INSERTs so millions of them load in minutes; they
+are tagged (`synthetic-` usernames, `Synthetic product` names, `synthetic`
+order notes) so `clear_synthetic_data` can remove them again.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+from .facets import bump_facet_version
+from .typeahead import bump_typeahead_version
+from .models import User, Product, Order, OrderItem, LoyaltyPoint, Notification, ProductRecommendation
+
+USERNAME_PREFIX = 'synthetic-'
+PRODUCT_PREFIX = 'Synthetic product '
+ORDER_NOTES = 'synthetic'
+CATEGORIES = ['Electronics', 'Clothing', 'Groceries', 'Home', 'Beauty', 'Toys', 'Books', 'Sports',
+              'Garden', 'Automotive', 'Health', 'Office']
+PAYMENT_METHODS = ['M-Pesa', 'Card', 'Cash']
+PAYMENT_SHARES = [0.6, 0.25, 0.15]
+# Relative order volume per hour of the day (Africa/Nairobi), peaking at lunch and in the evening.
+HOURLY_VOLUME = [1, 1, 1, 1, 1, 2, 4, 6, 7, 8, 9, 11, 12, 11, 9, 8, 8, 9, 11, 12, 10, 7, 4, 2]
+WEEKDAY_VOLUME = [1.0, 0.95, 0.95, 1.0, 1.15, 1.3, 1.1]
+
+
+@dataclass(frozen=True)
+class Volumes:
+    products: int
+    customers: int
+    orders: int
+    items: int
+    days: int = 365
+
+    @classmethod
+    def parse(cls, spec):
+        """'products:customers:orders:items[:days]', e.g. '200000:50000:1000000:3000000'."""
+        return cls(*[int(part) for part in spec.split(':')])
+
+
+SIZES = {
+    'small': Volumes(products=1000, customers=500, orders=5000, items=15000),
+    'medium': Volumes(products=10000, customers=5000, orders=50000, items=150000),
+    'large': Volumes(products=200000, customers=50000, orders=1000000, items=3000000),
+}
+
+
+def zipf_weights(count, exponent, rng):
+    """Popularity weights 1/rank**exponent, with ranks shuffled so popularity is unrelated to id."""
+    weights = 1 / np.arange(1, count + 1) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+def insert_rows(model, columns, values, batch_size=5000):
+    """INSERTs the column arrays in `values` into the model's table with executemany."""
+    quote = connection.ops.quote_name
+    sql = (f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(quote(column) for column in columns)}) "
+           f"VALUES ({', '.join(['%s'] * len(columns))})")
+    rows = list(zip(*values))
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+    return len(rows)
+
+
+def inserted_ids(queryset):
+    return np.array(list(queryset.order_by('id').values_list('id', flat=True)), dtype='int64')
+
+
+def db_datetimes(values):
+    adapt = connection.ops.adapt_datetimefield_value
+    return [adapt(value) for value in values]
+
+
+def generate_products(rng, count, now):
+    category_weights = zipf_weights(len(CATEGORIES), 0.8, rng)
+    categories = rng.choice(len(CATEGORIES), count, p=category_weights)
+    prices = np.clip(np.round(rng.lognormal(3.0, 1.1, count), 2), 0.5, 50000)
+    # Most products are stocked; a tail is sold out or close to it.
+    stock = np.where(rng.random(count) < 0.05, 0, rng.negative_binomial(3, 0.05, count))
+    created = db_datetimes(now - timedelta(days=int(days)) for days in rng.integers(0, 730, count))
+    insert_rows(Product, ['name', 'description', 'price', 'stock_level', 'category', 'image_url', 'created_at',
+                          'updated_at', 'reorder_point', 'daily_demand', 'image_variants', 'image_source_hash'], [
+        [f'{PRODUCT_PREFIX}{i}' for i in range(count)],
+        [f'{CATEGORIES[category]} item {i}' for i, category in enumerate(categories)],
+        [f'{price:.2f}' for price in prices],
+        stock.tolist(),
+        [CATEGORIES[category] for category in categories],
+        [f'https://example.com/products/{i}.jpg' for i in range(count)],
+        created,
+        created,
+        [5] * count,
+        [0.0] * count,
+        ['{}'] * count,
+        [''] * count,
+    ])
+    return inserted_ids(Product.objects.filter(name__startswith=PRODUCT_PREFIX)), prices
+
+
+def generate_customers(rng, count, now):
+    joined = db_datetimes(now - timedelta(days=int(days)) for days in rng.integers(0, 730, count))
+    insert_rows(User, ['password', 'is_superuser', 'username', 'first_name', 'last_name', 'email', 'is_staff',
+                       'is_active', 'date_joined', 'role', 'phone_number'], [
+        ['!'] * count,
+        [False] * count,
+        [f'{USERNAME_PREFIX}{i}' for i in range(count)],
+        [''] * count,
+        [''] * count,
+        [f'{USERNAME_PREFIX}{i}@example.com' for i in range(count)],
+        [False] * count,
+        [True] * count,
+        joined,
+        ['customer'] * count,
+        [f'+2547{i:08d}' for i in range(count)],
+    ])
+    return inserted_ids(User.objects.filter(username__startswith=USERNAME_PREFIX))
+
+
+def order_times(rng, count, days, now):
+    """Order timestamps over the last `days` days: growing volume, busier weekends and daytime hours."""
+    start = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    day_index = np.arange(days)
+    weekdays = np.array([(start + timedelta(days=int(day))).weekday() for day in day_index])
+    day_weights = (1 + day_index / days) * np.array(WEEKDAY_VOLUME)[weekdays]
+    order_days = rng.choice(days, count, p=day_weights / day_weights.sum())
+    hours = rng.choice(24, count, p=np.array(HOURLY_VOLUME) / sum(HOURLY_VOLUME))
+    seconds = order_days * 86400 + hours * 3600 + rng.integers(0, 3600, count)
+    seconds.sort()
+    local_start = timezone.localtime(start)
+    return [min(local_start + timedelta(seconds=int(offset)), now) for offset in seconds]
+
+
+def generate_orders(rng, volumes, customer_ids, product_ids, prices, now):
+    count = volumes.orders
+    # Log-normal customer activity: the top fifth of customers place about two thirds of the orders.
+    activity = rng.lognormal(0, 1.2, len(customer_ids))
+    users = customer_ids[rng.choice(len(customer_ids), count, p=activity / activity.sum())]
+    created = order_times(rng, count, volumes.days, now)
+    age_days = np.array([(now - value).total_seconds() / 86400 for value in created])
+    statuses = np.where(age_days > 7, 'shipped', np.where(age_days > 1, 'confirmed', 'pending'))
+    methods = rng.choice(len(PAYMENT_METHODS), count, p=PAYMENT_SHARES)
+
+    # Lines per order: at least one, the rest Poisson so the total is close to `items`.
+    lines = 1 + rng.poisson(max(volumes.items / count - 1, 0), count)
+    line_orders = np.repeat(np.arange(count), lines)
+    line_products = rng.choice(len(product_ids), len(line_orders), p=zipf_weights(len(product_ids), 1.1, rng))
+    quantities = rng.geometric(0.7, len(line_orders))
+    line_prices = prices[line_products]
+    totals = np.bincount(line_orders, weights=line_prices * quantities, minlength=count)
+
+    created_db = db_datetimes(created)
+    insert_rows(Order, ['user_id', 'total_amount', 'payment_method', 'status', 'created_at', 'updated_at', 'notes'], [
+        users.tolist(),
+        [f'{total:.2f}' for total in totals],
+        [PAYMENT_METHODS[method] for method in methods],
+        statuses.tolist(),
+        created_db,
+        created_db,
+        [ORDER_NOTES] * count,
+    ])
+    order_ids = inserted_ids(Order.objects.filter(notes=ORDER_NOTES))
+    insert_rows(OrderItem, ['order_id', 'product_id', 'quantity', 'price'], [
+        order_ids[line_orders].tolist(),
+        product_ids[line_products].tolist(),
+        quantities.tolist(),
+        [f'{price:.2f}' for price in line_prices],
+    ])
+    insert_rows(LoyaltyPoint, ['user_id', 'points', 'earned_at'], [
+        users.tolist(),
+        (totals // 10).astype('int64').tolist(),
+        created_db,
+    ])
+    return len(line_orders)
+
+
+def generate_notifications(rng, customer_ids, per_customer, now):
+    """A few notifications per customer (skewed), most of them read."""
+    counts = rng.poisson(per_customer, len(customer_ids))
+    users = np.repeat(customer_ids, counts)
+    sent = [now - timedelta(minutes=int(minutes)) for minutes in rng.integers(0, 60 * 24 * 90, len(users))]
+    read = rng.random(len(users)) < 0.8
+    insert_rows(Notification, ['user_id', 'message', 'type', 'sent_at', 'read_at'], [
+        users.tolist(),
+        ['Your order has shipped'] * len(users),
+        np.where(rng.random(len(users)) < 0.5, 'SMS', 'email').tolist(),
+        db_datetimes(sent),
+        [adapted if is_read else None for adapted, is_read in zip(db_datetimes(sent), read)],
+    ])
+    return len(users)
+
+
+def generate_synthetic_data(volumes, seed=42, notifications_per_customer=4):
+    """
+    Seeds `volumes` of synthetic data in one transaction. Returns a dict of
+    row counts per table.
+    """
+    if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+        raise ValueError("Synthetic data already exists; clear it first.")
+    rng = np.random.default_rng(seed)
+    now = timezone.now().replace(microsecond=0)
+    with transaction.atomic():
+        product_ids, prices = generate_products(rng, volumes.products, now)
+        customer_ids = generate_customers(rng, volumes.customers, now)
+        items = generate_orders(rng, volumes, customer_ids, product_ids, prices, now)
+        notifications = generate_notifications(rng, customer_ids, notifications_per_customer, now)
+    bump_facet_version()
+    bump_typeahead_version()
+    return {'products': volumes.products, 'customers': volumes.customers, 'orders': volumes.orders,
+            'order_items': items, 'notifications': notifications}
+
+
+def clear_synthetic_data():
+    """Deletes everything `generate_synthetic_data` created, with one DELETE per table rather than row by row."""
+    orders = Order.objects.filter(notes=ORDER_NOTES)
+    customers = User.objects.filter(username__startswith=USERNAME_PREFIX)
+    products = Product.objects.filter(name__startswith=PRODUCT_PREFIX)
+    with transaction.atomic():
+        deleted = sum(queryset._raw_delete(connection.alias) for queryset in [
+            OrderItem.objects.filter(order__in=orders),
+            LoyaltyPoint.objects.filter(user__in=customers),
+            Notification.objects.filter(user__in=customers),
+            ProductRecommendation.objects.filter(product__in=products),
+            orders,
+            products,
+        ])
+        deleted += customers.delete()[0]
+    bump_facet_version()
+    bump_typeahead_version()
+    return deleted
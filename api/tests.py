@@ -1,13 +1,96 @@
 from django.test import TestCase
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
-from .models import Product, Order, OrderItem, Payment, Notification, LoyaltyPoint
-from django.urls import reverse
+from .models import Product, Order, OrderItem, Payment, Notification, LoyaltyPoint, ArchivedOrder, ArchivedOrderItem, NotificationCampaign, IdempotencyKey, StockShard, FlashSale
+from django.urls import resolve, reverse
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+import asyncio
+import threading
+import socket
+from aiohttp import web
 from rest_framework import status
 from decimal import Decimal
+from io import BytesIO, StringIO
+from django.core.management import call_command
+from rest_framework.renderers import JSONRenderer
+import msgpack
+import marshal
+import os
+import tempfile
+import pyarrow.parquet as pq
+from .serializers import ProductSerializer, OrderSerializer
+from .fast_serializers import FastProductSerializer, FastOrderSerializer
+from .renderers import OrjsonRenderer
+from .load_shedding import LoadShedder, LoadSheddingMiddleware
+from .notifications import unread_count_key
+from .facets import bump_facet_version, get_facet_version
+from django.core.cache import cache
+from django.test import override_settings
+from unittest import mock
+from .campaigns import run_campaign
+from .dashboard import METRICS as DASHBOARD_METRICS, metric_key
+from .synthetic import Volumes, generate_synthetic_data, clear_synthetic_data
+from .benchmarks import find_regressions, uncovered_routes
+from .startup import budget_violations, measure_startup
+from .flash_sales import start_flash_sale, reconcile_flash_sales
+from .images import ImageSourceError, fetch_original, serve_media
+from .typeahead import typeahead_index
+from .reconciliation import reconcile_pending_payments
+from .profiling import Recording, issue_token
+from .admin import LargeTablePaginator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from rest_framework_simplejwt.tokens import AccessToken
+from .realtime import order_event, publish_order_events
+from .routing import websocket_urlpatterns
+from .websocket_auth import JWTAuthMiddleware
 
 User = get_user_model()
 
+class DarajaStub:
+    """Local stand-in for the Daraja OAuth and STK query endpoints, served from a background thread."""
+
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    async def token(self, request):
+        return web.json_response({'access_token': 'stub-token', 'expires_in': '3599'})
+
+    async def stk_query(self, request):
+        checkout_id = (await request.json())['CheckoutRequestID']
+        self.queries.append(checkout_id)
+        if self.results.get(checkout_id) is None:
+            return web.json_response({'errorCode': '500.001.1001', 'errorMessage': 'The transaction is being processed'}, status=500)
+        return web.json_response({'ResultCode': self.results[checkout_id], 'ResultDesc': 'stub'})
+
+    def __enter__(self):
+        self.loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_get('/oauth/v1/generate', self.token)
+        app.router.add_post('/mpesa/stkpushquery/v1/query', self.stk_query)
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        self.loop.run_until_complete(site.start())
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
 class BizHubAPITestCase(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -104,4 +187,815 @@ class BizHubAPITestCase(TestCase):
         )
         response = self.client.get(reverse('dashboard-sales'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(response.data['total_sales'], 999.99)
\ No newline at end of file
+        self.assertGreaterEqual(response.data['total_sales'], 999.99)
+
+    def test_product_facets(self):
+        self.client.force_authenticate(user=self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                name='Mug', description='Coffee mug', price=12.50,
+                stock_level=0, category='Kitchen'
+            )
+        response = self.client.get(reverse('product-list-create'), {'facets': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        facets = response.data['facets']
+        self.assertEqual(facets['in_stock'], 1)
+        self.assertEqual({row['category']: row['count'] for row in facets['categories']}, {'Electronics': 1, 'Kitchen': 1})
+        self.assertEqual(sum(bucket['count'] for bucket in facets['price_ranges']), 2)
+
+        response = self.client.get(reverse('product-list-create'), {'facets': 'true', 'category': 'Kitchen'})
+        self.assertEqual(response.data['facets']['in_stock'], 0)
+        self.assertNotIn('facets', self.client.get(reverse('product-list-create')).data)
+
+        # Stock changes only invalidate the counts when a product goes in or out of stock, and only once committed.
+        version = get_facet_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock_level = 3
+            self.product.save()
+        self.assertEqual(get_facet_version(), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock_level = 0
+            self.product.save()
+            self.assertEqual(get_facet_version(), version)
+        self.assertEqual(self.client.get(reverse('product-list-create'), {'facets': 'true'}).data['facets']['in_stock'], 0)
+
+        # A version key lost to eviction restarts above the old one, never at a version that may still be cached.
+        version = get_facet_version()
+        cache.delete('product_facets:version')
+        bump_facet_version()
+        self.assertGreater(get_facet_version(), version)
+
+    def test_audit_queries_command(self):
+        out = StringIO()
+        call_command('audit_queries', '--seed', '50', stdout=out)
+        output = out.getvalue()
+        self.assertIn('LowStockView', output)
+        self.assertIn('MpesaCallbackView: ok', output)
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_fast_serializers_match_model_serializers(self):
+        Product.objects.create(
+            name='Caf\u00e9 \u2028 mug', description='', price=Decimal('3.50'), stock_level=0, category='Kitchen'
+        )
+        order = Order.objects.create(user=self.customer, total_amount=Decimal('1003.49'), payment_method='Cash')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('999.99'))
+        OrderItem.objects.create(order=order, product=Product.objects.get(category='Kitchen'), quantity=1, price=Decimal('3.50'))
+        Order.objects.create(user=self.admin, total_amount=0, payment_method='Card')
+
+        cases = [
+            (ProductSerializer, FastProductSerializer, Product.objects.order_by('id')),
+            (OrderSerializer, FastOrderSerializer, Order.objects.order_by('id')),
+        ]
+        for serializer_class, fast_class, queryset in cases:
+            expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+            fast = fast_class()
+            self.assertEqual(OrjsonRenderer().render(fast.serialize(fast.values(queryset))), expected)
+
+    def test_product_list_msgpack(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('product-list-create'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data['results'][0]['price'], '999.99')
+
+    def test_archive_orders(self):
+        old_order = Order.objects.create(
+            user=self.customer, total_amount=Decimal('999.99'), payment_method='M-Pesa', status='shipped'
+        )
+        Order.objects.filter(id=old_order.id).update(created_at=timezone.now() - timedelta(days=400))
+        OrderItem.objects.create(order=old_order, product=self.product, quantity=1, price=Decimal('999.99'))
+        Payment.objects.create(order=old_order, amount=Decimal('999.99'), payment_method='M-Pesa', status='completed')
+        recent_order = Order.objects.create(
+            user=self.customer, total_amount=Decimal('10.00'), payment_method='Cash', status='shipped'
+        )
+
+        call_command('archive_orders', '--days', '365', stdout=StringIO())
+        self.assertEqual(list(Order.objects.values_list('id', flat=True)), [recent_order.id])
+        self.assertTrue(ArchivedOrder.objects.filter(id=old_order.id).exists())
+        self.assertEqual(ArchivedOrderItem.objects.filter(order_id=old_order.id).count(), 1)
+        self.assertFalse(Payment.objects.exists())
+        call_command('verify_order_archive', stdout=StringIO())
+
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get(reverse('order-detail', args=[old_order.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['items'][0]['product']['name'], 'Laptop')
+        response = self.client.get(reverse('order-list-create'))
+        self.assertEqual([order['id'] for order in response.data['results']], [old_order.id, recent_order.id])
+        self.assertEqual(len(response.data['results'][0]['items']), 1)
+
+        self.client.force_authenticate(user=self.staff)
+        self.assertEqual(self.client.get(reverse('order-list-create')).data['count'], 2)
+
+    def create_pending_payment(self, checkout_id, age=timedelta(hours=1)):
+        order = Order.objects.create(user=self.customer, total_amount=Decimal('50.00'), payment_method='M-Pesa')
+        Order.objects.filter(id=order.id).update(created_at=timezone.now() - age)
+        return Payment.objects.create(
+            order=order, amount=Decimal('50.00'), payment_method='M-Pesa', transaction_id=checkout_id, status='pending'
+        )
+
+    def test_mpesa_callback_is_idempotent(self):
+        payment = self.create_pending_payment('ws_CO_callback')
+        body = {'Body': {'stkCallback': {'CheckoutRequestID': 'ws_CO_callback', 'ResultCode': 0, 'ResultDesc': 'ok'}}}
+        for _ in range(2):
+            response = self.client.post(reverse('mpesa-callback'), body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+        self.assertEqual(payment.order.status, 'confirmed')
+        self.assertEqual(Notification.objects.filter(user=self.customer).count(), 1)
+
+    def test_reconcile_payments_against_stub(self):
+        completed = self.create_pending_payment('ws_CO_1')
+        self.create_pending_payment('ws_CO_2')
+        self.create_pending_payment('ws_CO_3')
+        self.create_pending_payment('ws_CO_4', age=timedelta(0))
+        with DarajaStub({'ws_CO_1': '0', 'ws_CO_2': '1032', 'ws_CO_4': '0'}) as stub:
+            out = StringIO()
+            call_command('reconcile_payments', '--base-url', stub.url, '--batch-size', '2', '--rate', '1000', stdout=out)
+        self.assertCountEqual(stub.queries, ['ws_CO_1', 'ws_CO_2', 'ws_CO_3'])
+        self.assertIn('1 completed, 1 failed, 1 still pending, 0 errors', out.getvalue())
+        statuses = dict(Payment.objects.values_list('transaction_id', 'status'))
+        self.assertEqual(statuses, {'ws_CO_1': 'completed', 'ws_CO_2': 'failed', 'ws_CO_3': 'pending', 'ws_CO_4': 'pending'})
+        self.assertEqual(Order.objects.get(id=completed.order_id).status, 'confirmed')
+
+    def test_reconcile_payment_started_at_checkout(self):
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post(reverse('order-list-create'), {
+            'user_id': self.customer.id, 'total_amount': '0.00', 'payment_method': 'M-Pesa',
+            'items': [{'product_id': self.product.id, 'quantity': 1, 'price': '999.99'}],
+        }, format='json')
+        order_id = response.data['id']
+        stk = mock.Mock(status_code=200, json=mock.Mock(return_value={'CheckoutRequestID': 'ws_CO_checkout'}))
+        with mock.patch('api.views.MpesaPaymentView.get_mpesa_access_token', return_value='token'), \
+                mock.patch('requests.post', return_value=stk):
+            self.client.post(reverse('mpesa-payment'), {'order_id': order_id, 'amount': '999.99'}, format='json')
+        self.assertEqual(Payment.objects.get(order_id=order_id).transaction_id, 'ws_CO_checkout')
+
+        Order.objects.filter(id=order_id).update(created_at=timezone.now() - timedelta(hours=1))
+        with DarajaStub({'ws_CO_checkout': '0'}) as stub:
+            self.assertEqual(reconcile_pending_payments(base_url=stub.url, rate=1000)['completed'], 1)
+        self.assertEqual(Payment.objects.get(order_id=order_id).status, 'completed')
+        self.assertEqual(Order.objects.get(id=order_id).status, 'confirmed')
+
+    def test_load_shedding_rejects_low_priority_first(self):
+        shedder = LoadShedder(capacity=4, headroom=[1.0, 0.5], classes={
+            'checkout': {'priority': 0, 'initial': 4, 'min_limit': 1, 'max_limit': 4, 'target_latency': 1.0},
+            'search': {'priority': 1, 'initial': 4, 'min_limit': 1, 'max_limit': 4, 'target_latency': 1.0},
+        })
+        search_permits = [shedder.try_acquire('search') for _ in range(2)]
+        self.assertIsNone(shedder.try_acquire('search'))
+        checkout_permits = [shedder.try_acquire('checkout') for _ in range(2)]
+        self.assertTrue(all(checkout_permits))
+        self.assertIsNone(shedder.try_acquire('checkout'))
+
+        middleware = LoadSheddingMiddleware(lambda request: HttpResponse(), shedder=shedder)
+        response = middleware(RequestFactory().get(reverse('product-search')))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+        for permit in search_permits + checkout_permits:
+            shedder.release(permit)
+        self.assertEqual(middleware(RequestFactory().get(reverse('product-search'))).status_code, 200)
+        self.assertEqual(middleware.classify(RequestFactory().post(reverse('order-list-create'))), 'checkout')
+        self.assertEqual(middleware.classify(RequestFactory().get(reverse('order-list-create'))), 'default')
+
+    def test_notification_inbox(self):
+        cache.delete(unread_count_key(self.customer.id))
+        notifications = [
+            Notification.objects.create(user=self.customer, message=f'Message {i}', type='SMS') for i in range(5)
+        ]
+        Notification.objects.create(user=self.admin, message='Not yours', type='email')
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.get(reverse('notification-unread-count'))
+        self.assertEqual(response.data['unread_count'], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(user=self.customer, message='Message 5', type='SMS')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('notification-unread-count')).data['unread_count'], 6)
+
+        response = self.client.get(reverse('notification-inbox'), {'limit': 4})
+        first_page = [n['message'] for n in response.data['results']]
+        self.assertEqual(first_page, ['Message 5', 'Message 4', 'Message 3', 'Message 2'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([n['message'] for n in response.data['results']], ['Message 1', 'Message 0'])
+        self.assertIsNone(response.data['next'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notification-mark-read'), {'up_to': notifications[2].id}, format='json')
+        self.assertEqual(response.data['marked_read'], 3)
+        self.assertEqual(self.client.get(reverse('notification-unread-count')).data['unread_count'], 3)
+        self.assertEqual(Notification.objects.filter(user=self.customer, read_at__isnull=True).count(), 3)
+
+    @override_settings(NOTIFICATION_CAMPAIGN_CHUNK_SIZE=2)
+    def test_notification_campaign(self):
+        for i in range(4):
+            User.objects.create_user(username=f'buyer{i}', email=f'buyer{i}@bizhub.com', password='pass1234')
+        LoyaltyPoint.objects.create(user=self.customer, points=150)
+        self.client.force_authenticate(user=self.staff)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('notification-campaigns'), {
+                'message': 'Flash sale tonight', 'type': 'email', 'segment': {'role': 'customer'}
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(callbacks), 1)
+
+        with mock.patch('api.campaigns.send_email_batch', side_effect=lambda emails, message: (len(emails), 0)) as send:
+            run_campaign(response.data['id'])
+        self.assertEqual([len(call.args[0]) for call in send.call_args_list], [2, 2, 1])
+        self.assertEqual(Notification.objects.filter(message='Flash sale tonight').count(), 5)
+        campaign = self.client.get(reverse('notification-campaign-detail', args=[response.data['id']])).data
+        self.assertEqual((campaign['status'], campaign['recipients'], campaign['delivered']), ('completed', 5, 5))
+
+        silver = NotificationCampaign.objects.create(message='Thanks', type='SMS', segment={'loyalty_tier': 'silver'})
+        with mock.patch('api.campaigns.send_sms_batch', return_value=(1, 0)):
+            run_campaign(silver.id)
+        self.assertEqual(list(Notification.objects.filter(message='Thanks').values_list('user_id', flat=True)), [self.customer.id])
+
+        # A worker that died mid-campaign is taken over once its lease lapses, resuming after the last recipient.
+        buyers = list(User.objects.filter(username__startswith='buyer').order_by('id'))
+        stranded = NotificationCampaign.objects.create(
+            message='Resumed', type='email', segment={'role': 'customer'}, status='running',
+            heartbeat_at=timezone.now(), last_recipient_id=buyers[1].id, recipients=3, delivered=3
+        )
+        with mock.patch('api.campaigns.send_email_batch', side_effect=lambda emails, message: (len(emails), 0)) as send:
+            run_campaign(stranded.id)
+            send.assert_not_called()
+            NotificationCampaign.objects.filter(id=stranded.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+            run_campaign(stranded.id)
+        self.assertEqual(
+            set(Notification.objects.filter(message='Resumed').values_list('user_id', flat=True)), {buyers[2].id, buyers[3].id}
+        )
+        stranded.refresh_from_db()
+        self.assertEqual((stranded.status, stranded.recipients, stranded.delivered), ('completed', 5, 5))
+
+    def test_dashboard_analytics(self):
+        other = User.objects.create_user(username='buyer', email='buyer@bizhub.com', password='pass1234')
+        book = Product.objects.create(name='Novel', price=20, stock_level=5, category='Books')
+        today = timezone.localdate()
+        month_start = today.replace(day=1)
+        previous_month = (month_start - timedelta(days=1)).replace(day=15)
+        for user, method, day, items in [
+            (self.customer, 'Cash', previous_month, [(self.product, 1, '999.99')]),
+            (self.customer, 'M-Pesa', month_start, [(book, 2, '20.00')]),
+            (other, 'Cash', month_start, [(book, 1, '20.00'), (self.product, 1, '999.99')]),
+        ]:
+            order = Order.objects.create(user=user, payment_method=method, total_amount=sum(
+                Decimal(price) * quantity for _, quantity, price in items
+            ))
+            Order.objects.filter(id=order.id).update(created_at=timezone.make_aware(datetime.combine(day, time(12))))
+            for product, quantity, price in items:
+                OrderItem.objects.create(order=order, product=product, quantity=quantity, price=Decimal(price))
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('dashboard-analytics'), {'start': previous_month.isoformat(), 'end': today.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['orders'], 3)
+        self.assertEqual(response.data['average_order_value'], round((999.99 + 40 + 1019.99) / 3, 2))
+        self.assertEqual(response.data['repeat_purchase_rate'], 0.5)
+        self.assertIn({'day': month_start.isoformat(), 'category': 'Books', 'payment_method': 'Cash', 'revenue': 20.0},
+                      response.data['revenue_by_day'])
+        self.assertEqual(response.data['cohort_retention'][0]['retention'], [1.0, 1.0])
+        self.assertEqual(response.data['cohort_retention'][1]['customers'], 1)
+
+        response = self.client.get(reverse('dashboard-analytics'), {'start': '2001-01-01', 'end': '2001-01-31'})
+        self.assertEqual((response.data['orders'], response.data['revenue_by_day']), (0, []))
+        response = self.client.get(reverse('dashboard-analytics'), {'start': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_orders_parquet(self):
+        order = Order.objects.create(user=self.customer, total_amount=Decimal('999.99'), payment_method='Cash')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('999.99'))
+        LoyaltyPoint.objects.create(user=self.customer, points=10)
+        with tempfile.TemporaryDirectory() as root:
+            call_command('export_orders', output=root, settle_seconds=0, stdout=StringIO())
+            month = f"month={timezone.localtime(order.created_at):%Y-%m}"
+            orders = pq.read_table(os.path.join(root, 'orders', month))
+            self.assertEqual(orders.column('id').to_pylist(), [order.id])
+            self.assertEqual(orders.column('total_amount').to_pylist(), [Decimal('999.99')])
+            self.assertEqual(pq.read_table(os.path.join(root, 'order_items', month)).num_rows, 1)
+
+            order.status = 'shipped'
+            order.save()
+            Order.objects.create(user=self.customer, total_amount=Decimal('5.00'), payment_method='Cash')
+            out = StringIO()
+            call_command('export_orders', output=root, settle_seconds=0, stdout=out)
+            self.assertIn('2 orders, 0 order_items, 0 payments, 0 loyalty_points', out.getvalue())
+            latest = pq.read_table(os.path.join(root, 'orders')).to_pandas().sort_values('updated_at').groupby('id').last()
+            self.assertEqual(latest.loc[order.id, 'status'], 'shipped')
+
+    def test_compute_reorder_points(self):
+        slow = Product.objects.create(name='Cable', price=5, stock_level=3, category='Electronics')
+        for quantity in (4, 2, 3):
+            order = Order.objects.create(user=self.customer, total_amount=Decimal('0'), payment_method='Cash')
+            OrderItem.objects.create(order=order, product=self.product, quantity=quantity, price=Decimal('999.99'))
+        call_command('compute_reorder_points', lookback_days=10, lead_time_days=4, service_level_z=0, stdout=StringIO())
+
+        self.product.refresh_from_db()
+        slow.refresh_from_db()
+        self.assertAlmostEqual(self.product.daily_demand, 0.9)
+        self.assertEqual(self.product.reorder_point, 4)
+        self.assertEqual((slow.daily_demand, slow.reorder_point), (0, 1))
+
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(reverse('low-stock'))
+        self.assertEqual(response.data, [])
+        Product.objects.filter(id=self.product.id).update(stock_level=4)
+        response = self.client.get(reverse('low-stock'))
+        self.assertEqual([(row['name'], row['reorder_point']) for row in response.data], [('Laptop', 4)])
+
+    def test_product_recommendations(self):
+        mouse = Product.objects.create(name='Mouse', price=20, stock_level=50, category='Electronics')
+        bag = Product.objects.create(name='Laptop bag', price=40, stock_level=50, category='Accessories')
+
+        def place_order(*products):
+            order = Order.objects.create(user=self.customer, total_amount=Decimal('0'), payment_method='Cash')
+            for product in products:
+                OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+
+        place_order(self.product, mouse)
+        place_order(self.product, mouse, bag)
+        place_order(self.product, bag)
+        place_order(mouse)
+        with tempfile.TemporaryDirectory() as root:
+            call_command('build_recommendations', output=root, settle_seconds=0, stdout=StringIO())
+            response = self.client.get(reverse('product-recommendations', args=[self.product.id]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([row['name'] for row in response.data], ['Laptop bag', 'Mouse'])
+            self.assertEqual(response.data[0]['score'], round(2 / (3 * 2) ** 0.5, 4))
+            self.assertEqual(response.data[1]['score'], round(2 / 3, 4))
+
+            place_order(self.product, mouse)
+            out = StringIO()
+            call_command('build_recommendations', output=root, settle_seconds=0, stdout=out)
+            self.assertIn('Added 1 orders', out.getvalue())
+            response = self.client.get(reverse('product-recommendations', args=[self.product.id]))
+            self.assertEqual([row['name'] for row in response.data], ['Mouse', 'Laptop bag'])
+            self.assertEqual(self.client.get(reverse('product-recommendations', args=[bag.id + 1])).status_code,
+                             status.HTTP_404_NOT_FOUND)
+
+    def test_worker_cold_start_budget(self):
+        report, _ = measure_startup()
+        self.assertEqual(report['status'], '401 Unauthorized')
+        self.assertEqual(report['lazy_modules_loaded'], [])
+        # Time and RSS depend on the machine; slow CI runners can opt out of those with SKIP_STARTUP_BUDGET=1.
+        if not os.environ.get('SKIP_STARTUP_BUDGET'):
+            self.assertEqual(budget_violations(report), [])
+
+    def test_startup_budget_violations(self):
+        report = {
+            'status': '401 Unauthorized', 'setup_seconds': 0.4, 'first_request_seconds': 0.6, 'peak_rss_mb': 70.0,
+            'lazy_modules_loaded': [],
+        }
+        self.assertEqual(budget_violations(report), [])
+        report.update(first_request_seconds=2.5, lazy_modules_loaded=['pandas', 'twilio'])
+        self.assertEqual(budget_violations(report), [
+            'first_request_seconds 2.5 exceeds budget 2.0', 'provider SDKs imported at startup: pandas, twilio'
+        ])
+
+    def test_idempotency_key_replays_mpesa_payment(self):
+        order = Order.objects.create(user=self.customer, total_amount=Decimal('100.00'), payment_method='M-Pesa')
+        self.client.force_authenticate(user=self.customer)
+        url = reverse('mpesa-payment')
+        body = {'order_id': order.id, 'amount': '100.00'}
+        stk = mock.Mock(status_code=200, json=mock.Mock(return_value={'CheckoutRequestID': 'ws_CO_idem'}))
+        with mock.patch('api.views.MpesaPaymentView.get_mpesa_access_token', return_value='token'), \
+                mock.patch('requests.post', return_value=stk) as stk_push:
+            first = self.client.post(url, body, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+            retry = self.client.post(url, body, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+            reused = self.client.post(url, {**body, 'amount': '1.00'}, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+
+            # A duplicate arriving while the first request is still running waits for its response.
+            record = IdempotencyKey.objects.create(
+                user=self.customer, key='pay-2', request_hash=IdempotencyKey.objects.get(key='pay-1').request_hash,
+                locked_at=timezone.now(), expires_at=timezone.now() + timedelta(hours=1)
+            )
+            finish = lambda _: IdempotencyKey.objects.filter(pk=record.pk).update(
+                status='completed', response_status=200, response_body={'CheckoutRequestID': 'ws_CO_other'}
+            )
+            with mock.patch('api.idempotency.time.sleep', side_effect=finish):
+                waited = self.client.post(url, body, format='json', HTTP_IDEMPOTENCY_KEY='pay-2')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(stk_push.call_count, 1)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(reused.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(waited.data, {'CheckoutRequestID': 'ws_CO_other'})
+        self.assertEqual(Payment.objects.filter(order=order).count(), 1)
+
+    def test_async_read_views_match_sync_views(self):
+        order = Order.objects.create(user=self.customer, total_amount=Decimal('999.99'), payment_method='Cash')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('999.99'))
+        token = self.client.post(reverse('login'), {'username': 'staff', 'password': 'staff123'}, format='json').data['access']
+        cases = [
+            (reverse('product-list-create') + '?category=Electronics&facets=true', token),
+            (reverse('product-search') + '?q=lap', None),
+            (reverse('product-search') + '?page=9', None),
+            (reverse('product-detail', args=[self.product.id]), token),
+            (reverse('product-detail', args=[self.product.id]), None),
+            (reverse('order-detail', args=[order.id]), token),
+            (reverse('order-detail', args=[order.id + 1]), token),
+        ]
+        responses = {}
+        for async_reads in (True, False):
+            with override_settings(ASYNC_READS=async_reads):
+                responses[async_reads] = [
+                    self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {auth}' if auth else '') for url, auth in cases
+                ]
+        for async_response, sync_response in zip(responses[True], responses[False]):
+            self.assertEqual((async_response.status_code, async_response.content),
+                             (sync_response.status_code, sync_response.content))
+        self.assertEqual([response.status_code for response in responses[True]], [200, 200, 404, 200, 401, 200, 404])
+        self.assertEqual(responses[True][5].data['items'][0]['product']['name'], 'Laptop')
+        # Off, the DRF view itself is resolved: under WSGI an async view would cost two thread hops.
+        for async_reads in (True, False):
+            with override_settings(ASYNC_READS=async_reads):
+                self.assertEqual(iscoroutinefunction(resolve(reverse('product-list-create')).func), async_reads)
+
+    def test_dashboard_summary_serves_stale_and_refreshes_once(self):
+        cache.delete_many([metric_key(name) for name in DASHBOARD_METRICS])
+        self.client.force_authenticate(user=self.admin)
+        url = reverse('dashboard-summary')
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.data['inventory'], [{'name': 'Laptop', 'stock_level': 10}])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+            self.client.get(reverse('dashboard-inventory'))
+
+        Product.objects.filter(id=self.product.id).update(stock_level=3)
+        stale = {'value': response.data['inventory'], 'computed_at': 0}
+        cache.set(metric_key('inventory'), stale)
+        with mock.patch('api.dashboard.threading.Thread') as thread, self.assertNumQueries(0):
+            responses = [self.client.get(url) for _ in range(3)]
+        self.assertTrue(all(r.data['inventory'] == [{'name': 'Laptop', 'stock_level': 10}] for r in responses))
+        self.assertEqual(thread.call_count, 1)
+
+        thread.call_args.kwargs['target']()
+        self.assertEqual(self.client.get(url).data['inventory'], [{'name': 'Laptop', 'stock_level': 3}])
+
+    def test_synthetic_data_is_deterministic_and_routes_are_benchmarked(self):
+        def snapshot():
+            return (
+                list(Product.objects.filter(name__startswith='Synthetic').order_by('id').values_list(
+                    'name', 'price', 'stock_level', 'category')),
+                list(OrderItem.objects.filter(order__notes='synthetic').order_by('id').values_list(
+                    'order__user__username', 'order__total_amount', 'product__name', 'quantity', 'price')),
+            )
+        volumes = Volumes(products=50, customers=20, orders=100, items=300, days=30)
+        counts = generate_synthetic_data(volumes, seed=7)
+        first = snapshot()
+        self.assertEqual(counts['orders'], 100)
+        self.assertEqual(len(first[1]), counts['order_items'])
+        clear_synthetic_data()
+        self.assertFalse(Order.objects.filter(notes='synthetic').exists())
+        generate_synthetic_data(volumes, seed=7)
+        self.assertEqual(snapshot(), first)
+
+        self.assertEqual(uncovered_routes(), [])
+        baseline = {'small': {'GET product-search': {'status': 200, 'latency_ms': 4.0, 'queries': 1, 'peak_kb': 70}}}
+        current = {'small': {'GET product-search': {'status': 200, 'latency_ms': 5.0, 'queries': 11, 'peak_kb': 70}}}
+        self.assertEqual(find_regressions(current, baseline, 1.5), ['small GET product-search: queries 1 -> 11'])
+
+    def test_flash_sale_claims_from_shards_without_overselling(self):
+        self.client.force_authenticate(user=self.customer)
+
+        def order(quantity):
+            return self.client.post(reverse('order-list-create'), {
+                'user_id': self.customer.id, 'total_amount': '0.00', 'payment_method': 'Cash',
+                'items': [{'product_id': self.product.id, 'quantity': quantity, 'price': '999.99'}],
+            }, format='json')
+
+        sale = start_flash_sale(self.product.id, shard_count=3, units=4)
+        self.assertEqual(sorted(StockShard.objects.filter(sale=sale).values_list('remaining', flat=True)), [1, 1, 2])
+        # No shard holds 3 units, so the claim gathers them into one shard first.
+        self.assertEqual(order(3).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(order(2).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(order(1).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(order(1).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Product.objects.get(id=self.product.id).stock_level, 10)
+
+        version = get_facet_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reconcile_flash_sales(), {sale.id: 4})
+        self.assertNotEqual(get_facet_version(), version)
+        sale.refresh_from_db()
+        self.assertFalse(sale.active)
+        self.assertFalse(StockShard.objects.filter(sale=sale).exists())
+        self.assertEqual(Product.objects.get(id=self.product.id).stock_level, 6)
+        self.assertEqual(order(1).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Product.objects.get(id=self.product.id).stock_level, 5)
+
+        # A checkout after `ends_at` ends the sale itself instead of claiming from it.
+        sale = start_flash_sale(self.product.id, shard_count=2, units=2, minutes=5)
+        self.assertEqual(order(1).status_code, status.HTTP_201_CREATED)
+        FlashSale.objects.filter(pk=sale.pk).update(ends_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(order(1).status_code, status.HTTP_201_CREATED)
+        sale.refresh_from_db()
+        self.assertFalse(sale.active)
+        self.assertEqual(Product.objects.get(id=self.product.id).stock_level, 3)
+
+    def test_bulk_order_status_transition(self):
+        orders = {order_status: Order.objects.create(user=self.customer, total_amount=10, payment_method='Cash',
+                                                     status=order_status)
+                  for order_status in ('pending', 'confirmed', 'shipped')}
+        ids = [orders['pending'].id, orders['confirmed'].id, orders['shipped'].id, 999999]
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post(reverse('order-bulk-status'), {'order_ids': ids, 'status': 'shipped'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.staff)
+        with mock.patch('api.fulfilment.publish_order_events') as publish, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('order-bulk-status'), {'order_ids': ids, 'status': 'shipped'},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], ids[:2])
+        self.assertEqual(response.data['skipped'], [
+            {'id': ids[2], 'reason': 'cannot move from shipped to shipped'}, {'id': 999999, 'reason': 'not_found'},
+        ])
+        self.assertEqual(Order.objects.filter(status='shipped').count(), 3)
+        self.assertEqual(Notification.objects.filter(user=self.customer).count(), 2)
+        [events], _ = publish.call_args
+        self.assertEqual([(event['order_id'], event['user_id'], event['status']) for event in events],
+                         [(ids[0], self.customer.id, 'shipped'), (ids[1], self.customer.id, 'shipped')])
+
+    def test_product_image_variants_are_built_once_per_source(self):
+        from PIL import Image
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root, PRODUCT_IMAGES={**settings.PRODUCT_IMAGES, 'source_dir': media_root}):
+            for url in ('file:///etc/passwd', f'file://{media_root}/../../dev/zero', '/media/../../etc/passwd',
+                        'http://127.0.0.1/image.png', 'http://10.0.0.8/image.png', 'http://[::1]/image.png',
+                        'http://169.254.169.254/latest/meta-data/'):
+                with self.assertRaises(ImageSourceError, msg=url):
+                    fetch_original(url)
+            source = os.path.join(media_root, 'original.png')
+            Image.new('RGB', (2000, 1000), 'red').save(source)
+            Product.objects.filter(id=self.product.id).update(image_url=f'file://{source}')
+            out = StringIO()
+            call_command('process_product_images', stdout=out)
+            self.assertIn('Processed 1 product images', out.getvalue())
+            variants = Product.objects.get(id=self.product.id).image_variants
+            self.assertEqual((variants['thumb']['width'], variants['thumb']['height']), (160, 80))
+            self.assertEqual(variants['full']['width'], 1200)
+            self.assertTrue(variants['card']['webp'].startswith('/media/images/'))
+
+            self.client.force_authenticate(user=self.staff)
+            self.assertEqual(self.client.get(reverse('product-detail', args=[self.product.id])).data['image_variants'],
+                             variants)
+            request = RequestFactory().get(variants['thumb']['jpeg'])
+            response = serve_media(request, variants['thumb']['jpeg'][len('/media/'):])
+            self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(Image.open(BytesIO(b''.join(response.streaming_content))).format, 'JPEG')
+
+            call_command('process_product_images', '--recheck', stdout=out)
+            self.assertIn('Processed 0 product images (1 unchanged', out.getvalue())
+            Image.new('RGB', (2000, 1000), 'blue').save(source)
+            call_command('process_product_images', '--recheck', stdout=out)
+            self.assertNotEqual(Product.objects.get(id=self.product.id).image_variants, variants)
+
+            response = self.client.patch(reverse('product-detail', args=[self.product.id]),
+                                         {'image_url': 'https://example.com/new.jpg'}, format='json')
+            self.assertEqual(response.data['image_variants'], {})
+
+            # Ingested originals are stored as absolute URLs, so the product still validates, and read from storage.
+            call_command('ingest_product_image', self.product.id, source, stdout=out)
+            product = Product.objects.get(id=self.product.id)
+            self.assertTrue(product.image_url.startswith(f'{settings.MEDIA_BASE_URL}/media/originals/'))
+            product.full_clean()
+            self.assertEqual(product.image_source_url, product.image_url)
+            self.assertTrue(product.image_variants)
+
+    def test_remote_image_fetch_connects_to_the_checked_address(self):
+        answers = {'images.example.com': '93.184.216.34', 'rebound.example.com': '10.0.0.8'}
+        resolve = lambda host, *args, **kwargs: [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (answers[host], 80))]
+        image = mock.Mock(status=200, get_redirect_location=mock.Mock(return_value=False),
+                          stream=mock.Mock(return_value=[b'image']))
+        with mock.patch('api.images.socket.getaddrinfo', side_effect=resolve), \
+                mock.patch('urllib3.HTTPConnectionPool.urlopen', autospec=True, return_value=image) as urlopen:
+            self.assertEqual(fetch_original('http://images.example.com:8080/a.png?v=2'), b'image')
+            pool, method, target = urlopen.call_args.args
+            self.assertEqual((pool.host, pool.port, method, target), ('93.184.216.34', 8080, 'GET', '/a.png?v=2'))
+            self.assertEqual(urlopen.call_args.kwargs['headers'], {'Host': 'images.example.com:8080'})
+
+            # Every redirect hop is resolved and checked again before connecting.
+            redirect = mock.Mock(status=302, get_redirect_location=mock.Mock(return_value='http://rebound.example.com/'))
+            urlopen.return_value = redirect
+            with self.assertRaisesRegex(ImageSourceError, 'non-public address'):
+                fetch_original('http://images.example.com/a.png')
+            self.assertEqual(urlopen.call_count, 2)
+
+    def test_conditional_get_and_if_match(self):
+        self.client.force_authenticate(user=self.staff)
+        url = reverse('product-detail', args=[self.product.id])
+        for async_reads in (True, False):
+            with override_settings(ASYNC_READS=async_reads):
+                response = self.client.get(url)
+                etag = response['ETag']
+                with self.assertNumQueries(1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response.content, b'')
+                list_url = reverse('product-list-create')
+                list_etag = self.client.get(list_url, {'category': 'Electronics'})['ETag']
+                self.assertEqual(self.client.get(list_url, {'category': 'Electronics'},
+                                                 HTTP_IF_NONE_MATCH=list_etag).status_code, 304)
+                self.assertNotEqual(self.client.get(list_url, {'category': 'Other'})['ETag'], list_etag)
+
+        response = self.client.patch(url, {'stock_level': 8}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        response = self.client.patch(url, {'stock_level': 7}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Product.objects.get(id=self.product.id).stock_level, 8)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(list_url, {'category': 'Electronics'},
+                                         HTTP_IF_NONE_MATCH=list_etag).status_code, status.HTTP_200_OK)
+
+        order = Order.objects.create(user=self.customer, total_amount=10, payment_method='Cash')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=10)
+        order_url = reverse('order-detail', args=[order.id])
+        order_etag = self.client.get(order_url)['ETag']
+        self.assertEqual(self.client.get(order_url, HTTP_IF_NONE_MATCH=order_etag).status_code, 304)
+        self.product.save()
+        self.assertEqual(self.client.get(order_url, HTTP_IF_NONE_MATCH=order_etag).status_code, 200)
+
+        # Edits of products a list doesn't show (e.g. a checkout's stock update) leave its ETag alone.
+        mug = Product.objects.create(name='Mug', description='Mug', price=5, stock_level=3, category='Kitchen')
+        self.client.force_authenticate(user=self.customer)
+        order_list_url = reverse('order-list-create')
+        order_list_etag = self.client.get(order_list_url)['ETag']
+        mug.stock_level = 2
+        mug.save()
+        self.assertEqual(self.client.get(order_list_url, HTTP_IF_NONE_MATCH=order_list_etag).status_code, 304)
+        self.product.save()
+        self.assertEqual(self.client.get(order_list_url, HTTP_IF_NONE_MATCH=order_list_etag).status_code, 200)
+        self.client.force_authenticate(user=self.staff)
+        list_etag = self.client.get(list_url, {'category': 'Electronics'})['ETag']
+        mug.save()
+        self.assertEqual(self.client.get(list_url, {'category': 'Electronics'},
+                                         HTTP_IF_NONE_MATCH=list_etag).status_code, 304)
+
+    def test_product_autocomplete(self):
+        typeahead_index.reset()
+        Product.objects.create(name='Lap desk (bamboo)', description='Desk', price=20, stock_level=4,
+                               category='Home', image_url='https://example.com/desk.jpg')
+        url = reverse('product-autocomplete')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'q': 'LAP'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['name'] for result in response.json()['results']], ['Lap desk (bamboo)', 'Laptop'])
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'q': 'bamb', 'limit': 1})
+        self.assertEqual(response.json()['results'][0]['name'], 'Lap desk (bamboo)')
+        self.assertEqual(self.client.get(url, {'q': 'elec'}).json()['categories'], ['Electronics'])
+        self.assertEqual(self.client.get(url, {'q': ' '}).json(), {'results': [], 'categories': []})
+
+        # Stock updates (every checkout) leave the index alone; new products rebuild it once committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock_level -= 1
+            self.product.save()
+        typeahead_index.checked_at = 0
+        with mock.patch.object(typeahead_index, 'start_refresh') as start_refresh:
+            self.client.get(url, {'q': 'tab'})
+        start_refresh.assert_not_called()
+        with self.captureOnCommitCallbacks(execute=True):
+            tablet = Product.objects.create(name='Tablet', description='Tablet', price=299, stock_level=3,
+                                            category='Electronics', image_url='https://example.com/tablet.jpg')
+        typeahead_index.checked_at = 0
+        with mock.patch.object(typeahead_index, 'start_refresh') as start_refresh:
+            self.client.get(url, {'q': 'tab'})
+        start_refresh.assert_called_once()
+        typeahead_index.index = None
+        self.assertEqual(self.client.get(url, {'q': 'tab'}).json()['results'], [{'id': tablet.id, 'name': 'Tablet'}])
+        typeahead_index.reset()
+
+    def test_request_profiling(self):
+        cache.clear()
+        self.client.force_authenticate(user=self.admin)
+        token = self.client.post(reverse('profile-token')).data['token']
+        self.client.force_authenticate(user=self.customer)
+        order_list = reverse('order-list-create')
+        response = self.client.get(order_list, HTTP_X_PROFILE=token)
+        profile_id = int(response['X-Profile-Id'])
+        # Tokens are single use, and nothing else is profiled without sampling.
+        self.assertNotIn('X-Profile-Id', self.client.get(order_list, HTTP_X_PROFILE=token))
+        self.assertNotIn('X-Profile-Id', self.client.get(order_list))
+        self.assertEqual(self.client.get(reverse('profile-list')).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        [summary] = self.client.get(reverse('profile-list')).data['results']
+        self.assertEqual((summary['id'], summary['path'], summary['trigger'], summary['user_id']),
+                         (profile_id, order_list, 'header', self.customer.id))
+        detail = self.client.get(reverse('profile-detail', args=[profile_id])).data
+        self.assertEqual(detail['query_count'], len(detail['queries']))
+        self.assertTrue(any('api_order' in query['sql'] for query in detail['queries']))
+        folded = self.client.get(reverse('profile-detail', args=[profile_id]), {'download': 'collapsed'})
+        for line in folded.content.decode().splitlines():
+            self.assertRegex(line, r'^[^;]+(;[^;]+)* \d+$')
+        pstats_file = self.client.get(reverse('profile-detail', args=[profile_id]), {'download': 'pstats'})
+        self.assertEqual(pstats_file['Content-Disposition'], f'attachment; filename="profile-{profile_id}.prof"')
+        view_functions = {name for filename, _, name in marshal.loads(pstats_file.content)
+                          if filename.endswith(os.path.join('api', 'views.py'))}
+        self.assertIn('list', view_functions)
+
+        with override_settings(PROFILING={**settings.PROFILING, 'buffer_size': 2}):
+            self.client.put(reverse('profile-sampling'), {'sample_rate': 1, 'minutes': 5}, format='json')
+            self.client = APIClient()
+            for _ in range(3):
+                self.client.get(reverse('product-autocomplete'), {'q': 'lap'})
+            self.client.force_authenticate(user=self.admin)
+            self.client.put(reverse('profile-sampling'), {'sample_rate': 0}, format='json')
+            self.assertEqual([profile['trigger'] for profile in self.client.get(reverse('profile-list')).data['results']],
+                             ['sampled', 'sampled'])
+        # A thread already profiled for another request serves this one unprofiled.
+        outer = Recording('header')
+        self.assertTrue(outer.attach())
+        try:
+            response = self.client.get(reverse('product-autocomplete'), {'q': 'lap'}, HTTP_X_PROFILE=issue_token())
+        finally:
+            outer.detach()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', response)
+        with override_settings(PROFILING={**settings.PROFILING, 'enabled': False}):
+            self.client = APIClient()
+            self.assertNotIn('X-Profile-Id', self.client.get(order_list, HTTP_X_PROFILE=issue_token()))
+
+    def test_admin_changelists_for_large_tables(self):
+        self.client.force_login(User.objects.create_superuser('root', 'root@bizhub.com', 'root123'))
+
+        def add_orders(count):
+            for i in range(count):
+                order = Order.objects.create(user=self.customer, total_amount=10, payment_method='M-Pesa')
+                OrderItem.objects.create(order=order, product=self.product, quantity=1, price=10)
+                Payment.objects.create(order=order, amount=10, payment_method='M-Pesa', transaction_id=f'ws_CO_{order.id}')
+            return order
+
+        def changelist_queries(model):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(f'/admin/api/{model}/').status_code, 200)
+            return len(queries)
+
+        add_orders(3)
+        before = {model: changelist_queries(model) for model in ('order', 'orderitem', 'payment')}
+        order = add_orders(20)
+        self.assertEqual({model: changelist_queries(model) for model in before}, before)
+
+        with mock.patch.object(LargeTablePaginator, 'max_count', 5):
+            response = self.client.get('/admin/api/order/')
+            # Unfiltered: SQLite's estimate is the largest rowid; filtered: counted up to max_count.
+            self.assertEqual(response.context['cl'].result_count, order.id)
+            self.assertEqual(self.client.get('/admin/api/order/', {'status__exact': 'pending'}).context['cl'].result_count, 5)
+        self.assertEqual(list(self.client.get('/admin/api/order/', {'q': str(order.id)}).context['cl'].result_list),
+                         [order])
+        self.assertEqual(len(self.client.get('/admin/api/order/', {'q': 'laptop'}).context['cl'].result_list), 0)
+        self.assertEqual(list(self.client.get('/admin/api/payment/', {'q': f'ws_CO_{order.id}'}).context['cl'].result_list),
+                         [order.payment])
+        self.assertEqual(self.client.get(f'/admin/api/order/{order.id}/change/').status_code, 200)
+
+    def test_order_websocket_groups(self):
+        other = User.objects.create_user(username='other', email='other@bizhub.com', password='other123', role='customer')
+        own = Order.objects.create(user=self.customer, total_amount=10, payment_method='M-Pesa')
+        foreign = Order.objects.create(user=other, total_amount=10, payment_method='M-Pesa')
+        application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+
+        def socket(user=None):
+            return WebsocketCommunicator(application, f"/ws/orders/?token={AccessToken.for_user(user)}" if user else '/ws/orders/')
+
+        async def received(communicator):
+            events = []
+            while not await communicator.receive_nothing(timeout=0.05):
+                events.append(await communicator.receive_json_from())
+            return [(event['event'], event['order_id']) for event in events]
+
+        async def scenario():
+            anonymous = socket()
+            connected, code = await anonymous.connect()
+            self.assertEqual((connected, code), (False, 4401))
+
+            customer, staff = socket(self.customer), socket(self.staff)
+            self.assertTrue((await customer.connect())[0])
+            self.assertTrue((await staff.connect())[0])
+            await customer.send_json_to({'action': 'subscribe', 'order_id': foreign.id})
+            self.assertEqual(await customer.receive_json_from(), {'type': 'error', 'error': 'Order not found'})
+            await customer.send_json_to({'action': 'subscribe', 'stream': 'orders'})
+            self.assertEqual((await customer.receive_json_from())['type'], 'error')
+            await customer.send_json_to({'action': 'subscribe', 'order_id': own.id})
+            self.assertEqual(await customer.receive_json_from(), {'type': 'subscribed', 'group': f'order.{own.id}'})
+            await staff.send_json_to({'action': 'subscribe', 'stream': 'orders', 'status': 'shipped'})
+            self.assertEqual((await staff.receive_json_from())['type'], 'subscribed')
+
+            await sync_to_async(publish_order_events)([
+                order_event('order.status', own.id, self.customer.id, 'processing', 'Processing'),
+                order_event('order.status', foreign.id, other.id, 'shipped', 'Shipped'),
+                order_event('payment.completed', own.id, self.customer.id, 'confirmed', 'Paid'),
+            ])
+            # In both the user and order groups, yet each event arrives once.
+            self.assertEqual(await received(customer), [('order.status', own.id), ('payment.completed', own.id)])
+            self.assertEqual(await received(staff), [('order.status', foreign.id)])
+            await customer.disconnect()
+            await staff.disconnect()
+
+        async_to_sync(scenario)()
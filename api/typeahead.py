@@ -0,0 +1,154 @@
+"""
+In-process prefix index for the product name typeahead. Every word start in
+a product's lowercased name is one entry, packed into an int64 array as
+(product slot << 8 | offset) and sorted by the text from that offset on, so
+a prefix lookup is a binary search plus a short scan, with no per-entry
+string kept in memory. Categories (a few hundred at most) are a sorted list.
+
+The index is rebuilt in a background thread when the typeahead version has
+changed, checked at most every `TYPEAHEAD['refresh_interval']` seconds;
+requests keep using the previous index meanwhile. The version is bumped
+(after commit) when a product is created or deleted or its name or category
+changes, not by the stock updates every checkout makes.
+
+At 200k products (names of ~25 characters, 4 words) the index holds 800k
+entries: ~6 MB for the entry array, ~23 MB with the names and ids, and a
+lookup takes ~15 µs (p99 ~35 µs). A build takes ~2 s and peaks at ~100 MB
+while sorting. `manage.py bench_typeahead` measures it on other data.
+"""
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from .models import Product
+
+MAX_WORDS = 8
+VERSION_KEY = 'typeahead:version'
+
+
+# A letter or digit not preceded by one.
+WORD_START = re.compile(r'(?<![^\W_])[^\W_]')
+
+
+# Seeded from the clock like the facet version (api.facets).
+def get_typeahead_version():
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def bump_typeahead_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def word_starts(text):
+    return [match.start() for match in WORD_START.finditer(text, 0, 256)]
+
+
+class PrefixIndex:
+    def __init__(self, products, version=None):
+        """`products`: (id, name, category) rows."""
+        self.version = version
+        self.ids = array('q')
+        self.names = []
+        lowered = []
+        entries = []
+        categories = set()
+        for product_id, name, category in products:
+            slot = len(self.names)
+            self.ids.append(product_id)
+            self.names.append(name)
+            text = name.lower()
+            lowered.append(text)
+            entries.extend(slot << 8 | offset for offset in word_starts(text)[:MAX_WORDS])
+            if category:
+                categories.add(category)
+        entries.sort(key=lambda entry: lowered[entry >> 8][entry & 0xff:])
+        self.entries = array('q', entries)
+        self.categories = sorted(categories, key=str.lower)
+        self.category_keys = [category.lower() for category in self.categories]
+
+    def text(self, entry):
+        return self.names[entry >> 8].lower()[entry & 0xff:]
+
+    def search(self, prefix, limit):
+        """Up to `limit` (id, name) pairs with a word starting with `prefix`, in order of the matched text."""
+        prefix = prefix.lower()
+        results, seen = [], set()
+        position = bisect_left(self.entries, prefix, key=self.text)
+        while position < len(self.entries) and len(results) < limit:
+            entry = self.entries[position]
+            if not self.text(entry).startswith(prefix):
+                break
+            slot = entry >> 8
+            if slot not in seen:
+                seen.add(slot)
+                results.append((self.ids[slot], self.names[slot]))
+            position += 1
+        return results
+
+    def search_categories(self, prefix, limit):
+        prefix = prefix.lower()
+        position = bisect_left(self.category_keys, prefix)
+        matches = []
+        while position < len(self.categories) and len(matches) < limit and \
+                self.category_keys[position].startswith(prefix):
+            matches.append(self.categories[position])
+            position += 1
+        return matches
+
+
+def build_index():
+    # Read before the rows, so a change committed meanwhile leaves the index a version behind and rebuilt again.
+    version = get_typeahead_version()
+    return PrefixIndex(Product.objects.order_by().values_list('id', 'name', 'category').iterator(chunk_size=5000),
+                       version)
+
+
+class TypeaheadIndex:
+    """The process-wide index: built on first use, then refreshed in the background when products change."""
+
+    def __init__(self):
+        self.index = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+        self.refreshing = False
+
+    def get(self):
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self.index = build_index()
+                    self.checked_at = time.monotonic()
+            return self.index
+        now = time.monotonic()
+        if now - self.checked_at > settings.TYPEAHEAD['refresh_interval']:
+            self.checked_at = now
+            if get_typeahead_version() != self.index.version:
+                self.start_refresh()
+        return self.index
+
+    def start_refresh(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+
+        def run():
+            try:
+                self.index = build_index()
+            finally:
+                self.refreshing = False
+                connections.close_all()
+        threading.Thread(target=run, name='typeahead-refresh', daemon=True).start()
+
+    def reset(self):
+        self.index = None
+
+
+typeahead_index = TypeaheadIndex()
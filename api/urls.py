@@ -1,9 +1,15 @@
 from django.urls import path
 from .views import (
-    RegisterView, ProductListCreateView, ProductDetailView, ProductSearchView,
-    LowStockView, OrderListCreateView, OrderDetailView, MpesaPaymentView,
-    MpesaCallbackView, NotificationView, LoyaltyPointView, DashboardSalesView,
-    DashboardBestSellersView, DashboardInventoryView, DashboardCustomersView
+    RegisterView, ProductAutocompleteView, ProductRecommendationsView,
+    LowStockView, OrderListCreateView, OrderBulkStatusView, MpesaPaymentView,
+    MpesaCallbackView, NotificationView, NotificationInboxView, NotificationMarkReadView,
+    NotificationUnreadCountView, NotificationCampaignListCreateView, NotificationCampaignDetailView,
+    LoyaltyPointView, DashboardSalesView,
+    DashboardBestSellersView, DashboardSummaryView, DashboardAnalyticsView, DashboardInventoryView, DashboardCustomersView,
+    ProfileListView, ProfileSamplingView, ProfileTokenView, ProfileDetailView
+)
+from .async_views import (
+    AsyncProductListView, AsyncProductDetailView, AsyncProductSearchView, AsyncOrderDetailView, read_path
 )
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
@@ -11,18 +17,32 @@ urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', TokenObtainPairView.as_view(), name='login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('products/', ProductListCreateView.as_view(), name='product-list-create'),
-    path('products/search/', ProductSearchView.as_view(), name='product-search'),
-    path('products/<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
+    read_path('products/', AsyncProductListView, 'product-list-create'),
+    read_path('products/search/', AsyncProductSearchView, 'product-search'),
+    path('products/autocomplete/', ProductAutocompleteView.as_view(), name='product-autocomplete'),
+    read_path('products/<int:pk>/', AsyncProductDetailView, 'product-detail'),
+    path('products/<int:pk>/recommendations/', ProductRecommendationsView.as_view(), name='product-recommendations'),
     path('inventory/low-stock/', LowStockView.as_view(), name='low-stock'),
     path('orders/', OrderListCreateView.as_view(), name='order-list-create'),
-    path('orders/<int:pk>/', OrderDetailView.as_view(), name='order-detail'),
+    read_path('orders/<int:pk>/', AsyncOrderDetailView, 'order-detail'),
+    path('orders/status/', OrderBulkStatusView.as_view(), name='order-bulk-status'),
     path('payments/mpesa/', MpesaPaymentView.as_view(), name='mpesa-payment'),
     path('payments/mpesa/callback/', MpesaCallbackView.as_view(), name='mpesa-callback'),
     path('notifications/', NotificationView.as_view(), name='notifications'),
+    path('notifications/inbox/', NotificationInboxView.as_view(), name='notification-inbox'),
+    path('notifications/inbox/read/', NotificationMarkReadView.as_view(), name='notification-mark-read'),
+    path('notifications/inbox/unread-count/', NotificationUnreadCountView.as_view(), name='notification-unread-count'),
+    path('notifications/campaigns/', NotificationCampaignListCreateView.as_view(), name='notification-campaigns'),
+    path('notifications/campaigns/<int:pk>/', NotificationCampaignDetailView.as_view(), name='notification-campaign-detail'),
     path('loyalty-points/', LoyaltyPointView.as_view(), name='loyalty-points'),
     path('dashboard/sales/', DashboardSalesView.as_view(), name='dashboard-sales'),
     path('dashboard/best-sellers/', DashboardBestSellersView.as_view(), name='dashboard-best-sellers'),
+    path('dashboard/summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
+    path('dashboard/analytics/', DashboardAnalyticsView.as_view(), name='dashboard-analytics'),
     path('dashboard/inventory/', DashboardInventoryView.as_view(), name='dashboard-inventory'),
     path('dashboard/customers/', DashboardCustomersView.as_view(), name='dashboard-customers'),
+    path('profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('profiles/sampling/', ProfileSamplingView.as_view(), name='profile-sampling'),
+    path('profiles/token/', ProfileTokenView.as_view(), name='profile-token'),
+    path('profiles/<int:pk>/', ProfileDetailView.as_view(), name='profile-detail'),
 ]
\ No newline at end of file
@@ -1,30 +1,64 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, generics
+from rest_framework import status, generics, serializers
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import BrowsableAPIRenderer
+from django.core.paginator import Paginator
 from django.db.models import Q
-from .models import User, Product, Order, OrderItem, Payment, Notification, LoyaltyPoint
-from .serializers import UserSerializer, ProductSerializer, OrderSerializer, PaymentSerializer, NotificationSerializer, LoyaltyPointSerializer
+from .models import User, Product, Order, Payment, Notification, LoyaltyPoint, ArchivedOrder, NotificationCampaign, ProductRecommendation
+from .serializers import UserSerializer, ProductSerializer, OrderSerializer, PaymentSerializer, NotificationSerializer, LoyaltyPointSerializer, LowStockProductSerializer, ArchivedOrderSerializer, InboxNotificationSerializer, NotificationCampaignSerializer, BulkOrderStatusSerializer, ProfileSamplingSerializer
 from .permissions import IsAdminOrStaff, IsAdmin, IsOrderOwnerOrStaff
+from .facets import product_facets, get_facet_version
+from .fast_serializers import FastProductSerializer, FastOrderHistorySerializer
+from .renderers import OrjsonRenderer, MsgpackRenderer
+from .payments import apply_stk_results
+from .realtime import order_event, publish_order_events
+from .notifications import get_unread_count, adjust_unread_counts
+from .campaigns import start_campaign
+from .idempotency import idempotent
+from .dashboard import METRICS as DASHBOARD_METRICS, get_metric, get_metrics
+from .flash_sales import active_flash_sales, claim_flash_stock
+from .fulfilment import transition_orders
+from .typeahead import typeahead_index
+from .profiling import (
+    HEADER as PROFILE_HEADER, collapsed_stacks, get_profile, get_sample_rate, issue_token, list_profiles, set_sample_rate
+)
+from .conditional import (
+    IfMatchMixin, conditional_response, is_not_modified, not_modified_response, order_etag, order_list_etag,
+    product_etag, product_list_state, queryset_etag
+)
 from django.db import transaction
+from django.utils import timezone
 from django.conf import settings
-import requests
-from twilio.rest import Client
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from .integrations import twilio_client, sendgrid_client, sendgrid_mail
 from datetime import datetime, timedelta
 import base64
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 
 def some_view(request):
+    from channels.layers import get_channel_layer
     channel_layer = get_channel_layer()
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    known_count = None
+
+    def paginate_queryset(self, queryset, request, view=None, count=None):
+        """`count`: the queryset's row count when the caller has it already (e.g. from the list's ETag)."""
+        self.known_count = count
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = Paginator(object_list, per_page)
+        if self.known_count is not None:
+            paginator.count = self.known_count
+        return paginator
+
+FAST_RENDERER_CLASSES = [OrjsonRenderer, MsgpackRenderer, BrowsableAPIRenderer]
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -36,6 +70,7 @@ class ProductListCreateView(generics.ListCreateAPIView):
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrStaff]
     pagination_class = StandardResultsSetPagination
+    renderer_classes = FAST_RENDERER_CLASSES
 
     def get_queryset(self):
         queryset = Product.objects.all()
@@ -55,37 +90,113 @@ class ProductListCreateView(generics.ListCreateAPIView):
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        facets = request.query_params.get('facets') == 'true'
+        state = product_list_state(queryset)
+        etag = queryset_etag(request, state, get_facet_version() if facets else None)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        fast_serializer = FastProductSerializer()
+        page = self.paginator.paginate_queryset(fast_serializer.values(queryset), request, view=self,
+                                                count=state['count'])
+        response = self.get_paginated_response(fast_serializer.serialize(page))
+        if facets:
+            response.data['facets'] = product_facets(self.get_queryset(), request.query_params)
+        response['ETag'] = etag
+        return response
+
 class ProductSearchView(APIView):
     permission_classes = [AllowAny]
+    load_class = 'search'
     pagination_class = StandardResultsSetPagination
+    renderer_classes = FAST_RENDERER_CLASSES
 
     def get(self, request):
         query = request.query_params.get('q', '')
         queryset = Product.objects.filter(
             Q(name__icontains=query) | Q(category__icontains=query)
         )
+        state = product_list_state(queryset)
+        etag = queryset_etag(request, state)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        fast_serializer = FastProductSerializer()
         paginator = self.pagination_class()
-        result_page = paginator.paginate_queryset(queryset, request)
-        serializer = ProductSerializer(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        result_page = paginator.paginate_queryset(fast_serializer.values(queryset), request, count=state['count'])
+        response = paginator.get_paginated_response(fast_serializer.serialize(result_page))
+        response['ETag'] = etag
+        return response
+
+class ProductAutocompleteView(APIView):
+    """
+    Typeahead for the storefront search box: ids and names of products with a
+    word starting with `q`, plus matching categories, from the in-process
+    prefix index (api.typeahead) without touching the database.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    load_class = 'search'
+    renderer_classes = FAST_RENDERER_CLASSES
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+    def get(self, request):
+        prefix = request.query_params.get('q', '').strip()
+        try:
+            limit = min(int(request.query_params.get('limit', settings.TYPEAHEAD['limit'])),
+                        settings.TYPEAHEAD['max_limit'])
+        except ValueError:
+            limit = settings.TYPEAHEAD['limit']
+        if not prefix or limit < 1:
+            return Response({"results": [], "categories": []})
+        index = typeahead_index.get()
+        return Response({
+            "results": [{"id": product_id, "name": name} for product_id, name in index.search(prefix, limit)],
+            "categories": index.search_categories(prefix, limit),
+        })
+
+
+class ProductDetailView(IfMatchMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrStaff]
 
+    def get_etag(self, product):
+        return product_etag(self.request, product)
+
+    def retrieve(self, request, *args, **kwargs):
+        product = self.get_object()
+        return conditional_response(request, self.get_etag(product), lambda: self.get_serializer(product).data)
+
+class ProductRecommendationsView(APIView):
+    permission_classes = [AllowAny]
+    load_class = 'search'
+
+    def get(self, request, pk):
+        related = ProductRecommendation.objects.filter(product_id=pk).values_list('related', flat=True).first()
+        if related is None:
+            get_object_or_404(Product, pk=pk)
+            related = []
+        products = Product.objects.in_bulk([product_id for product_id, _ in related])
+        return Response([
+            {**ProductSerializer(products[product_id]).data, 'score': score}
+            for product_id, score in related if product_id in products
+        ])
+
 class LowStockView(APIView):
     permission_classes = [IsAdminOrStaff]
 
     def get(self, request):
-        low_stock_products = Product.objects.filter(stock_level__lte=5)
-        serializer = ProductSerializer(low_stock_products, many=True)
+        low_stock_products = Product.objects.filter(reorder_gap__lte=0).order_by('reorder_gap')
+        serializer = LowStockProductSerializer(low_stock_products, many=True)
         return Response(serializer.data)
 
 class OrderListCreateView(generics.ListCreateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    # Order history polling must not take the slots reserved for checkouts.
+    load_class = {'POST': 'checkout'}
     pagination_class = StandardResultsSetPagination
+    renderer_classes = FAST_RENDERER_CLASSES
 
     def get_queryset(self):
         user = self.request.user
@@ -93,19 +204,54 @@ class OrderListCreateView(generics.ListCreateAPIView):
             return Order.objects.all()
         return Order.objects.filter(user=user)
 
+    def get_archived_queryset(self):
+        user = self.request.user
+        if user.role in ['admin', 'staff']:
+            return ArchivedOrder.objects.all()
+        return ArchivedOrder.objects.filter(user=user)
+
+    def list(self, request, *args, **kwargs):
+        orders = self.filter_queryset(self.get_queryset())
+        etag = order_list_etag(request, orders, self.get_archived_queryset())
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        fast_serializer = FastOrderHistorySerializer()
+        history = fast_serializer.values(orders).union(
+            fast_serializer.values(self.get_archived_queryset()), all=True
+        ).order_by('id')
+        page = self.paginate_queryset(history)
+        response = self.get_paginated_response(fast_serializer.serialize(page))
+        response['ETag'] = etag
+        return response
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         with transaction.atomic():
-            order = serializer.save(user=self.request.user)
-            items = order.items.all()
+            items = sorted(serializer.validated_data['items'], key=lambda item: item['product'].id)
+            product_ids = [item['product'].id for item in items]
+            flash_sales = active_flash_sales(product_ids)
+            # Stock (product rows in id order, flash-sale shards) is locked before the order items are inserted:
+            # on InnoDB each insert's foreign key check takes a shared lock on its product, which two checkouts
+            # would both hold while waiting for the exclusive one.
+            products = {product.id: product for product in Product.objects.select_for_update().filter(
+                id__in=product_ids
+            ).exclude(id__in=list(flash_sales)).order_by('id')}
             total_amount = 0
             for item in items:
-                product = item.product
-                if product.stock_level < item.quantity:
+                total_amount += item['price'] * item['quantity']
+                if item['product'].id in flash_sales:
+                    if not claim_flash_stock(flash_sales[item['product'].id], item['quantity']):
+                        raise serializers.ValidationError(f"Insufficient stock for {item['product'].name}")
+                    continue
+                product = products[item['product'].id]
+                if product.stock_level < item['quantity']:
                     raise serializers.ValidationError(f"Insufficient stock for {product.name}")
-                product.stock_level -= item.quantity
+                product.stock_level -= item['quantity']
                 product.save()
-                total_amount += item.price * item.quantity
-                if product.stock_level <= 5:
+                if product.stock_level <= product.reorder_point:
                     admin_user = User.objects.filter(role='admin').first()
                     if admin_user:
                         Notification.objects.create(
@@ -113,6 +259,7 @@ class OrderListCreateView(generics.ListCreateAPIView):
                             message=f"Low stock alert: {product.name} has {product.stock_level} units left.",
                             type='email'
                         )
+            order = serializer.save(user=self.request.user)
             order.total_amount = total_amount
             order.save()
             if order.payment_method == 'M-Pesa':
@@ -123,22 +270,50 @@ class OrderListCreateView(generics.ListCreateAPIView):
                     status='pending'
                 )
             LoyaltyPoint.objects.create(user=self.request.user, points=int(total_amount // 10))
-            async_to_sync(channel_layer.group_send)(
-                'orders',
-                {
-                    'type': 'order_update',
-                    'message': f"New order {order.id} created"
-                }
-            )
+            event = order_event('order.created', order.id, order.user_id, order.status, f"New order {order.id} created")
+            transaction.on_commit(lambda: publish_order_events([event]))
 
-class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Order.objects.all()
+class OrderDetailView(IfMatchMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Order.objects.select_related('user').prefetch_related('items__product')
     serializer_class = OrderSerializer
     permission_classes = [IsOrderOwnerOrStaff]
 
+    def get_etag(self, order):
+        return order_etag(self.request, order)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            order = self.get_object()
+        except Http404:
+            archived_order = get_object_or_404(
+                ArchivedOrder.objects.select_related('user').prefetch_related('items__product'), pk=kwargs['pk']
+            )
+            self.check_object_permissions(request, archived_order)
+            return conditional_response(request, order_etag(request, archived_order),
+                                        lambda: ArchivedOrderSerializer(archived_order).data)
+        return conditional_response(request, self.get_etag(order), lambda: self.get_serializer(order).data)
+
+class OrderBulkStatusView(APIView):
+    """
+    Moves a batch of orders to `status` in one UPDATE. Orders that don't exist
+    or can't make the transition are left alone and listed under `skipped`.
+    """
+    permission_classes = [IsAdminOrStaff]
+
+    def post(self, request):
+        serializer = BulkOrderStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated, skipped = transition_orders(serializer.validated_data['order_ids'], serializer.validated_data['status'])
+        return Response({
+            "updated": updated,
+            "skipped": [{"id": order_id, "reason": reason} for order_id, reason in skipped.items()],
+        }, status=status.HTTP_200_OK)
+
 class MpesaPaymentView(APIView):
     permission_classes = [IsAuthenticated]
+    load_class = 'payment'
 
+    @idempotent
     def post(self, request):
         order_id = request.data.get('order_id')
         amount = request.data.get('amount')
@@ -175,23 +350,31 @@ class MpesaPaymentView(APIView):
             "AccountReference": f"Order {order.id}",
             "TransactionDesc": "Payment for order"
         }
+        import requests
         response = requests.post(url, json=payload, headers=headers)
         if response.status_code == 200:
+            checkout_request_id = response.json().get('CheckoutRequestID')
             payment, created = Payment.objects.get_or_create(
                 order=order,
                 defaults={
                     'amount': amount,
                     'payment_method': 'M-Pesa',
-                    'transaction_id': response.json().get('CheckoutRequestID'),
+                    'transaction_id': checkout_request_id,
                     'status': 'pending'
                 }
             )
+            if not created:
+                # Checkout already created the pending payment; the callback and reconciliation find it by this id.
+                Payment.objects.filter(pk=payment.pk, status='pending').update(
+                    transaction_id=checkout_request_id, updated_at=timezone.now()
+                )
             return Response(response.json(), status=status.HTTP_200_OK)
         return Response({"error": "Payment initiation failed", "details": response.json()}, status=status.HTTP_400_BAD_REQUEST)
 
     def get_mpesa_access_token(self):
         url = f"{settings.SAFARICOM_API}/oauth/v1/generate?grant_type=client_credentials"
         auth = (settings.MPESA_CONSUMER_KEY, settings.MPESA_CONSUMER_SECRET)
+        import requests
         response = requests.get(url, auth=auth)
         if response.status_code == 200:
             return response.json().get('access_token')
@@ -199,6 +382,7 @@ class MpesaPaymentView(APIView):
 
 class MpesaCallbackView(APIView):
     permission_classes = [AllowAny]
+    load_class = 'callback'
 
     def post(self, request):
         data = request.data.get('Body', {}).get('stkCallback', {})
@@ -206,30 +390,10 @@ class MpesaCallbackView(APIView):
         result_code = data.get('ResultCode')
         result_desc = data.get('ResultDesc')
 
-        try:
-            payment = Payment.objects.get(transaction_id=checkout_request_id)
-            if result_code == 0:
-                payment.status = 'completed'
-                payment.order.status = 'confirmed'
-                payment.order.save()
-                Notification.objects.create(
-                    user=payment.order.user,
-                    message=f"Your payment of {payment.amount} for Order {payment.order.id} was successful.",
-                    type='SMS'
-                )
-                async_to_sync(channel_layer.group_send)(
-                    'orders',
-                    {
-                        'type': 'order_update',
-                        'message': f"Order {payment.order.id} confirmed"
-                    }
-                )
-            else:
-                payment.status = 'failed'
-            payment.save()
-            return Response({"status": "success"}, status=status.HTTP_200_OK)
-        except Payment.DoesNotExist:
+        if not checkout_request_id or not Payment.objects.filter(transaction_id=checkout_request_id).exists():
             return Response({"error": "Payment not found"}, status=status.HTTP_404_NOT_FOUND)
+        apply_stk_results({checkout_request_id: result_code})
+        return Response({"status": "success"}, status=status.HTTP_200_OK)
 
 class NotificationView(APIView):
     permission_classes = [IsAdminOrStaff]
@@ -246,7 +410,7 @@ class NotificationView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def send_sms(self, user, message):
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        client = twilio_client()
         try:
             client.messages.create(
                 body=message,
@@ -257,18 +421,100 @@ class NotificationView(APIView):
             print(f"SMS sending failed: {e}")
 
     def send_email(self, user, message):
-        mail = Mail(
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to_emails=user.email,
-            subject='BizHub Notification',
-            plain_text_content=message
-        )
+        mail = sendgrid_mail(user.email, message)
         try:
-            sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
+            sg = sendgrid_client()
             sg.send(mail)
         except Exception as e:
             print(f"Email sending failed: {e}")
 
+class NotificationInboxView(APIView):
+    """
+    The signed-in user's notifications, newest first, paginated by keyset on
+    (sent_at, id) so every page is a bounded range scan of the
+    (user, sent_at, id) index regardless of how deep the client scrolls.
+    """
+    permission_classes = [IsAuthenticated]
+    page_size = 20
+    max_page_size = 100
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', self.page_size)), self.max_page_size)
+            cursor = self.decode_cursor(request.query_params.get('cursor'))
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid limit or cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = Notification.objects.filter(user=request.user).order_by('-sent_at', '-id')
+        if cursor:
+            sent_at, notification_id = cursor
+            queryset = queryset.filter(Q(sent_at__lt=sent_at) | Q(sent_at=sent_at, id__lt=notification_id))
+        notifications = list(queryset[:limit + 1])
+
+        next_url = None
+        if len(notifications) > limit:
+            notifications = notifications[:limit]
+            last = notifications[-1]
+            next_url = request.build_absolute_uri(
+                f"{request.path}?limit={limit}&cursor={self.encode_cursor(last)}"
+            )
+        return Response({
+            "next": next_url,
+            "unread_count": get_unread_count(request.user.id),
+            "results": InboxNotificationSerializer(notifications, many=True).data,
+        })
+
+    def encode_cursor(self, notification):
+        return base64.urlsafe_b64encode(f"{notification.sent_at.isoformat()}|{notification.id}".encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        sent_at, notification_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(sent_at), int(notification_id)
+
+class NotificationMarkReadView(APIView):
+    """
+    Marks the user's notifications as read up to and including `up_to` (a
+    notification id), or all of them when `up_to` is omitted, in one UPDATE.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        queryset = Notification.objects.filter(user=request.user, read_at__isnull=True)
+        up_to = request.data.get('up_to')
+        if up_to is not None:
+            try:
+                last = Notification.objects.only('sent_at').get(id=up_to, user=request.user)
+            except (Notification.DoesNotExist, ValueError, TypeError):
+                return Response({"error": "Notification not found"}, status=status.HTTP_404_NOT_FOUND)
+            queryset = queryset.filter(Q(sent_at__lt=last.sent_at) | Q(sent_at=last.sent_at, id__lte=last.id))
+        with transaction.atomic():
+            marked = queryset.update(read_at=timezone.now())
+            adjust_unread_counts({request.user.id: -marked})
+        return Response({"marked_read": marked}, status=status.HTTP_200_OK)
+
+class NotificationUnreadCountView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread_count": get_unread_count(request.user.id)})
+
+class NotificationCampaignListCreateView(generics.ListCreateAPIView):
+    queryset = NotificationCampaign.objects.select_related('created_by').order_by('-created_at')
+    serializer_class = NotificationCampaignSerializer
+    permission_classes = [IsAdminOrStaff]
+    pagination_class = StandardResultsSetPagination
+
+    def perform_create(self, serializer):
+        campaign = serializer.save(created_by=self.request.user)
+        transaction.on_commit(lambda: start_campaign(campaign.id))
+
+class NotificationCampaignDetailView(generics.RetrieveAPIView):
+    queryset = NotificationCampaign.objects.select_related('created_by')
+    serializer_class = NotificationCampaignSerializer
+    permission_classes = [IsAdminOrStaff]
+
 class LoyaltyPointView(generics.ListCreateAPIView):
     queryset = LoyaltyPoint.objects.all()
     serializer_class = LoyaltyPointSerializer
@@ -282,35 +528,108 @@ class LoyaltyPointView(generics.ListCreateAPIView):
 
 class DashboardSalesView(APIView):
     permission_classes = [IsAdmin]
+    load_class = 'dashboard'
 
     def get(self, request):
-        today = datetime.now().date()
-        sales = Order.objects.filter(created_at__date=today).aggregate(
-            total_sales=models.Sum('total_amount')
-        )
-        return Response({"total_sales": sales['total_sales'] or 0})
+        return Response(get_metric('sales'))
 
 class DashboardBestSellersView(APIView):
     permission_classes = [IsAdmin]
+    load_class = 'dashboard'
+
+    def get(self, request):
+        return Response(get_metric('best_sellers'))
+
+class DashboardSummaryView(APIView):
+    permission_classes = [IsAdmin]
+    load_class = 'dashboard'
+
+    def get(self, request):
+        return Response(get_metrics(list(DASHBOARD_METRICS)))
+
+class DashboardAnalyticsView(APIView):
+    permission_classes = [IsAdmin]
+    load_class = 'dashboard'
 
     def get(self, request):
-        best_sellers = OrderItem.objects.values('product__name').annotate(
-            total_quantity=models.Sum('quantity')
-        ).order_by('-total_quantity')[:5]
-        return Response(best_sellers)
+        try:
+            end = self.parse_date(request, 'end') or timezone.localdate()
+            start = self.parse_date(request, 'start') or end - timedelta(days=29)
+        except ValueError:
+            return Response({"error": "start and end must be dates in YYYY-MM-DD format"}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({"error": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+        from .analytics import sales_analytics
+        return Response(sales_analytics(start, end))
+
+    def parse_date(self, request, name):
+        value = request.query_params.get(name)
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
 
 class DashboardInventoryView(APIView):
     permission_classes = [IsAdmin]
+    load_class = 'dashboard'
 
     def get(self, request):
-        inventory = Product.objects.all().values('name', 'stock_level')
-        return Response(inventory)
+        return Response(get_metric('inventory'))
 
 class DashboardCustomersView(APIView):
     permission_classes = [IsAdmin]
+    load_class = 'dashboard'
+
+    def get(self, request):
+        return Response(get_metric('customers'))
+
+class ProfileListView(APIView):
+    """Stored request profiles (api.profiling), newest first, and the current sample rate."""
+    permission_classes = [IsAdmin]
 
     def get(self, request):
-        customer_activity = User.objects.filter(role='customer').annotate(
-            order_count=models.Count('orders')
-        ).values('username', 'order_count')
-        return Response(customer_activity)
\ No newline at end of file
+        return Response({"sample_rate": get_sample_rate(), "results": list_profiles()})
+
+class ProfileSamplingView(APIView):
+    """Profiles `sample_rate` of all requests for the next `minutes`; 0 stops sampling."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response({"sample_rate": get_sample_rate()})
+
+    def put(self, request):
+        serializer = ProfileSamplingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        set_sample_rate(serializer.validated_data['sample_rate'], serializer.validated_data['minutes'])
+        return Response(serializer.validated_data)
+
+class ProfileTokenView(APIView):
+    """A single-use token: the next request sent with it in the X-Profile header is profiled."""
+    permission_classes = [IsAdmin]
+
+    def post(self, request):
+        return Response({
+            "header": PROFILE_HEADER, "token": issue_token(), "expires_in": settings.PROFILING['token_max_age']
+        }, status=status.HTTP_201_CREATED)
+
+class ProfileDetailView(APIView):
+    """
+    A stored profile with its SQL queries; `?download=collapsed` returns
+    folded stacks for flame graph tools, `?download=pstats` the cProfile
+    stats file.
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request, pk):
+        profile = get_profile(pk)
+        if profile is None:
+            raise Http404
+        download = request.query_params.get('download')
+        if download == 'collapsed':
+            response = HttpResponse(collapsed_stacks(profile), content_type='text/plain; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="profile-{pk}.folded"'
+            return response
+        if download == 'pstats':
+            response = HttpResponse(profile['stats'], content_type='application/octet-stream')
+            response['Content-Disposition'] = f'attachment; filename="profile-{pk}.prof"'
+            return response
+        if download is not None:
+            return Response({"error": "download must be 'collapsed' or 'pstats'"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({key: value for key, value in profile.items() if key not in ('stacks', 'stats')})
@@ -0,0 +1,37 @@
+"""
+Authenticates WebSocket connections with a SimpleJWT access token, sent as
+`Authorization: Bearer <token>` (native clients) or `?token=<token>`
+(browsers, whose WebSocket API can't set headers). Without a token the
+user set by the session middleware below it (if any) is kept.
+"""
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+
+def scope_token(scope):
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization' and value.lower().startswith(b'bearer '):
+            return value[7:].decode('latin-1').strip()
+    tokens = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token')
+    return tokens[0] if tokens else None
+
+
+@database_sync_to_async
+def user_for_token(token):
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    async def __call__(self, scope, receive, send):
+        token = scope_token(scope)
+        if token:
+            scope = dict(scope, user=await user_for_token(token))
+        return await super().__call__(scope, receive, send)
@@ -10,16 +10,22 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.security.websocket import AllowedHostsOriginValidator
-import api.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bizhub.settings')
+django_application = get_asgi_application()
+
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E402
+import api.routing  # noqa: E402
+from api.websocket_auth import JWTAuthMiddleware  # noqa: E402
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_application,
     "websocket": AllowedHostsOriginValidator(
-        URLRouter(
-            api.routing.websocket_urlpatterns
-        )
+        AuthMiddlewareStack(JWTAuthMiddleware(
+            URLRouter(
+                api.routing.websocket_urlpatterns
+            )
+        ))
     ),
 })
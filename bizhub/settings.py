@@ -1,8 +1,12 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from decouple import config
-import pymysql
-pymysql.install_as_MySQLdb()
+
+# Fall back to PyMySQL only where mysqlclient isn't installed, so workers don't load two drivers.
+if find_spec('MySQLdb') is None:
+    import pymysql
+    pymysql.install_as_MySQLdb()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -28,6 +32,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.load_shedding.LoadSheddingMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -110,6 +116,14 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+MEDIA_URL = config('MEDIA_URL', default='/media/')
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+# Site root a relative MEDIA_URL is joined to where an absolute URL must be stored
+# (ingested originals go into Product.image_url, a URLField).
+MEDIA_BASE_URL = config('MEDIA_BASE_URL', default=f'https://{ALLOWED_HOSTS[0]}')
+# Let Django serve MEDIA_URL (with long-lived cache headers for image variants)
+# when no web server or CDN sits in front of it.
+SERVE_MEDIA = config('SERVE_MEDIA', default=DEBUG, cast=bool)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -120,10 +134,130 @@ MPESA_CONSUMER_KEY = config('MPESA_CONSUMER_KEY', default='')
 MPESA_CONSUMER_SECRET = config('MPESA_CONSUMER_SECRET', default='')
 MPESA_PASSKEY = config('MPESA_PASSKEY', default='')
 MPESA_CALLBACK_URL = config('MPESA_CALLBACK_URL', default='')
+SAFARICOM_API = config('SAFARICOM_API', default='https://sandbox.safaricom.co.ke')
+MPESA_RECONCILE_AFTER_MINUTES = config('MPESA_RECONCILE_AFTER_MINUTES', default=15, cast=int)
 
 TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
 TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='')
 
 SENDGRID_API_KEY = config('SENDGRID_API_KEY', default='')
-DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='no-reply@bizhub.com')
\ No newline at end of file
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='no-reply@bizhub.com')
+
+# Loyalty tiers by total points earned: name -> (minimum, maximum exclusive or None).
+LOYALTY_TIERS = {
+    'bronze': (0, 100),
+    'silver': (100, 500),
+    'gold': (500, None),
+}
+NOTIFICATION_CAMPAIGN_CHUNK_SIZE = 1000
+# A running campaign with no heartbeat for this long is assumed dead and may be taken over.
+NOTIFICATION_CAMPAIGN_LEASE_SECONDS = config('NOTIFICATION_CAMPAIGN_LEASE_SECONDS', default=300, cast=int)
+
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=365, cast=int)
+ORDER_ARCHIVE_STATUSES = ['shipped']
+
+# Reorder points (api.reorder): demand is measured over `lookback_days`; the
+# reorder point covers `lead_time_days` of demand plus `service_level_z`
+# standard deviations of safety stock (1.65 is roughly a 95% service level).
+INVENTORY_REORDER = {
+    'lookback_days': config('REORDER_LOOKBACK_DAYS', default=90, cast=int),
+    'lead_time_days': config('REORDER_LEAD_TIME_DAYS', default=7, cast=int),
+    'service_level_z': config('REORDER_SERVICE_LEVEL_Z', default=1.65, cast=float),
+    'min_reorder_point': 1,
+}
+
+# "Frequently bought together" (api.recommendations).
+RECOMMENDATIONS = {
+    'top_n': 10,
+    'min_support': config('RECOMMENDATIONS_MIN_SUPPORT', default=2, cast=int),
+}
+RECOMMENDATIONS_DIR = config('RECOMMENDATIONS_DIR', default=str(BASE_DIR / 'recommendations'))
+
+# Shared cache (e.g. redis://localhost:6379/1) so cached dashboard metrics,
+# unread counts and refresh locks are shared by all workers. Without it each
+# worker process has its own in-memory cache.
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+
+# Dashboard metric cache (api.dashboard): seconds each metric may be served
+# before a background refresh; entries older than `max_age` are recomputed
+# inline.
+DASHBOARD_CACHE = {
+    'freshness': {'sales': 30, 'best_sellers': 300, 'inventory': 60, 'customers': 300},
+    'max_age': 60 * 60,
+    'refresh_timeout': 120,
+}
+
+# Serve GET on the product list/detail/search and order detail endpoints with
+# async views (api.async_views). Only worth it under ASGI (daphne); under WSGI
+# (the PythonAnywhere deployment) each async view costs two thread hops.
+ASYNC_READS = config('ASYNC_READS', default=False, cast=bool)
+
+# On-demand request profiling (api.profiling). Off removes the middleware;
+# on, staff choose what is profiled. The newest `buffer_size` profiles are kept.
+PROFILING = {
+    'enabled': config('PROFILING_ENABLED', default=True, cast=bool),
+    'buffer_size': config('PROFILING_BUFFER_SIZE', default=50, cast=int),
+    'retention_hours': 24,
+    'max_queries': 1000,
+    'sample_interval_ms': 1,
+    'token_max_age': 300,
+    'poll_interval': 5,
+    'max_sample_minutes': 60,
+}
+
+# Product name typeahead (api.typeahead): how often a worker checks whether
+# products changed and its in-process prefix index needs rebuilding.
+TYPEAHEAD = {
+    'refresh_interval': config('TYPEAHEAD_REFRESH_INTERVAL', default=5, cast=float),
+    'limit': 10,
+    'max_limit': 50,
+}
+
+# Idempotency-Key handling (api.idempotency). A duplicate request waits up to
+# `wait_seconds` for the first one; a key left `processing` longer than
+# `lease_seconds` (its worker died) may be taken over by a retry.
+IDEMPOTENCY = {
+    'ttl_hours': config('IDEMPOTENCY_TTL_HOURS', default=24, cast=int),
+    'wait_seconds': 10,
+    'lease_seconds': 60,
+}
+
+ORDER_EXPORT_DIR = config('ORDER_EXPORT_DIR', default=str(BASE_DIR / 'exports'))
+
+# Product image variants (api.images): longest edge in pixels per variant,
+# each written in every format under content-addressed names in MEDIA_ROOT.
+# file:// image URLs are only read inside `source_dir` (unset: not at all).
+PRODUCT_IMAGES = {
+    'variants': {'thumb': 160, 'card': 480, 'full': 1200},
+    'formats': {'webp': 80, 'jpeg': 85},
+    'max_source_bytes': 20 * 1024 * 1024,
+    'fetch_timeout': 10,
+    'max_redirects': 3,
+    'source_dir': config('PRODUCT_IMAGE_SOURCE_DIR', default=''),
+}
+
+# Per-worker admission control (api.load_shedding). `capacity` should match the
+# worker's thread count; `headroom` is the share of capacity each priority
+# (0 = highest) may occupy before its requests are shed.
+LOAD_SHEDDING = {
+    'enabled': config('LOAD_SHEDDING_ENABLED', default=True, cast=bool),
+    'capacity': config('LOAD_SHEDDING_CAPACITY', default=32, cast=int),
+    'headroom': [1.0, 0.75, 0.5],
+    'classes': {
+        'checkout': {'priority': 0, 'initial': 16, 'min_limit': 4, 'max_limit': 32, 'target_latency': 1.0},
+        'callback': {'priority': 0, 'initial': 16, 'min_limit': 4, 'max_limit': 32, 'target_latency': 1.0},
+        'payment': {'priority': 0, 'initial': 8, 'min_limit': 2, 'max_limit': 16, 'target_latency': 10.0},
+        'default': {'priority': 1, 'initial': 16, 'min_limit': 2, 'max_limit': 32, 'target_latency': 1.0},
+        'search': {'priority': 2, 'initial': 8, 'min_limit': 1, 'max_limit': 16, 'target_latency': 0.5},
+        'dashboard': {'priority': 2, 'initial': 4, 'min_limit': 1, 'max_limit': 8, 'target_latency': 2.0},
+    },
+}
+
+# Order WebSockets (api.consumers): how many order and staff stream groups one
+# socket may subscribe to besides its user's own group.
+WEBSOCKETS = {
+    'max_subscriptions': config('WEBSOCKET_MAX_SUBSCRIPTIONS', default=50, cast=int),
+}